@@ -3,14 +3,18 @@ from sqladmin.authentication import AuthenticationBackend
 from starlette.requests import Request
 from starlette.responses import RedirectResponse
 from models import (
-    User, Match, Message, Mission, Block, Report,
+    User, Match, Message, Mission, MissionRollup, Block, Report,
     Badge, UserProfile, Theme, IcebreakerPrompt, UserIcebreaker,
     MoodCheckIn, CompatibilityQuiz, UserQuizResult, Nudge, UserNudgeLog,
     Event, UserEventRegistration, RelationshipTip, GuidedChatSession,
     EmotionalSafetySetting
 )
 from auth import verify_password, get_password_hash
-from database import SessionLocal
+from database import SessionLocal, engine
+from search_index import ranked_search_subquery
+from sqlalchemy import func, or_
+from wtforms import IntegerField, validators
+from xp import award_xp
 import os
 
 # Authentication Backend
@@ -88,16 +92,40 @@ class UserAdmin(SecureModelView, model=User):
         User.mood_status,
         User.verified,
         User.is_superuser,
-        User.xp,
-        User.level,
         User.photo_verified,
         User.hashed_password
     ]
 
+    # XP and level come from the XP ledger (reconcile_xp would undo direct
+    # edits), so they are read-only; admins adjust XP through a ledger entry
+    async def scaffold_form(self):
+        form = await super().scaffold_form()
+
+        class UserForm(form):
+            xp_adjustment = IntegerField(
+                "XP adjustment",
+                validators=[validators.Optional()],
+                description="Added to the user's XP (negative to remove) as an admin_adjustment ledger entry"
+            )
+
+        return UserForm
+
     # Hash password on save
     async def on_model_change(self, data, model, is_created, request):
         if "hashed_password" in data and data["hashed_password"]:
             data["hashed_password"] = get_password_hash(data["hashed_password"])
+        request.state.xp_adjustment = data.pop("xp_adjustment", None)
+
+    async def after_model_change(self, data, model, is_created, request):
+        amount = getattr(request.state, "xp_adjustment", None)
+        if not amount:
+            return
+        db = SessionLocal()
+        try:
+            award_xp(db, model.id, amount, "admin_adjustment")
+            db.commit()
+        finally:
+            db.close()
 
 class MatchAdmin(SecureModelView, model=Match):
     name = "Match"
@@ -126,6 +154,13 @@ class MessageAdmin(SecureModelView, model=Message):
     column_sortable_list = [Message.id, Message.created_at]
     column_default_sort = [("created_at", True)]
     
+    # Use the full-text index instead of ILIKE '%term%', best matches first
+    def search_query(self, stmt, term):
+        ranked = ranked_search_subquery(Message, term, engine.dialect.name)
+        return stmt.join(ranked, ranked.c.id == Message.id).order_by(None).order_by(
+            ranked.c.rank.desc(), Message.id.desc()
+        )
+    
     form_columns = [
         Message.match,
         Message.sender,
@@ -137,7 +172,7 @@ class MissionAdmin(SecureModelView, model=Mission):
     name_plural = "Missions"
     icon = "fa-solid fa-trophy"
     
-    column_list = [Mission.id, Mission.user_id, Mission.mission_type, Mission.completed, Mission.xp_reward, Mission.created_at]
+    column_list = [Mission.id, Mission.user_id, Mission.mission_type, Mission.completed, Mission.progress, Mission.target, Mission.xp_reward, Mission.created_at]
     column_searchable_list = [Mission.mission_type]
     column_sortable_list = [Mission.id, Mission.created_at, Mission.completed]
     
@@ -149,6 +184,23 @@ class MissionAdmin(SecureModelView, model=Mission):
         Mission.completed_at,
     ]
 
+class MissionRollupAdmin(SecureModelView, model=MissionRollup):
+    """Weekly totals of missions removed from the missions table (read-only)"""
+    name = "Mission History"
+    name_plural = "Mission History"
+    icon = "fa-solid fa-box-archive"
+    
+    can_create = False
+    can_edit = False
+    can_delete = False
+    
+    column_list = [
+        MissionRollup.user_id, MissionRollup.week_start, MissionRollup.missions_total,
+        MissionRollup.missions_completed, MissionRollup.xp_earned, MissionRollup.updated_at
+    ]
+    column_sortable_list = [MissionRollup.user_id, MissionRollup.week_start, MissionRollup.xp_earned]
+    column_default_sort = [("week_start", True)]
+
 class BlockAdmin(SecureModelView, model=Block):
     name = "Block"
     name_plural = "Blocks"
@@ -174,6 +226,15 @@ class ReportAdmin(SecureModelView, model=Report):
     column_sortable_list = [Report.id, Report.created_at, Report.status]
     column_default_sort = [("created_at", True)]
     
+    # Full-text search over descriptions; type and status still match exactly
+    def search_query(self, stmt, term):
+        ranked = ranked_search_subquery(Report, term, engine.dialect.name)
+        return stmt.outerjoin(ranked, ranked.c.id == Report.id).where(or_(
+            ranked.c.id.isnot(None),
+            Report.report_type == term,
+            Report.status == term
+        )).order_by(None).order_by(func.coalesce(ranked.c.rank, 0).desc(), Report.id.desc())
+    
     form_columns = [
         Report.reporter,
         Report.reported_user,
@@ -189,11 +250,11 @@ class BadgeAdmin(SecureModelView, model=Badge):
     name_plural = "Badges"
     icon = "fa-solid fa-medal"
     
-    column_list = ["id", "name", "xp_requirement", "created_at"]
+    column_list = ["id", "name", "criterion", "threshold", "xp_requirement", "created_at"]
     column_searchable_list = ["name"]
     column_sortable_list = ["id", "name", "xp_requirement", "created_at"]
     
-    form_columns = ["name", "description", "icon_url", "xp_requirement"]
+    form_columns = ["name", "description", "icon_url", "criterion", "threshold", "xp_requirement"]
 
 class UserProfileAdmin(SecureModelView, model=UserProfile):
     name = "User Profile"
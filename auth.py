@@ -76,3 +76,9 @@ def get_current_user(token: str = Depends(oauth2_scheme), db = None):
         raise credentials_exception
     
     return user
+
+def get_current_superuser(current_user = Depends(get_current_user)):
+    """Dependency for admin-only endpoints"""
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
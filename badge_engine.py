@@ -0,0 +1,246 @@
+"""
+Badge awards.
+
+Each badge has a criterion ("xp", "messages_sent", "matches", "reveals",
+"mood_streak") and a threshold. "manual" badges are never awarded here; admins
+award them. The engine keeps, per criterion, the
+thresholds in sorted order, so when a user's value for a criterion goes
+from `old` to `new` the badges crossed are found with two binary searches;
+no other badge and no other user is looked at. Activity totals are kept in
+user_activity_counts, updated from domain events.
+
+award_badges_retroactively walks users in keyset pages of user ids and reads
+every criterion for one page at a time, for badges added after users
+already qualified.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select, union_all
+
+from database import SessionLocal, insert_for
+from domain_events import DomainEvent
+from models import Badge, Match, Message, MessageArchive, MoodStats, User, UserActivityCount, UserBadge
+
+logger = logging.getLogger(__name__)
+
+RELOAD_SECONDS = 300  # pick up badges edited in the admin
+MANUAL_CRITERION = "manual"
+
+# Domain event -> activity metric it increments
+EVENT_METRICS = {
+    "message_sent": "messages_sent",
+    "match_created": "matches",
+    "match_received": "matches",
+    "identity_revealed": "reveals",
+}
+
+
+class BadgeEngine:
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        self._thresholds: Dict[str, Tuple[List[int], List[int]]] = {}  # criterion -> (thresholds, badge ids)
+        self._names: Dict[int, str] = {}
+
+    def reload(self, db=None):
+        """Load badge thresholds from the database"""
+        own_session = db is None
+        db = db or self.session_factory()
+        try:
+            badges = db.execute(select(Badge.id, Badge.name, Badge.criterion, Badge.xp_requirement, Badge.threshold)).all()
+        finally:
+            if own_session:
+                db.close()
+
+        by_criterion: Dict[str, List[Tuple[int, int]]] = {}
+        for badge_id, name, criterion, xp_requirement, threshold in badges:
+            criterion = criterion or "xp"
+            if criterion == MANUAL_CRITERION:
+                continue
+            value = xp_requirement if criterion == "xp" else threshold
+            if value is None:
+                continue
+            by_criterion.setdefault(criterion, []).append((value, badge_id))
+
+        thresholds = {}
+        for criterion, entries in by_criterion.items():
+            entries.sort()
+            thresholds[criterion] = ([value for value, _ in entries], [badge_id for _, badge_id in entries])
+        with self._lock:
+            self._thresholds = thresholds
+            self._names = {badge_id: name for badge_id, name, *_ in badges}
+            self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > RELOAD_SECONDS:
+            self.reload()
+
+    def earned(self, criterion: str, value: int) -> List[int]:
+        """Ids of every badge for `criterion` that `value` qualifies for"""
+        return self.crossed(criterion, None, value)
+
+    def crossed(self, criterion: str, old: Optional[int], new: int) -> List[int]:
+        """Ids of badges whose threshold lies in (old, new]"""
+        self._ensure_loaded()
+        with self._lock:
+            thresholds, badge_ids = self._thresholds.get(criterion, ((), ()))
+            low = bisect_right(thresholds, old) if old is not None else 0
+            high = bisect_right(thresholds, new)
+            return list(badge_ids[low:high])
+
+    def name(self, badge_id: int) -> Optional[str]:
+        return self._names.get(badge_id)
+
+    def _insert(self, db, rows: List[dict]) -> List[int]:
+        if not rows:
+            return []
+        insert = insert_for(db)
+        return db.execute(
+            insert(UserBadge)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=["user_id", "badge_id"])
+            .returning(UserBadge.badge_id)
+        ).scalars().all()
+
+    def check(self, db, user_id: int, criterion: str, old: Optional[int], new: int) -> List[int]:
+        """Award the badges crossed by a change of `criterion` from old to new. Returns new badge ids. Caller commits."""
+        if old is not None and new <= old:
+            return []
+        now = datetime.utcnow()
+        return self._insert(db, [
+            {"user_id": user_id, "badge_id": badge_id, "awarded_at": now}
+            for badge_id in self.crossed(criterion, old, new)
+        ])
+
+    def record_activity(self, db, user_id: int, metric: str, delta: int = 1) -> List[int]:
+        """Add to a user's activity total and award any badges it crosses. Caller commits."""
+        insert = insert_for(db)
+        stmt = insert(UserActivityCount).values(user_id=user_id, metric=metric, value=delta)
+        value = db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["user_id", "metric"],
+                set_={"value": UserActivityCount.value + delta}
+            ).returning(UserActivityCount.value)
+        ).scalar_one()
+        return self.check(db, user_id, metric, value - delta, value)
+
+    def award_all(self, db, criterion: str, values: Iterable[Tuple[int, int]]) -> int:
+        """Award every qualifying badge for (user id, value) pairs. Returns the number of new awards. Caller commits."""
+        now = datetime.utcnow()
+        rows = [
+            {"user_id": user_id, "badge_id": badge_id, "awarded_at": now}
+            for user_id, value in values
+            for badge_id in self.earned(criterion, value or 0)
+        ]
+        return len(self._insert(db, rows))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self._loaded_at is not None,
+                "badges": sum(len(ids) for _, ids in self._thresholds.values()),
+                "criteria": sorted(self._thresholds),
+            }
+
+
+badge_engine = BadgeEngine()
+
+
+def record_badge_activity(events: List[DomainEvent]):
+    """Event bus subscriber: count activity and award badges for a batch of events"""
+    events = [e for e in events if e.name in EVENT_METRICS]
+    if not events:
+        return
+    db = SessionLocal()
+    try:
+        awarded = 0
+        for event in events:
+            awarded += len(badge_engine.record_activity(db, event.user_id, EVENT_METRICS[event.name]))
+        db.commit()
+        if awarded:
+            logger.info(f"Awarded {awarded} badges from {len(events)} events")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _metric_queries(low: int, high: int) -> Dict[str, object]:
+    """criterion -> SELECT user_id, value for users with low < id <= high (index range scans)"""
+    def in_range(column):
+        return (column > low) & (column <= high)
+
+    sent = union_all(
+        select(Message.sender_id.label("user_id")).where(in_range(Message.sender_id)),
+        select(MessageArchive.sender_id.label("user_id")).where(in_range(MessageArchive.sender_id))
+    ).subquery()
+    matched = union_all(
+        select(Match.user_a_id.label("user_id")).where(in_range(Match.user_a_id)),
+        select(Match.user_b_id.label("user_id")).where(in_range(Match.user_b_id))
+    ).subquery()
+    revealed = union_all(
+        select(Match.user_a_id.label("user_id")).where(in_range(Match.user_a_id), Match.is_revealed_a == True),
+        select(Match.user_b_id.label("user_id")).where(in_range(Match.user_b_id), Match.is_revealed_b == True)
+    ).subquery()
+
+    def counted(source):
+        return select(source.c.user_id, func.count()).group_by(source.c.user_id)
+
+    return {
+        "xp": select(User.id, User.xp).where(in_range(User.id), User.xp > 0),
+        "messages_sent": counted(sent),
+        "matches": counted(matched),
+        "reveals": counted(revealed),
+        "mood_streak": select(MoodStats.user_id, MoodStats.longest_streak).where(in_range(MoodStats.user_id)),
+    }
+
+
+def _store_counts(db, metric: str, chunk: List[Tuple[int, int]]):
+    insert = insert_for(db)
+    stmt = insert(UserActivityCount).values([
+        {"user_id": user_id, "metric": metric, "value": value} for user_id, value in chunk
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["user_id", "metric"],
+        set_={"value": stmt.excluded.value}
+    ))
+
+
+def award_badges_retroactively(db, batch_size: int = 1000) -> dict:
+    """Recount activity totals and award every badge users already qualify for, `batch_size` users at a time"""
+    badge_engine.reload(db)
+    result = {criterion: 0 for criterion in _metric_queries(0, 0)}
+    last_id = 0
+    while True:
+        # Keyset page of user ids; every criterion is then read for that id range only
+        user_ids = db.scalars(select(User.id).where(User.id > last_id).order_by(User.id).limit(batch_size)).all()
+        if not user_ids:
+            break
+        for criterion, query in _metric_queries(last_id, user_ids[-1]).items():
+            rows = db.execute(query).all()
+            if not rows:
+                continue
+            if criterion in EVENT_METRICS.values():
+                _store_counts(db, criterion, rows)
+            result[criterion] += badge_engine.award_all(db, criterion, rows)
+        db.commit()
+        last_id = user_ids[-1]
+    for criterion, awarded in result.items():
+        logger.info(f"Awarded {awarded} {criterion} badges retroactively")
+    return result
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        result = award_badges_retroactively(db)
+        print(f"✅ Awarded {sum(result.values())} badges: {result}")
+    finally:
+        db.close()
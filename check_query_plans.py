@@ -0,0 +1,204 @@
+"""
+EXPLAIN-based check that hot queries are served by an index.
+
+Runs EXPLAIN for each query in HOT_QUERIES and fails if any of them falls back
+to a sequential (full table) scan. On PostgreSQL sequential scans are disabled
+for the session first, so a "Seq Scan" in the plan means no usable index
+exists rather than that the table is too small to bother.
+
+    python3 check_query_plans.py
+
+Exits with status 1 if any hot query scans a full table.
+"""
+import json
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from database import engine
+from models import (
+    DeviceToken, Match, Message, MessageArchive, Block, Mission, MissionRollup, MoodCellCount, MoodCheckIn,
+    PushOutbox, User, UserNudgeLog, UserEventRegistration, UserProfile, XPLedgerEntry
+)
+
+USER_ID = 1
+OTHER_USER_ID = 2
+SINCE = datetime(2024, 1, 1)
+
+# name -> (statement, table that must not be scanned)
+HOT_QUERIES = {
+    "my matches": (
+        select(Match).where((Match.user_a_id == USER_ID) | (Match.user_b_id == USER_ID)),
+        "matches",
+    ),
+    "match between two users": (
+        select(Match).where(
+            ((Match.user_a_id == USER_ID) & (Match.user_b_id == OTHER_USER_ID)) |
+            ((Match.user_a_id == OTHER_USER_ID) & (Match.user_b_id == USER_ID))
+        ),
+        "matches",
+    ),
+    "conversation messages": (
+        select(Message).where(Message.match_id == 1).order_by(Message.created_at),
+        "messages",
+    ),
+    "archived conversation messages": (
+        select(MessageArchive).where(MessageArchive.match_id == 1).order_by(MessageArchive.created_at),
+        "messages_archive",
+    ),
+    "messages sent by a range of users": (
+        select(Message.sender_id, func.count())
+        .where(Message.sender_id > USER_ID, Message.sender_id <= USER_ID + 1000)
+        .group_by(Message.sender_id),
+        "messages",
+    ),
+    "users I blocked": (
+        select(Block.blocked_user_id).where(Block.user_id == USER_ID),
+        "blocks",
+    ),
+    "users who blocked me": (
+        select(Block.user_id).where(Block.blocked_user_id == USER_ID),
+        "blocks",
+    ),
+    "today's missions": (
+        select(Mission).where(Mission.user_id == USER_ID, Mission.created_at >= SINCE),
+        "missions",
+    ),
+    "daily missions": (
+        select(Mission).where(Mission.user_id == USER_ID, Mission.mission_date == SINCE.date()),
+        "missions",
+    ),
+    "mission stats": (
+        select(func.count(), func.sum(Mission.xp_reward)).where(Mission.user_id == USER_ID, Mission.completed == True),
+        "missions",
+    ),
+    "missions past retention": (
+        select(Mission.id).where(
+            (Mission.mission_date < SINCE.date()) |
+            (Mission.mission_date.is_(None) & (Mission.created_at < SINCE))
+        ).limit(5000),
+        "missions",
+    ),
+    "mission rollup totals": (
+        select(func.sum(MissionRollup.missions_completed)).where(MissionRollup.user_id == USER_ID),
+        "mission_rollups",
+    ),
+    "mood history": (
+        select(MoodCheckIn).where(MoodCheckIn.user_id == USER_ID, MoodCheckIn.date >= SINCE).order_by(MoodCheckIn.date.desc()),
+        "mood_checkins",
+    ),
+    "mood trends by region": (
+        select(MoodCellCount.day, MoodCellCount.cell_lat, MoodCellCount.cell_lon, MoodCellCount.mood, MoodCellCount.users)
+        .where(MoodCellCount.day.between(SINCE.date(), (SINCE + timedelta(days=30)).date())),
+        "mood_cell_counts",
+    ),
+    "event participant count": (
+        select(func.count()).select_from(UserEventRegistration).where(UserEventRegistration.event_id == 1),
+        "user_event_registrations",
+    ),
+    "my event registrations": (
+        select(UserEventRegistration).where(UserEventRegistration.user_id == USER_ID),
+        "user_event_registrations",
+    ),
+    "active users near a point": (
+        select(User.id, User.latitude, User.longitude).where(
+            User.latitude.between(5.4, 5.8),
+            User.longitude.between(-0.4, 0.0),
+            User.last_location_update >= SINCE
+        ),
+        "users",
+    ),
+    "recently active located users": (
+        select(User.latitude, User.longitude).where(
+            User.latitude.isnot(None),
+            User.longitude.isnot(None),
+            User.last_location_update >= SINCE
+        ),
+        "users",
+    ),
+    "due push notifications": (
+        select(PushOutbox.id).where(
+            PushOutbox.status.in_(("pending", "retry", "sending")),
+            PushOutbox.next_attempt_at <= SINCE
+        ).order_by(PushOutbox.next_attempt_at).limit(500),
+        "push_outbox",
+    ),
+    "devices of claimed users": (
+        select(DeviceToken.user_id, DeviceToken.token, DeviceToken.platform)
+        .where(DeviceToken.user_id.in_([USER_ID, OTHER_USER_ID])),
+        "device_tokens",
+    ),
+    "recent nudges": (
+        select(UserNudgeLog.user_id, UserNudgeLog.sent_at)
+        .where(UserNudgeLog.user_id.in_([USER_ID, OTHER_USER_ID]), UserNudgeLog.sent_at >= SINCE)
+        .order_by(UserNudgeLog.user_id, UserNudgeLog.sent_at),
+        "user_nudge_logs",
+    ),
+    "recent XP awards": (
+        select(XPLedgerEntry.user_id).where(XPLedgerEntry.created_at >= SINCE),
+        "xp_ledger",
+    ),
+    "user profile": (
+        select(UserProfile).where(UserProfile.user_id == USER_ID),
+        "user_profiles",
+    ),
+}
+
+
+def _run_explain(conn, prefix: str, stmt):
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    return conn.exec_driver_sql(prefix + str(compiled), params).all()
+
+
+def _postgres_seq_scans(plan: dict, table: str) -> bool:
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") == table:
+        return True
+    return any(_postgres_seq_scans(child, table) for child in plan.get("Plans", []))
+
+
+def explain(conn, stmt, table: str):
+    """Returns (uses_full_scan, plan_text)"""
+    if conn.dialect.name == "postgresql":
+        rows = _run_explain(conn, "EXPLAIN (FORMAT JSON) ", stmt)
+        plan = rows[0][0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        root = plan[0]["Plan"]
+        return _postgres_seq_scans(root, table), json.dumps(root, indent=2)
+
+    # SQLite: "SCAN <table>" is a full scan, "SEARCH <table> USING INDEX" is not
+    rows = _run_explain(conn, "EXPLAIN QUERY PLAN ", stmt)
+    details = [row[-1] for row in rows]
+    full_scan = any(d.startswith(f"SCAN {table}") for d in details)
+    return full_scan, "\n".join(details)
+
+
+def check_query_plans() -> bool:
+    failures = []
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql("SET enable_seqscan = off")
+
+        for name, (stmt, table) in HOT_QUERIES.items():
+            full_scan, plan = explain(conn, stmt, table)
+            if full_scan:
+                failures.append((name, plan))
+                print(f"✗ {name}: full scan of {table}")
+            else:
+                print(f"✓ {name}")
+        conn.rollback()
+
+    for name, plan in failures:
+        print(f"\n--- plan for '{name}' ---\n{plan}")
+
+    return not failures
+
+
+if __name__ == "__main__":
+    ok = check_query_plans()
+    print("\n✅ All hot queries use an index" if ok else "\n❌ Some hot queries fall back to a full scan")
+    sys.exit(0 if ok else 1)
@@ -37,6 +37,72 @@ class Settings(BaseSettings):
     MAX_UPLOAD_SIZE: int = Field(default=5242880, env="MAX_UPLOAD_SIZE")  # 5MB
     ALLOWED_EXTENSIONS: str = Field(default="jpg,jpeg,png,gif", env="ALLOWED_EXTENSIONS")
     
+    # Chat write batching (group commit)
+    CHAT_BATCH_WRITES_ENABLED: bool = Field(default=False, env="CHAT_BATCH_WRITES_ENABLED")
+    CHAT_BATCH_WINDOW_MS: int = Field(default=5, env="CHAT_BATCH_WINDOW_MS")
+    CHAT_BATCH_MAX_SIZE: int = Field(default=100, env="CHAT_BATCH_MAX_SIZE")
+    
+    # Background jobs (disable on all but one instance when scaling out)
+    BACKGROUND_JOBS_ENABLED: bool = Field(default=True, env="BACKGROUND_JOBS_ENABLED")
+    
+    # Message archival
+    MESSAGE_ARCHIVE_AFTER_DAYS: int = Field(default=90, env="MESSAGE_ARCHIVE_AFTER_DAYS")
+    MESSAGE_ARCHIVE_BATCH_SIZE: int = Field(default=1000, env="MESSAGE_ARCHIVE_BATCH_SIZE")
+    
+    # Hotspot source: "grid" (maintained counters) or "sql" (GROUP BY over users)
+    HOTSPOT_SOURCE: str = Field(default="grid", env="HOTSPOT_SOURCE")
+    
+    # Nearby activity cache (per grid cell and radius)
+    NEARBY_ACTIVITY_CACHE_TTL_SECONDS: int = Field(default=30, env="NEARBY_ACTIVITY_CACHE_TTL_SECONDS")
+    NEARBY_ACTIVITY_CACHE_SIZE: int = Field(default=10000, env="NEARBY_ACTIVITY_CACHE_SIZE")
+    
+    # Nearby match candidates (precomputed in the background)
+    NEARBY_CANDIDATE_WORKERS: int = Field(default=4, env="NEARBY_CANDIDATE_WORKERS")
+    NEARBY_CANDIDATE_CACHE_SIZE: int = Field(default=50000, env="NEARBY_CANDIDATE_CACHE_SIZE")
+    NEARBY_CANDIDATE_TTL_SECONDS: int = Field(default=300, env="NEARBY_CANDIDATE_TTL_SECONDS")
+    NEARBY_CANDIDATE_MOVE_MILES: float = Field(default=0.5, env="NEARBY_CANDIDATE_MOVE_MILES")
+    
+    # Discovery feed ranking weights
+    DISCOVERY_WEIGHT_DISTANCE: float = Field(default=0.35, env="DISCOVERY_WEIGHT_DISTANCE")
+    DISCOVERY_WEIGHT_RECENCY: float = Field(default=0.2, env="DISCOVERY_WEIGHT_RECENCY")
+    DISCOVERY_WEIGHT_INTERESTS: float = Field(default=0.25, env="DISCOVERY_WEIGHT_INTERESTS")
+    DISCOVERY_WEIGHT_MOOD: float = Field(default=0.1, env="DISCOVERY_WEIGHT_MOOD")
+    DISCOVERY_WEIGHT_LEVEL: float = Field(default=0.1, env="DISCOVERY_WEIGHT_LEVEL")
+    INTEREST_INDEX_REFRESH_SECONDS: int = Field(default=60, env="INTEREST_INDEX_REFRESH_SECONDS")
+    
+    # Daily missions (created ahead of midnight UTC for recently active users)
+    MISSION_ACTIVE_DAYS: int = Field(default=7, env="MISSION_ACTIVE_DAYS")
+    MISSION_MATERIALIZE_BATCH_SIZE: int = Field(default=1000, env="MISSION_MATERIALIZE_BATCH_SIZE")
+    
+    # Mission history (older missions are rolled up into weekly totals)
+    MISSION_RETENTION_DAYS: int = Field(default=90, env="MISSION_RETENTION_DAYS")
+    MISSION_ROLLUP_BATCH_SIZE: int = Field(default=5000, env="MISSION_ROLLUP_BATCH_SIZE")
+    
+    # Mood analytics: cells with fewer users are never shown
+    MOOD_ANALYTICS_MIN_USERS: int = Field(default=10, env="MOOD_ANALYTICS_MIN_USERS")
+    
+    # Domain events (mission progress); events beyond this many queued are dropped
+    DOMAIN_EVENT_QUEUE_SIZE: int = Field(default=10000, env="DOMAIN_EVENT_QUEUE_SIZE")
+    
+    # XP leaderboards ("memory" per process, or "redis" shared sorted sets)
+    LEADERBOARD_BACKEND: str = Field(default="memory", env="LEADERBOARD_BACKEND")
+    LEADERBOARD_SYNC_SECONDS: int = Field(default=60, env="LEADERBOARD_SYNC_SECONDS")
+    REDIS_URL: str = Field(default="redis://localhost:6379/0", env="REDIS_URL")
+    
+    # Push notifications ("log" or "mock" provider); repeats within the coalescing window are merged
+    PUSH_PROVIDER: str = Field(default="log", env="PUSH_PROVIDER")
+    PUSH_COALESCE_SECONDS: int = Field(default=30, env="PUSH_COALESCE_SECONDS")
+    PUSH_BATCH_SIZE: int = Field(default=500, env="PUSH_BATCH_SIZE")
+    PUSH_MAX_ATTEMPTS: int = Field(default=5, env="PUSH_MAX_ATTEMPTS")
+    PUSH_DISPATCH_INTERVAL_SECONDS: float = Field(default=1.0, env="PUSH_DISPATCH_INTERVAL_SECONDS")
+    
+    # Nudges: per-user cap (token bucket) and who counts as inactive
+    NUDGE_MAX_PER_DAY: float = Field(default=1.0, env="NUDGE_MAX_PER_DAY")
+    NUDGE_BURST: int = Field(default=2, env="NUDGE_BURST")
+    NUDGE_INACTIVE_DAYS: int = Field(default=3, env="NUDGE_INACTIVE_DAYS")
+    NUDGE_LOOKBACK_DAYS: int = Field(default=30, env="NUDGE_LOOKBACK_DAYS")
+    NUDGE_BATCH_SIZE: int = Field(default=1000, env="NUDGE_BATCH_SIZE")
+    
     # Logging
     LOG_LEVEL: str = Field(default="INFO", env="LOG_LEVEL")
     LOG_FILE: Optional[str] = Field(default=None, env="LOG_FILE")
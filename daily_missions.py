@@ -0,0 +1,182 @@
+"""
+Daily missions: the weekly mission pool and bulk creation of a day's missions.
+
+The materializer job runs shortly before midnight UTC and creates the next
+day's missions for recently active users in batched multi-row INSERTs, so
+/missions/daily is a single indexed read instead of every user inserting
+their own rows right after midnight. ensure_daily_missions is the lazy
+fallback for users the job did not cover. Both rely on the unique
+(user_id, mission_date, mission_type) index and ON CONFLICT DO NOTHING, so
+they never create duplicates.
+"""
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional
+
+from sqlalchemy import select
+
+from config import settings
+from database import SessionLocal, insert_for
+from models import Mission, User
+
+logger = logging.getLogger(__name__)
+
+# Expanded mission pool with weekly rotation. Missions with an "event" are
+# completed automatically by mission_progress once `target` events arrive
+# ("distinct": count different subjects, "per_subject": target within one
+# subject); the rest are completed with POST /missions/complete.
+MISSION_POOL = {
+    "monday": [
+        {"type": "start_conversation", "description": "Start 2 conversations", "xp": 15, "event": "conversation_started", "target": 2},
+        {"type": "add_match", "description": "Add a new match", "xp": 15, "event": "match_created", "target": 1},
+        {"type": "send_messages", "description": "Send 5 messages", "xp": 10, "event": "message_sent", "target": 5},
+    ],
+    "tuesday": [
+        {"type": "check_hotspots", "description": "Check the hotspot map", "xp": 10, "event": "hotspots_viewed", "target": 1},
+        {"type": "update_location", "description": "Update your location", "xp": 10, "event": "location_updated", "target": 1},
+        {"type": "visit_nearby", "description": "View 3 nearby users", "xp": 15, "event": "nearby_user_viewed", "target": 3, "distinct": True},
+    ],
+    "wednesday": [
+        {"type": "update_profile", "description": "Update your bio or interests", "xp": 15, "event": "profile_updated", "target": 1},
+        {"type": "upload_photo", "description": "Upload or update profile photo", "xp": 20, "event": "photo_uploaded", "target": 1},
+        {"type": "set_mood", "description": "Set your mood status", "xp": 10, "event": "mood_set", "target": 1},
+    ],
+    "thursday": [
+        {"type": "reveal_identity", "description": "Reveal your identity to someone", "xp": 25, "event": "identity_revealed", "target": 1},
+        {"type": "accept_match", "description": "Accept a match request", "xp": 15, "event": "match_received", "target": 1},
+        {"type": "long_conversation", "description": "Have a 10+ message conversation", "xp": 20, "event": "message_sent", "target": 10, "per_subject": True},
+    ],
+    "friday": [
+        {"type": "weekend_prep", "description": "Update profile for weekend", "xp": 15, "event": "profile_updated", "target": 1},
+        {"type": "browse_profiles", "description": "View 5 user profiles", "xp": 10, "event": "profile_viewed", "target": 5, "distinct": True},
+        {"type": "active_chat", "description": "Chat with 3 different matches", "xp": 20, "event": "message_sent", "target": 3, "distinct": True},
+    ],
+    "saturday": [
+        {"type": "weekend_warrior", "description": "Send 10 messages today", "xp": 20, "event": "message_sent", "target": 10},
+        {"type": "new_connections", "description": "Add 2 new matches", "xp": 25, "event": "match_created", "target": 2},
+        {"type": "explore_hotspots", "description": "Check hotspots in your area", "xp": 15, "event": "nearby_activity_viewed", "target": 1},
+    ],
+    "sunday": [
+        {"type": "weekly_review", "description": "Review your matches", "xp": 10, "event": "matches_viewed", "target": 1},
+        {"type": "complete_profile", "description": "Ensure profile is 100% complete", "xp": 20},
+        {"type": "plan_week", "description": "Set mood for the week ahead", "xp": 15, "event": "mood_set", "target": 1},
+    ],
+}
+
+# Special event missions (can be added to any day)
+SPECIAL_MISSIONS = [
+    {"type": "first_reveal", "description": "Make your first identity reveal", "xp": 50, "one_time": True},
+    {"type": "verified_user", "description": "Verify your photo", "xp": 30, "one_time": True},
+    {"type": "social_butterfly", "description": "Have 5 active matches", "xp": 40, "milestone": True},
+]
+
+# Mission types completed by events rather than POST /missions/complete
+EVENT_TRACKED_TYPES = frozenset(
+    mission_def["type"] for missions in MISSION_POOL.values() for mission_def in missions if "event" in mission_def
+)
+
+def get_day_of_week(day: Optional[date] = None):
+    """Get the day of week (default: today, UTC) in lowercase"""
+    return (day or datetime.utcnow().date()).strftime("%A").lower()
+
+
+def missions_for(day: date) -> list:
+    """Mission definitions for a day"""
+    return MISSION_POOL.get(get_day_of_week(day), MISSION_POOL["monday"])
+
+
+def _mission_rows(user_ids: List[int], day: date) -> List[dict]:
+    # created_at is the start of the mission's day, also for rows created the evening before
+    created_at = datetime.combine(day, time.min)
+    return [
+        {
+            "user_id": user_id,
+            "mission_type": mission_def["type"],
+            "mission_date": day,
+            "xp_reward": mission_def["xp"],
+            "progress": 0,
+            "target": mission_def.get("target", 1),
+            "completed": False,
+            "created_at": created_at,
+        }
+        for user_id in user_ids
+        for mission_def in missions_for(day)
+    ]
+
+
+def insert_daily_missions(db, user_ids: List[int], day: date) -> int:
+    """Bulk-insert a day's missions for the given users, skipping existing ones. Caller commits."""
+    if not user_ids:
+        return 0
+    insert = insert_for(db)
+    result = db.execute(
+        insert(Mission)
+        .values(_mission_rows(user_ids, day))
+        .on_conflict_do_nothing(index_elements=["user_id", "mission_date", "mission_type"])
+    )
+    return max(result.rowcount or 0, 0)
+
+
+def ensure_daily_missions(db, user_id: int, day: date) -> bool:
+    """Lazy fallback: create a user's missions for `day` if missing. Returns True if any were created."""
+    created = insert_daily_missions(db, [user_id], day)
+    db.commit()
+    return created > 0
+
+
+def materialize_daily_missions(db, day: date, active_days: int = 7, batch_size: int = 1000) -> dict:
+    """Create `day`'s missions for every user active in the last `active_days` days"""
+    active_since = datetime.utcnow() - timedelta(days=active_days)
+    users = 0
+    created = 0
+    last_id = 0
+    while True:
+        user_ids = db.scalars(
+            select(User.id)
+            .where(User.id > last_id, User.last_location_update >= active_since)
+            .order_by(User.id)
+            .limit(batch_size)
+        ).all()
+        if not user_ids:
+            break
+        created += insert_daily_missions(db, user_ids, day)
+        db.commit()
+        users += len(user_ids)
+        last_id = user_ids[-1]
+
+    logger.info(f"Materialized {created} missions for {users} active users on {day}")
+    return {"day": day.isoformat(), "users": users, "missions": created}
+
+
+def run_materializer_job():
+    """Entry point for the scheduler: create tomorrow's missions"""
+    db = SessionLocal()
+    try:
+        materialize_daily_missions(
+            db,
+            datetime.utcnow().date() + timedelta(days=1),
+            active_days=settings.MISSION_ACTIVE_DAYS,
+            batch_size=settings.MISSION_MATERIALIZE_BATCH_SIZE
+        )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Create daily missions for recently active users")
+    parser.add_argument("--date", type=date.fromisoformat, default=None, help="YYYY-MM-DD (default: tomorrow, UTC)")
+    args = parser.parse_args()
+
+    day = args.date or datetime.utcnow().date() + timedelta(days=1)
+    db = SessionLocal()
+    try:
+        result = materialize_daily_missions(
+            db, day,
+            active_days=settings.MISSION_ACTIVE_DAYS,
+            batch_size=settings.MISSION_MATERIALIZE_BATCH_SIZE
+        )
+        print(f"✅ Created {result['missions']} missions for {result['users']} users on {result['day']}")
+    finally:
+        db.close()
@@ -0,0 +1,154 @@
+"""
+Ranked discovery feed.
+
+Candidates are scored on distance, recency of their last location update,
+shared interests (from the interest index), mood and level, combined with
+the DISCOVERY_WEIGHT_* settings. Scoring is done a batch at a time, one
+feature column at a time, and only the best `limit` candidates are kept in a
+bounded heap, so the full candidate list is never sorted.
+"""
+import heapq
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Sequence
+
+from config import settings
+from interest_index import interest_index
+from models import User
+from utils import haversine_distance
+
+BATCH_SIZE = 500
+RECENCY_HORIZON_HOURS = 72  # matches the /matches/nearby activity cutoff
+MAX_LEVEL_GAP = 10
+
+MOOD_GROUPS = {
+    "happy": "positive", "excited": "positive", "calm": "positive", "loved": "positive",
+    "sad": "low", "anxious": "low", "stressed": "low", "lonely": "low",
+}
+
+# Columns loaded per candidate, in the order the scorer expects them
+CANDIDATE_COLUMNS = (
+    User.id, User.anonymous_handle, User.bio, User.interests, User.mood_status,
+    User.profile_photo_url, User.level, User.last_location_update, User.latitude, User.longitude,
+)
+
+def weights() -> dict:
+    return {
+        "distance": settings.DISCOVERY_WEIGHT_DISTANCE,
+        "recency": settings.DISCOVERY_WEIGHT_RECENCY,
+        "interests": settings.DISCOVERY_WEIGHT_INTERESTS,
+        "mood": settings.DISCOVERY_WEIGHT_MOOD,
+        "level": settings.DISCOVERY_WEIGHT_LEVEL,
+    }
+
+
+def _distance_scores(distances: Sequence[float], radius: float) -> List[float]:
+    return [max(0.0, 1 - d / radius) for d in distances]
+
+
+def _recency_scores(updated: Sequence[Optional[datetime]], now: datetime) -> List[float]:
+    horizon = RECENCY_HORIZON_HOURS * 3600
+    return [
+        max(0.0, 1 - (now - t).total_seconds() / horizon) if t else 0.0
+        for t in updated
+    ]
+
+
+def _interest_scores(user_ids: Sequence[int], mine: frozenset) -> List[float]:
+    """Jaccard similarity of interest id sets"""
+    if not mine:
+        return [0.0] * len(user_ids)
+    scores = []
+    for user_id in user_ids:
+        theirs = interest_index.user_interests(user_id)
+        shared = len(mine & theirs)
+        scores.append(shared / (len(mine) + len(theirs) - shared) if shared else 0.0)
+    return scores
+
+
+def _mood_scores(moods: Sequence[Optional[str]], mine: Optional[str]) -> List[float]:
+    """1 for the same mood, 0.5 for a mood in the same group, else 0"""
+    if not mine:
+        return [0.0] * len(moods)
+    my_group = MOOD_GROUPS.get(mine)
+    return [
+        1.0 if mood == mine else 0.5 if my_group and MOOD_GROUPS.get(mood) == my_group else 0.0
+        for mood in moods
+    ]
+
+
+def _level_scores(levels: Sequence[Optional[int]], mine: int) -> List[float]:
+    return [max(0.0, 1 - abs((level or 1) - mine) / MAX_LEVEL_GAP) for level in levels]
+
+
+def score_batch(viewer: User, rows: Sequence[tuple], distances: Sequence[float], radius: float,
+                now: datetime, w: dict, my_interests: frozenset) -> List[float]:
+    """Scores for a batch of CANDIDATE_COLUMNS rows, computed column by column"""
+    user_ids, _, _, _, moods, _, levels, updated, _, _ = zip(*rows)
+    columns = (
+        (w["distance"], _distance_scores(distances, radius)),
+        (w["recency"], _recency_scores(updated, now)),
+        (w["interests"], _interest_scores(user_ids, my_interests)),
+        (w["mood"], _mood_scores(moods, viewer.mood_status)),
+        (w["level"], _level_scores(levels, viewer.level or 1)),
+    )
+    totals = [0.0] * len(rows)
+    for weight, scores in columns:
+        if weight:
+            totals = [total + weight * score for total, score in zip(totals, scores)]
+    return totals
+
+
+def rank_candidates(db, viewer: User, candidate_ids: Iterable[int], radius: float,
+                    limit: int = 20, exclude_ids: Optional[set] = None) -> List[dict]:
+    """
+    Top `limit` candidates within `radius` of the viewer, best first.
+    Candidate rows are loaded and scored BATCH_SIZE at a time.
+    """
+    exclude_ids = exclude_ids or set()
+    eligible = [user_id for user_id in candidate_ids if user_id not in exclude_ids]
+    now = datetime.utcnow()
+    active_since = now - timedelta(hours=RECENCY_HORIZON_HOURS)
+    w = weights()
+    my_interests = interest_index.user_interests(viewer.id)
+
+    heap: List[tuple] = []  # (score, -user id, row, distance); lowest score on top
+    for start in range(0, len(eligible), BATCH_SIZE):
+        rows = db.query(*CANDIDATE_COLUMNS).filter(
+            User.id.in_(eligible[start:start + BATCH_SIZE]),
+            User.last_location_update >= active_since,
+            User.latitude.isnot(None),
+            User.longitude.isnot(None)
+        ).all()
+
+        # Current distances; candidates may have moved since the list was built
+        in_range = []
+        for row in rows:
+            distance = haversine_distance(viewer.latitude, viewer.longitude, row.latitude, row.longitude)
+            if distance <= radius:
+                in_range.append((row, distance))
+        if not in_range:
+            continue
+        rows, distances = zip(*in_range)
+        scores = score_batch(viewer, rows, distances, radius, now, w, my_interests)
+        for score, row, distance in zip(scores, rows, distances):
+            item = (score, -row.id, row, distance)
+            if len(heap) < limit:
+                heapq.heappush(heap, item)
+            elif item[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, item)
+
+    ranked = sorted(heap, key=lambda item: item[:2], reverse=True)
+    return [
+        {
+            "id": row.id,
+            "anonymous_handle": row.anonymous_handle,
+            "bio": row.bio,
+            "interests": row.interests,
+            "mood_status": row.mood_status,
+            "profile_photo_url": row.profile_photo_url,
+            "level": row.level,
+            "distance": round(distance, 2),
+            "score": round(score, 4)
+        }
+        for score, _, row, distance in ranked
+    ]
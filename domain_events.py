@@ -0,0 +1,141 @@
+"""
+In-process domain event bus.
+
+Request handlers publish small facts ("message_sent", "photo_uploaded", ...)
+after their transaction commits. publish() only enqueues, so it never slows
+the request down; a consumer thread drains the queue in batches and hands
+each batch to the subscribers (e.g. mission progress tracking). When the
+queue is full or the bus is not running, events are dropped and counted.
+"""
+import logging
+import queue
+import threading
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class DomainEvent(NamedTuple):
+    name: str
+    user_id: int
+    subject_id: Optional[int]  # the other user, match, ... the event is about
+    occurred_at: datetime
+
+
+class EventBus:
+    def __init__(self, max_queue_size: int = 10000, max_batch_size: int = 100):
+        self.max_batch_size = max_batch_size
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self._subscribers: List[Callable[[List[DomainEvent]], None]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.failed_batches = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def subscribe(self, handler: Callable[[List[DomainEvent]], None]):
+        """Register a handler; it is called from the consumer thread with a batch of events"""
+        if handler not in self._subscribers:
+            self._subscribers.append(handler)
+
+    def start(self):
+        """Start the consumer thread"""
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name="domain-events", daemon=True)
+        self._thread.start()
+        logger.info(f"Domain event bus started ({len(self._subscribers)} subscribers)")
+
+    def stop(self, timeout: float = 5.0):
+        """Deliver whatever is queued and stop the consumer thread"""
+        if not self.running:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info("Domain event bus stopped")
+
+    def publish(self, name: str, user_id: int, subject_id: Optional[int] = None) -> bool:
+        """Queue an event without blocking. Returns False if it was dropped."""
+        event = DomainEvent(name, user_id, subject_id, datetime.utcnow())
+        if not self.running:
+            with self._stats_lock:
+                self.dropped += 1
+            return False
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            logger.warning(f"Domain event queue full, dropping {name} for user {user_id}")
+            with self._stats_lock:
+                self.dropped += 1
+            return False
+        with self._stats_lock:
+            self.published += 1
+        return True
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            while len(batch) < self.max_batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._deliver(batch)
+
+        # Deliver anything published while stopping
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftover.append(item)
+        for start in range(0, len(leftover), self.max_batch_size):
+            self._deliver(leftover[start:start + self.max_batch_size])
+
+    def _deliver(self, batch: List[DomainEvent]):
+        for handler in self._subscribers:
+            try:
+                handler(batch)
+            except Exception as e:
+                logger.error(f"Event handler {handler.__name__} failed on a batch of {len(batch)}: {e}")
+                with self._stats_lock:
+                    self.failed_batches += 1
+        with self._stats_lock:
+            self.delivered += len(batch)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "running": self.running,
+                "queued": self._queue.qsize(),
+                "subscribers": len(self._subscribers),
+                "published": self.published,
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "failed_batches": self.failed_batches,
+            }
+
+
+# Global bus (started from main.py)
+event_bus = EventBus(max_queue_size=settings.DOMAIN_EVENT_QUEUE_SIZE)
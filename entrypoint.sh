@@ -8,15 +8,8 @@ done
 
 echo "Database is ready!"
 
-# Create tables
-python -c "
-from database import engine, Base
-from models import User, Match, Message, Mission
-
-print('Creating database tables...')
-Base.metadata.create_all(bind=engine)
-print('Database tables created successfully!')
-"
+# Schema migrations run as a separate step (see the migrate service in
+# docker-compose.yml); the app only checks the schema revision at startup
 
 # Start the application
 exec uvicorn main:app --host 0.0.0.0 --port 8000 --reload
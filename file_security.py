@@ -2,12 +2,17 @@
 Enhanced file upload security with magic byte validation.
 """
 import os
+import tempfile
 from pathlib import Path
+from typing import Callable
 from fastapi import UploadFile, HTTPException
 from config import settings
 import hashlib
 import uuid
 
+# Uploads are copied this many bytes at a time, so memory per upload stays constant
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
 # Allowed MIME types with their magic bytes
 ALLOWED_MIME_TYPES = {
     'image/jpeg': [b'\xff\xd8\xff'],
@@ -53,6 +58,64 @@ def sanitize_filename(filename: str) -> str:
     
     return f"{unique_id}_{name}{ext}"
 
+async def stream_upload(
+    file: UploadFile,
+    directory: Path,
+    filename_for: Callable[[str], str],
+    max_size: int,
+    chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> Path:
+    """
+    Copy an upload into `directory` chunk by chunk, hashing as it goes.
+    
+    The first chunk must start with image magic bytes and the copy stops as
+    soon as it passes `max_size`, so bad uploads are rejected before the rest
+    is read. Data goes to a temp file that is renamed to
+    filename_for(sha256 hex digest) once complete.
+    
+    Returns:
+        Path: Saved file
+    
+    Raises:
+        HTTPException: If validation fails (the temp file is removed)
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(dir=directory, suffix=".part")
+    temp_path = Path(temp_name)
+    try:
+        sha256_hash = hashlib.sha256()
+        size = 0
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                if size == 0 and not validate_magic_bytes(chunk):
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Invalid image file. File content does not match image format"
+                    )
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"File too large. Max size is {max_size // 1048576}MB"
+                    )
+                sha256_hash.update(chunk)
+                out.write(chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Empty file")
+        
+        file_path = directory / filename_for(sha256_hash.hexdigest())
+        # Ensure file_path is within directory (prevent path traversal)
+        if not file_path.resolve().is_relative_to(directory.resolve()):
+            raise HTTPException(status_code=400, detail="Invalid file path")
+        os.replace(temp_path, file_path)
+        return file_path
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+
 async def validate_and_save_upload(
     file: UploadFile,
     upload_dir: str = "uploads"
@@ -73,38 +136,13 @@ async def validate_and_save_upload(
             detail=f"File type not allowed. Allowed types: {', '.join(settings.get_allowed_extensions_list())}"
         )
     
-    # Validate size
-    if not validate_file_size(file):
-        max_mb = settings.MAX_UPLOAD_SIZE / 1048576
-        raise HTTPException(
-            status_code=400,
-            detail=f"File too large. Maximum size: {max_mb}MB"
-        )
-    
-    # Read file content
-    content = await file.read()
-    await file.seek(0)
-    
-    # Validate magic bytes
-    if not validate_magic_bytes(content):
-        raise HTTPException(
-            status_code=400,
-            detail="Invalid file content. File may be corrupted or not a valid image."
-        )
-    
-    # Create upload directory
-    upload_path = Path(upload_dir)
-    upload_path.mkdir(exist_ok=True)
-    
-    # Sanitize filename
+    # Validate content and size while saving
     safe_filename = sanitize_filename(file.filename)
-    file_path = upload_path / safe_filename
-    
-    # Save file
-    with open(file_path, "wb") as f:
-        f.write(content)
+    file_path = await stream_upload(
+        file, Path(upload_dir), lambda digest: safe_filename, settings.MAX_UPLOAD_SIZE
+    )
     
-    return safe_filename
+    return file_path.name
 
 def calculate_file_hash(file_path: Path) -> str:
     """Calculate SHA256 hash of file for integrity checking"""
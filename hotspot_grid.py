@@ -0,0 +1,269 @@
+"""
+Incrementally maintained hotspot tile pyramid.
+
+Instead of scanning every recently active user on each /hotspots/areas
+request, update_location moves the user's count from their previous cell to
+the new one. Counts are kept per hour bucket (the hour of the user's last
+location update), so users age out of the 24h window simply because their
+bucket does: reads sum the live buckets and old buckets are pruned hourly.
+
+Cells form a pyramid. Level 0 is the 0.1° grid; the parent of a cell at
+level k is its index shifted right by one, so a level k cell is
+0.1° * 2**k wide and covers 2**k x 2**k level 0 cells. Every level is
+maintained on write, so zoomed-out maps read a handful of coarse cells
+instead of summing fine ones.
+"""
+import logging
+import math
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import Integer, and_, cast, delete, func, or_, select, update
+
+from database import SessionLocal, insert_for
+from models import HotspotCellBucket, User
+
+logger = logging.getLogger(__name__)
+
+GRID_SIZE = 0.1  # degrees, level 0
+MAX_LEVEL = 7  # 12.8° cells
+MAX_CELLS_ACROSS = 32  # viewport resolution target when picking a level
+WINDOW = timedelta(hours=24)
+MIN_USERS_PER_CELL = 3  # privacy: never reveal cells with fewer users, at any level
+
+
+def cell_for(latitude: float, longitude: float, level: int = 0) -> Tuple[int, int]:
+    """Cell indices at `level` (level 0 is latitude and longitude rounded to GRID_SIZE)"""
+    return (
+        math.floor(latitude / GRID_SIZE + 0.5) >> level,
+        math.floor(longitude / GRID_SIZE + 0.5) >> level,
+    )
+
+
+def cell_size(level: int) -> float:
+    return GRID_SIZE * (1 << level)
+
+
+def cell_center(index: int, level: int) -> float:
+    """Center coordinate of a cell along one axis"""
+    span = 1 << level
+    return round((index * span + (span - 1) / 2) * GRID_SIZE, 6)
+
+
+def _cell_edge(index: int, level: int) -> float:
+    """Lower edge of a cell along one axis"""
+    return ((index << level) - 0.5) * GRID_SIZE
+
+
+def level_for_viewport(min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> int:
+    """Finest level that keeps the viewport at most MAX_CELLS_ACROSS cells wide and tall"""
+    lon_span = max_lon - min_lon if max_lon >= min_lon else 360 - (min_lon - max_lon)
+    span = max(max_lat - min_lat, lon_span)
+    for level in range(MAX_LEVEL + 1):
+        if span / cell_size(level) <= MAX_CELLS_ACROSS:
+            return level
+    return MAX_LEVEL
+
+
+def bucket_for(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def window_start(now: Optional[datetime] = None) -> datetime:
+    """Oldest bucket still inside the window"""
+    return bucket_for((now or datetime.utcnow()) - WINDOW)
+
+
+def _pyramid_keys(latitude: float, longitude: float, moment: datetime) -> dict:
+    """level -> (bucket, cell) for every level of the pyramid"""
+    bucket = bucket_for(moment)
+    return {level: (bucket, cell_for(latitude, longitude, level)) for level in range(MAX_LEVEL + 1)}
+
+
+def _increment(db, keys: dict, amount: int = 1):
+    insert = insert_for(db)
+    stmt = insert(HotspotCellBucket).values([
+        {"level": level, "bucket_start": bucket, "cell_lat": cell[0], "cell_lon": cell[1], "count": amount}
+        for level, (bucket, cell) in keys.items()
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["level", "cell_lat", "cell_lon", "bucket_start"],
+        set_={"count": HotspotCellBucket.count + stmt.excluded.count}
+    ))
+
+
+def _decrement(db, keys: dict):
+    db.execute(
+        update(HotspotCellBucket)
+        .where(
+            or_(*[
+                and_(
+                    HotspotCellBucket.level == level,
+                    HotspotCellBucket.cell_lat == cell[0],
+                    HotspotCellBucket.cell_lon == cell[1],
+                    HotspotCellBucket.bucket_start == bucket
+                )
+                for level, (bucket, cell) in keys.items()
+            ]),
+            HotspotCellBucket.count > 0
+        )
+        .values(count=HotspotCellBucket.count - 1)
+    )
+
+
+def record_move(db, old_lat, old_lon, old_time, new_lat: float, new_lon: float, new_time: datetime):
+    """
+    Move one user's count from their previous cells to the new ones, at every
+    level where they differ. Runs in the caller's transaction.
+    """
+    new_keys = _pyramid_keys(new_lat, new_lon, new_time)
+
+    old_keys = {}
+    if old_lat is not None and old_lon is not None and old_time is not None:
+        if bucket_for(old_time) >= window_start(new_time):
+            old_keys = _pyramid_keys(old_lat, old_lon, old_time)
+
+    # Small moves usually stay inside the same coarse cells
+    changed = [level for level in new_keys if old_keys.get(level) != new_keys[level]]
+    if not changed:
+        return
+    if old_keys:
+        _decrement(db, {level: old_keys[level] for level in changed})
+    _increment(db, {level: new_keys[level] for level in changed})
+
+
+def _viewport_filter(level: int, min_lat: float, min_lon: float, max_lat: float, max_lon: float):
+    low_lat, low_lon = cell_for(min_lat, min_lon, level)
+    high_lat, high_lon = cell_for(max_lat, max_lon, level)
+    lat_range = HotspotCellBucket.cell_lat.between(low_lat, high_lat)
+    if min_lon <= max_lon:
+        return and_(lat_range, HotspotCellBucket.cell_lon.between(low_lon, high_lon))
+    # Viewport crosses the antimeridian: [min_lon, 180] + [-180, max_lon]
+    return and_(lat_range, or_(
+        HotspotCellBucket.cell_lon >= low_lon,
+        HotspotCellBucket.cell_lon <= high_lon
+    ))
+
+
+def get_hotspot_cells(db, level: int = 0, viewport: Optional[tuple] = None, min_users: int = MIN_USERS_PER_CELL) -> list:
+    """
+    Cells at `level` with at least `min_users` users active in the window,
+    optionally limited to a (min_lat, min_lon, max_lat, max_lon) viewport
+    """
+    total = func.sum(HotspotCellBucket.count)
+    query = (
+        select(HotspotCellBucket.cell_lat, HotspotCellBucket.cell_lon, total.label("count"))
+        .where(HotspotCellBucket.level == level, HotspotCellBucket.bucket_start >= window_start())
+        .group_by(HotspotCellBucket.cell_lat, HotspotCellBucket.cell_lon)
+        .having(total >= min_users)
+    )
+    if viewport:
+        query = query.where(_viewport_filter(level, *viewport))
+
+    return [
+        {
+            "latitude": cell_center(row.cell_lat, level),
+            "longitude": cell_center(row.cell_lon, level),
+            "count": row.count
+        }
+        for row in db.execute(query)
+    ]
+
+
+def aggregate_hotspot_cells(db, level: int = 0, viewport: Optional[tuple] = None, min_users: int = MIN_USERS_PER_CELL) -> list:
+    """
+    Same result as get_hotspot_cells, computed from the users table with a
+    GROUP BY so only qualifying cells leave the database. Used when
+    HOTSPOT_SOURCE is "sql"; cell indices match cell_for (floor(x / g + 0.5)
+    is round(x / g)).
+    """
+    span = 1 << level
+    cell_lat = cast(func.floor(func.floor(User.latitude / GRID_SIZE + 0.5) / span), Integer).label("cell_lat")
+    cell_lon = cast(func.floor(func.floor(User.longitude / GRID_SIZE + 0.5) / span), Integer).label("cell_lon")
+    total = func.count()
+
+    query = (
+        select(cell_lat, cell_lon, total.label("count"))
+        .where(
+            User.latitude.isnot(None),
+            User.longitude.isnot(None),
+            User.last_location_update >= window_start()
+        )
+        .group_by(cell_lat, cell_lon)
+        .having(total >= min_users)
+    )
+    if viewport:
+        # Whole cells touching the viewport, as in get_hotspot_cells
+        min_lat, min_lon, max_lat, max_lon = viewport
+        low_lat, low_lon = cell_for(min_lat, min_lon, level)
+        high_lat, high_lon = cell_for(max_lat, max_lon, level)
+        query = query.where(
+            User.latitude >= _cell_edge(low_lat, level),
+            User.latitude < _cell_edge(high_lat + 1, level)
+        )
+        if min_lon <= max_lon:
+            query = query.where(
+                User.longitude >= _cell_edge(low_lon, level),
+                User.longitude < _cell_edge(high_lon + 1, level)
+            )
+        else:
+            query = query.where(or_(
+                User.longitude >= _cell_edge(low_lon, level),
+                User.longitude < _cell_edge(high_lon + 1, level)
+            ))
+
+    return [
+        {
+            "latitude": cell_center(row.cell_lat, level),
+            "longitude": cell_center(row.cell_lon, level),
+            "count": row.count
+        }
+        for row in db.execute(query)
+    ]
+
+
+def prune_expired_buckets(db) -> int:
+    """Delete buckets that have left the window"""
+    result = db.execute(delete(HotspotCellBucket).where(HotspotCellBucket.bucket_start < window_start()))
+    db.commit()
+    return result.rowcount
+
+
+def rebuild_grid(db, batch_size: int = 10000) -> int:
+    """Recompute all levels from the users table (initial fill or repair)"""
+    counts = {}
+    users = 0
+    rows = db.execute(
+        select(User.latitude, User.longitude, User.last_location_update)
+        .where(
+            User.latitude.isnot(None),
+            User.longitude.isnot(None),
+            User.last_location_update >= window_start()
+        )
+        .execution_options(yield_per=batch_size)
+    )
+    for latitude, longitude, updated_at in rows:
+        users += 1
+        for level, key in _pyramid_keys(latitude, longitude, updated_at).items():
+            counts[(level, key)] = counts.get((level, key), 0) + 1
+
+    db.execute(delete(HotspotCellBucket))
+    if counts:
+        db.execute(
+            HotspotCellBucket.__table__.insert(),
+            [
+                {"level": level, "bucket_start": bucket, "cell_lat": cell[0], "cell_lon": cell[1], "count": count}
+                for (level, (bucket, cell)), count in counts.items()
+            ]
+        )
+    return users
+
+
+def run_prune_job():
+    """Entry point for the scheduler"""
+    db = SessionLocal()
+    try:
+        pruned = prune_expired_buckets(db)
+        logger.info(f"Pruned {pruned} expired hotspot buckets")
+    finally:
+        db.close()
@@ -0,0 +1,252 @@
+"""
+Normalized interests and an in-memory inverted index over them.
+
+User.interests stays the free text the user typed; on every profile update it
+is tokenized into the interests / user_interests tables. The index keeps, per
+interest, a sorted array of user ids (4 bytes per user), plus each user's set
+of interest ids, so shared-interest scoring and "people near you who like X"
+are integer set operations instead of string comparisons.
+
+The index is loaded on first use and kept current by this process's profile
+updates. Every change is also logged in interest_changes, and refresh() (a
+scheduler job on every instance) re-reads just the users logged since its
+last check, so changes made by other instances arrive without a full reload.
+"""
+import logging
+import re
+import threading
+from array import array
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, select
+
+from database import SessionLocal, insert_for
+from models import Interest, InterestChange, UserInterest
+
+logger = logging.getLogger(__name__)
+
+MAX_INTEREST_LENGTH = 100
+MAX_INTERESTS_PER_USER = 30
+
+# Changes are re-read this far back, for transactions that committed late
+# and for clock skew between instances
+CHANGE_OVERLAP = timedelta(seconds=60)
+# Logged changes are kept this long; an index that hasn't checked since is reloaded
+CHANGE_RETENTION = timedelta(days=1)
+
+_INTEREST_SEPARATORS = re.compile(r"[,;/|\n]+")
+
+
+def tokenize_interests(interests: Optional[str]) -> frozenset:
+    """Free-text interests ("Hiking, jazz; cooking") as a set of normalized tokens"""
+    if not interests:
+        return frozenset()
+    tokens = []
+    for token in _INTEREST_SEPARATORS.split(interests):
+        token = " ".join(token.split()).lower()[:MAX_INTEREST_LENGTH]
+        if token and token not in tokens:
+            tokens.append(token)
+    return frozenset(tokens[:MAX_INTERESTS_PER_USER])
+
+
+def _interest_ids(db, names: Iterable[str]) -> Dict[str, int]:
+    """name -> id, creating missing interests"""
+    names = sorted(set(names))
+    if not names:
+        return {}
+    insert = insert_for(db)
+    db.execute(
+        insert(Interest).values([{"name": name} for name in names]).on_conflict_do_nothing(index_elements=["name"])
+    )
+    rows = db.execute(select(Interest.name, Interest.id).where(Interest.name.in_(names)))
+    return {name: interest_id for name, interest_id in rows}
+
+
+def sync_user_interests(db, user_id: int, interests: Optional[str]) -> Dict[str, int]:
+    """Replace a user's user_interests rows with the tokens of `interests`. Caller commits."""
+    ids = _interest_ids(db, tokenize_interests(interests))
+    changed = db.execute(
+        delete(UserInterest).where(
+            UserInterest.user_id == user_id,
+            UserInterest.interest_id.notin_(ids.values())
+        )
+    ).rowcount
+    if ids:
+        insert = insert_for(db)
+        changed += db.execute(
+            insert(UserInterest)
+            .values([{"user_id": user_id, "interest_id": interest_id} for interest_id in ids.values()])
+            .on_conflict_do_nothing(index_elements=["user_id", "interest_id"])
+        ).rowcount
+    if changed:
+        # Picked up by the other instances' indexes
+        db.add(InterestChange(user_id=user_id, changed_at=datetime.utcnow()))
+    return ids
+
+
+class InterestIndex:
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._checked_at: Optional[datetime] = None  # changes logged from here on are not applied yet
+        self._ids: Dict[str, int] = {}  # name -> interest id
+        self._postings: Dict[int, array] = {}  # interest id -> sorted user ids
+        self._by_user: Dict[int, frozenset] = {}  # user id -> interest ids
+
+    def reload(self, db=None):
+        """Rebuild the index from the database"""
+        own_session = db is None
+        db = db or self.session_factory()
+        try:
+            # Taken first: changes committed during the load are applied by the next refresh
+            checked_at = datetime.utcnow()
+            ids = {name: interest_id for interest_id, name in db.execute(select(Interest.id, Interest.name))}
+            postings: Dict[int, array] = {}
+            by_user: Dict[int, set] = {}
+            rows = db.execute(
+                select(UserInterest.interest_id, UserInterest.user_id)
+                .order_by(UserInterest.interest_id, UserInterest.user_id)
+                .execution_options(yield_per=10000)
+            )
+            for interest_id, user_id in rows:
+                postings.setdefault(interest_id, array("I")).append(user_id)
+                by_user.setdefault(user_id, set()).add(interest_id)
+        finally:
+            if own_session:
+                db.close()
+
+        with self._lock:
+            self._ids = ids
+            self._postings = postings
+            self._by_user = {user_id: frozenset(s) for user_id, s in by_user.items()}
+            self._checked_at = checked_at
+            self._loaded = True
+        logger.info(f"Interest index loaded: {len(ids)} interests, {len(by_user)} users")
+
+    def refresh(self, batch_size: int = 1000) -> int:
+        """Re-read the users whose interests changed since the last check. Returns how many were updated."""
+        if not self._loaded or datetime.utcnow() - self._checked_at > CHANGE_RETENTION:
+            self.reload()
+            return 0
+        checked_at = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            user_ids = sorted(set(db.scalars(
+                select(InterestChange.user_id).where(InterestChange.changed_at >= self._checked_at - CHANGE_OVERLAP)
+            )))
+            for start in range(0, len(user_ids), batch_size):
+                chunk = user_ids[start:start + batch_size]
+                current: Dict[int, Dict[str, int]] = {user_id: {} for user_id in chunk}
+                rows = db.execute(
+                    select(UserInterest.user_id, Interest.name, Interest.id)
+                    .join(Interest, Interest.id == UserInterest.interest_id)
+                    .where(UserInterest.user_id.in_(chunk))
+                )
+                for user_id, name, interest_id in rows:
+                    current[user_id][name] = interest_id
+                for user_id, ids in current.items():
+                    self.update_user(user_id, ids)
+        finally:
+            db.close()
+        self._checked_at = checked_at
+        return len(user_ids)
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.reload()
+
+    def update_user(self, user_id: int, ids: Dict[str, int]):
+        """Apply a committed sync_user_interests result"""
+        self._ensure_loaded()
+        new = frozenset(ids.values())
+        with self._lock:
+            self._ids.update(ids)
+            old = self._by_user.get(user_id, frozenset())
+            for interest_id in old - new:
+                postings = self._postings.get(interest_id)
+                if postings is not None:
+                    i = bisect_left(postings, user_id)
+                    if i < len(postings) and postings[i] == user_id:
+                        del postings[i]
+            for interest_id in new - old:
+                insort(self._postings.setdefault(interest_id, array("I")), user_id)
+            if new:
+                self._by_user[user_id] = new
+            else:
+                self._by_user.pop(user_id, None)
+
+    def interest_id(self, name: str) -> Optional[int]:
+        self._ensure_loaded()
+        tokens = tokenize_interests(name)
+        if len(tokens) != 1:
+            return None
+        return self._ids.get(next(iter(tokens)))
+
+    def user_interests(self, user_id: int) -> frozenset:
+        """Interest ids of a user"""
+        self._ensure_loaded()
+        return self._by_user.get(user_id, frozenset())
+
+    def users_with(self, name: str, candidate_ids: Iterable[int]) -> List[int]:
+        """The candidates who list interest `name`"""
+        interest_id = self.interest_id(name)
+        if interest_id is None:
+            return []
+        with self._lock:
+            postings = self._postings.get(interest_id)
+            if not postings:
+                return []
+            result = []
+            for user_id in candidate_ids:
+                i = bisect_left(postings, user_id)
+                if i < len(postings) and postings[i] == user_id:
+                    result.append(user_id)
+            return result
+
+    def popular(self, limit: int = 20) -> List[dict]:
+        """Interests with the most users"""
+        self._ensure_loaded()
+        with self._lock:
+            names = {interest_id: name for name, interest_id in self._ids.items()}
+            ranked = sorted(self._postings.items(), key=lambda item: len(item[1]), reverse=True)[:limit]
+            return [{"interest": names.get(i), "users": len(p)} for i, p in ranked if len(p)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self._loaded,
+                "checked_at": self._checked_at.isoformat() if self._checked_at else None,
+                "interests": len(self._ids),
+                "users": len(self._by_user),
+                "postings_bytes": sum(p.itemsize * len(p) for p in self._postings.values()),
+            }
+
+
+interest_index = InterestIndex()
+
+
+def prune_interest_changes(db, before: datetime) -> int:
+    """Delete logged interest changes from before `before`. Caller commits."""
+    result = db.execute(delete(InterestChange).where(InterestChange.changed_at < before))
+    return max(result.rowcount or 0, 0)
+
+
+def run_refresh_job():
+    """Entry point for the scheduler: pick up interest changes made by other instances"""
+    updated = interest_index.refresh()
+    if updated:
+        logger.info(f"Applied interest changes of {updated} users")
+
+
+def run_prune_job():
+    """Entry point for the scheduler: drop logged changes every index has applied"""
+    db = SessionLocal()
+    try:
+        pruned = prune_interest_changes(db, datetime.utcnow() - CHANGE_RETENTION)
+        db.commit()
+        logger.info(f"Pruned {pruned} interest changes")
+    finally:
+        db.close()
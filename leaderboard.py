@@ -0,0 +1,448 @@
+"""
+XP leaderboards (global and per region) served from a ranked in-memory
+structure instead of ORDER BY xp over the users table.
+
+The default backend keeps one indexable skip list per board: O(log n)
+insert/remove/rank and O(log n + k) for a page of k entries. With
+LEADERBOARD_BACKEND=redis the boards are Redis sorted sets instead, shared by
+all app instances (requires the `redis` package).
+
+Boards are warmed from the users table at startup and then updated from the
+XP-award path after each commit. Shared Redis boards are only loaded when
+they do not exist yet; a restarting instance never wipes boards that other
+instances are serving. In-memory boards only see this process's awards, so
+sync() (a scheduler job on every instance) re-reads the users with XP ledger
+entries or location updates since its last run. A user's region is a coarse
+hotspot grid cell (REGION_LEVEL, about 3.2°) of their last location.
+"""
+import logging
+import random
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, select, union
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from hotspot_grid import cell_for
+from models import User, XPLedgerEntry
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_BOARD = "global"
+REGION_LEVEL = 5  # hotspot pyramid level used for regional boards
+MAX_SKIPLIST_LEVEL = 32
+# sync() re-reads changes this far back, for late commits and clock skew between instances
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+def region_for(latitude: Optional[float], longitude: Optional[float]) -> Optional[str]:
+    if latitude is None or longitude is None:
+        return None
+    cell_lat, cell_lon = cell_for(latitude, longitude, REGION_LEVEL)
+    return f"region:{cell_lat}:{cell_lon}"
+
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, level: int):
+        self.key = key
+        self.next: List[Optional["_Node"]] = [None] * level
+        self.width: List[int] = [1] * level  # positions skipped by next[i]
+
+
+class IndexableSkipList:
+    """Sorted set of keys with O(log n) insert, remove and rank (0-based)"""
+
+    def __init__(self):
+        self.head = _Node(None, MAX_SKIPLIST_LEVEL)
+        self.level = 1
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def _random_level(self) -> int:
+        level = 1
+        while level < MAX_SKIPLIST_LEVEL and random.random() < 0.5:
+            level += 1
+        return level
+
+    def insert(self, key):
+        update = [self.head] * MAX_SKIPLIST_LEVEL
+        rank = [0] * MAX_SKIPLIST_LEVEL  # position of update[i]
+        node = self.head
+        position = 0
+        for i in reversed(range(self.level)):
+            while node.next[i] is not None and node.next[i].key < key:
+                position += node.width[i]
+                node = node.next[i]
+            update[i] = node
+            rank[i] = position
+
+        level = self._random_level()
+        if level > self.level:
+            for i in range(self.level, level):
+                update[i] = self.head
+                rank[i] = 0
+                self.head.width[i] = self.size + 1
+            self.level = level
+
+        new = _Node(key, level)
+        for i in range(level):
+            new.next[i] = update[i].next[i]
+            update[i].next[i] = new
+            # Split the span that now has `new` inside it
+            skipped = position - rank[i]
+            new.width[i] = update[i].width[i] - skipped
+            update[i].width[i] = skipped + 1
+        for i in range(level, self.level):
+            update[i].width[i] += 1
+        self.size += 1
+
+    def remove(self, key) -> bool:
+        update = [self.head] * MAX_SKIPLIST_LEVEL
+        node = self.head
+        for i in reversed(range(self.level)):
+            while node.next[i] is not None and node.next[i].key < key:
+                node = node.next[i]
+            update[i] = node
+
+        target = node.next[0]
+        if target is None or target.key != key:
+            return False
+        for i in range(self.level):
+            if update[i].next[i] is target:
+                update[i].width[i] += target.width[i] - 1
+                update[i].next[i] = target.next[i]
+            else:
+                update[i].width[i] -= 1
+        while self.level > 1 and self.head.next[self.level - 1] is None:
+            self.level -= 1
+        self.size -= 1
+        return True
+
+    def rank(self, key) -> Optional[int]:
+        node = self.head
+        position = 0
+        for i in reversed(range(self.level)):
+            while node.next[i] is not None and node.next[i].key <= key:
+                position += node.width[i]
+                node = node.next[i]
+        return position - 1 if node is not self.head and node.key == key else None
+
+    def slice(self, start: int, count: int) -> list:
+        """Keys at positions start .. start + count - 1"""
+        if start >= self.size or count <= 0:
+            return []
+        node = self.head
+        target = start + 1  # head sits at position 0
+        position = 0
+        for i in reversed(range(self.level)):
+            while node.next[i] is not None and position + node.width[i] <= target:
+                position += node.width[i]
+                node = node.next[i]
+        keys = []
+        while node is not None and len(keys) < count:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+
+class MemoryBackend:
+    """Skip-list boards in this process"""
+
+    shared = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._boards: Dict[str, IndexableSkipList] = {}
+        self._scores: Dict[str, Dict[int, int]] = {}
+        self._members: Dict[int, Tuple[Optional[str], str]] = {}  # user id -> (region, handle)
+
+    def set_score(self, board: str, user_id: int, xp: int):
+        with self._lock:
+            scores = self._scores.setdefault(board, {})
+            entries = self._boards.setdefault(board, IndexableSkipList())
+            if user_id in scores:
+                entries.remove((-scores[user_id], user_id))
+            scores[user_id] = xp
+            entries.insert((-xp, user_id))
+
+    def remove(self, board: str, user_id: int):
+        with self._lock:
+            scores = self._scores.get(board, {})
+            if user_id in scores:
+                self._boards[board].remove((-scores.pop(user_id), user_id))
+
+    def rank(self, board: str, user_id: int) -> Optional[Tuple[int, int]]:
+        """(0-based rank, xp)"""
+        with self._lock:
+            xp = self._scores.get(board, {}).get(user_id)
+            if xp is None:
+                return None
+            return self._boards[board].rank((-xp, user_id)), xp
+
+    def page(self, board: str, offset: int, limit: int) -> List[Tuple[int, int]]:
+        """[(user id, xp)] at ranks offset .. offset + limit - 1"""
+        with self._lock:
+            entries = self._boards.get(board)
+            if entries is None:
+                return []
+            return [(user_id, -negative_xp) for negative_xp, user_id in entries.slice(offset, limit)]
+
+    def size(self, board: str) -> int:
+        with self._lock:
+            return len(self._boards.get(board, ()))
+
+    def set_member(self, user_id: int, region: Optional[str], handle: str):
+        with self._lock:
+            self._members[user_id] = (region, handle)
+
+    def members(self, user_ids: Iterable[int]) -> Dict[int, Tuple[Optional[str], str]]:
+        with self._lock:
+            return {user_id: self._members[user_id] for user_id in user_ids if user_id in self._members}
+
+    def clear(self):
+        with self._lock:
+            self._boards.clear()
+            self._scores.clear()
+            self._members.clear()
+
+
+class RedisBackend:
+    """Redis sorted sets, shared by every app instance"""
+
+    PREFIX = "leaderboard:"
+    shared = True
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("LEADERBOARD_BACKEND=redis requires the redis package (pip install redis)") from e
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+
+    def _key(self, board: str) -> str:
+        return self.PREFIX + board
+
+    def set_score(self, board: str, user_id: int, xp: int):
+        self.client.zadd(self._key(board), {str(user_id): xp})
+
+    def remove(self, board: str, user_id: int):
+        self.client.zrem(self._key(board), str(user_id))
+
+    def rank(self, board: str, user_id: int) -> Optional[Tuple[int, int]]:
+        pipe = self.client.pipeline()
+        pipe.zrevrank(self._key(board), str(user_id))
+        pipe.zscore(self._key(board), str(user_id))
+        rank, xp = pipe.execute()
+        return None if rank is None else (rank, int(xp))
+
+    def page(self, board: str, offset: int, limit: int) -> List[Tuple[int, int]]:
+        entries = self.client.zrevrange(self._key(board), offset, offset + limit - 1, withscores=True)
+        return [(int(user_id), int(xp)) for user_id, xp in entries]
+
+    def size(self, board: str) -> int:
+        return self.client.zcard(self._key(board))
+
+    def is_populated(self) -> bool:
+        return bool(self.client.exists(self._key(GLOBAL_BOARD)))
+
+    def set_member(self, user_id: int, region: Optional[str], handle: str):
+        self.client.hset(self.PREFIX + "members", str(user_id), f"{region or ''}|{handle}")
+
+    def members(self, user_ids: Iterable[int]) -> Dict[int, Tuple[Optional[str], str]]:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        values = self.client.hmget(self.PREFIX + "members", [str(u) for u in user_ids])
+        result = {}
+        for user_id, value in zip(user_ids, values):
+            if value is not None:
+                region, handle = value.split("|", 1)
+                result[user_id] = (region or None, handle)
+        return result
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.PREFIX + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+class Leaderboard:
+    def __init__(self, backend):
+        self.backend = backend
+        self.warmed = False
+        self._synced_at: Optional[datetime] = None  # in-memory boards include changes up to here
+
+    def update(self, user_id: int, xp: int, handle: str, latitude: Optional[float] = None, longitude: Optional[float] = None,
+               keep_region: bool = False):
+        """Set a user's XP on the global board and their regional board"""
+        previous = self.backend.members([user_id]).get(user_id)
+        previous_region = previous[0] if previous else None
+        region = previous_region if keep_region else region_for(latitude, longitude)
+
+        self.backend.set_score(GLOBAL_BOARD, user_id, xp)
+        if previous_region and previous_region != region:
+            self.backend.remove(previous_region, user_id)
+        if region:
+            self.backend.set_score(region, user_id, xp)
+        self.backend.set_member(user_id, region, handle)
+
+    def record_xp(self, user_id: int, xp: int):
+        """XP changed; location unchanged"""
+        member = self.backend.members([user_id]).get(user_id)
+        if member is None:
+            # Not loaded yet (e.g. registered after warm-up): fetch once
+            db = SessionLocal()
+            try:
+                user = db.execute(
+                    select(User.anonymous_handle, User.latitude, User.longitude).where(User.id == user_id)
+                ).first()
+            finally:
+                db.close()
+            if user is None:
+                return
+            self.update(user_id, xp, user.anonymous_handle, user.latitude, user.longitude)
+        else:
+            self.update(user_id, xp, member[1], keep_region=True)
+
+    def record_location(self, user_id: int, xp: int, handle: str, latitude: float, longitude: float):
+        self.update(user_id, xp, handle, latitude, longitude)
+
+    def page(self, board: str, offset: int = 0, limit: int = 20) -> List[dict]:
+        entries = self.backend.page(board, offset, limit)
+        members = self.backend.members(user_id for user_id, _ in entries)
+        return [
+            {
+                "rank": offset + i + 1,
+                "anonymous_handle": members.get(user_id, (None, None))[1],
+                "xp": xp,
+            }
+            for i, (user_id, xp) in enumerate(entries)
+        ]
+
+    def standing(self, board: str, user_id: int) -> Optional[dict]:
+        found = self.backend.rank(board, user_id)
+        if found is None:
+            return None
+        rank, xp = found
+        return {"rank": rank + 1, "xp": xp, "of": self.backend.size(board)}
+
+    def region_of(self, user_id: int) -> Optional[str]:
+        member = self.backend.members([user_id]).get(user_id)
+        return member[0] if member else None
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "warmed": self.warmed,
+            "users": self.backend.size(GLOBAL_BOARD),
+        }
+
+    def warm(self, db=None, batch_size: int = 10000) -> int:
+        """Load every user's XP from the database (shared boards: only if they are empty)"""
+        if self.backend.shared and self.backend.is_populated():
+            self.warmed = True
+            logger.info(f"Leaderboard already loaded ({type(self.backend).__name__}), not warming")
+            return 0
+        own_session = db is None
+        db = db or SessionLocal()
+        loaded = 0
+        synced_at = datetime.utcnow()
+        try:
+            if not self.backend.shared:
+                self.backend.clear()
+            rows = db.execute(
+                select(User.id, User.xp, User.anonymous_handle, User.latitude, User.longitude)
+                .execution_options(yield_per=batch_size)
+            )
+            for user_id, xp, handle, latitude, longitude in rows:
+                self.update(user_id, xp or 0, handle, latitude, longitude)
+                loaded += 1
+        finally:
+            if own_session:
+                db.close()
+        self._synced_at = synced_at
+        self.warmed = True
+        logger.info(f"Leaderboard warmed with {loaded} users ({type(self.backend).__name__})")
+        return loaded
+
+    def sync(self, batch_size: int = 1000) -> int:
+        """
+        Re-read users whose XP or location changed since the last sync, so
+        in-memory boards pick up other instances' changes. Shared boards are
+        always current. Returns the number of users re-read.
+        """
+        if self.backend.shared or not self.warmed:
+            return 0
+        synced_at = datetime.utcnow()
+        since = self._synced_at - SYNC_OVERLAP
+        db = SessionLocal()
+        try:
+            user_ids = sorted(db.scalars(union(
+                select(XPLedgerEntry.user_id).where(XPLedgerEntry.created_at >= since),
+                select(User.id).where(
+                    User.latitude.isnot(None),
+                    User.longitude.isnot(None),
+                    User.last_location_update >= since
+                )
+            )))
+            for start in range(0, len(user_ids), batch_size):
+                rows = db.execute(
+                    select(User.id, User.xp, User.anonymous_handle, User.latitude, User.longitude)
+                    .where(User.id.in_(user_ids[start:start + batch_size]))
+                )
+                for user_id, xp, handle, latitude, longitude in rows:
+                    self.update(user_id, xp or 0, handle, latitude, longitude)
+        finally:
+            db.close()
+        self._synced_at = synced_at
+        return len(user_ids)
+
+
+def _make_backend():
+    if settings.LEADERBOARD_BACKEND == "redis":
+        return RedisBackend(settings.REDIS_URL)
+    return MemoryBackend()
+
+
+leaderboard = Leaderboard(_make_backend())
+
+
+def run_sync_job():
+    """Entry point for the scheduler: apply XP and location changes made by other instances"""
+    synced = leaderboard.sync()
+    if synced:
+        logger.info(f"Leaderboard synced {synced} users")
+
+
+# XP awards queue their new totals in session.info and are applied only once
+# the transaction commits (see xp.award_xp)
+PENDING_KEY = "leaderboard_pending"
+
+
+def queue_xp_update(db, user_id: int, xp: int):
+    if isinstance(db, Session):
+        db.info.setdefault(PENDING_KEY, {})[user_id] = xp
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    if not pending or not leaderboard.warmed:
+        return
+    for user_id, xp in pending.items():
+        try:
+            leaderboard.record_xp(user_id, xp)
+        except Exception as e:
+            logger.error(f"Failed to update leaderboard for user {user_id}: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session):
+    session.info.pop(PENDING_KEY, None)
@@ -13,11 +13,11 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from routers import (auth, users, matches, chat, reveal, missions, safety, photos, hotspots, notifications,
-                     themes, icebreakers, mood, quizzes, events, tips, guided_chat, health)
+                     themes, icebreakers, mood, quizzes, events, tips, guided_chat, leaderboard, analytics, health)
 from pathlib import Path
 from database import engine
 from admin import (
-    UserAdmin, MatchAdmin, MessageAdmin, MissionAdmin, BlockAdmin, ReportAdmin, AdminAuth, OdoyewuAdmin,
+    UserAdmin, MatchAdmin, MessageAdmin, MissionAdmin, MissionRollupAdmin, BlockAdmin, ReportAdmin, AdminAuth, OdoyewuAdmin,
     BadgeAdmin, UserProfileAdmin, ThemeAdmin, IcebreakerPromptAdmin, MoodCheckInAdmin,
     CompatibilityQuizAdmin, UserQuizResultAdmin, NudgeAdmin, EventAdmin, UserEventRegistrationAdmin,
     RelationshipTipAdmin, GuidedChatSessionAdmin, EmotionalSafetySettingAdmin
@@ -171,6 +171,8 @@ api_v1.include_router(quizzes.router)
 api_v1.include_router(events.router)
 api_v1.include_router(tips.router)
 api_v1.include_router(guided_chat.router)
+api_v1.include_router(leaderboard.router)
+api_v1.include_router(analytics.router)
 
 # Add v1 router to app
 app.include_router(api_v1)
@@ -190,6 +192,7 @@ admin.add_view(UserAdmin)
 admin.add_view(MatchAdmin)
 admin.add_view(MessageAdmin)
 admin.add_view(MissionAdmin)
+admin.add_view(MissionRollupAdmin)
 admin.add_view(BlockAdmin)
 admin.add_view(ReportAdmin)
 
@@ -227,6 +230,72 @@ async def startup_event():
     logger.info(f"Environment: {settings.ENVIRONMENT}")
     logger.info(f"Debug mode: {settings.DEBUG}")
     logger.info(f"Rate limiting: {'enabled' if settings.RATE_LIMIT_ENABLED else 'disabled'}")
+    
+    # Migrations run as a separate deploy step (python3 migrate.py upgrade);
+    # refuse to serve against an out-of-date schema
+    from migrations import verify_schema
+    verify_schema(engine)
+    
+    # Batched chat writes (optional)
+    if settings.CHAT_BATCH_WRITES_ENABLED:
+        from message_writer import message_writer
+        message_writer.start()
+    
+    # In-memory interest index (shared-interest scoring and lookups)
+    from interest_index import interest_index
+    interest_index.reload()
+    
+    # XP leaderboards (kept current by XP awards from here on)
+    from leaderboard import leaderboard
+    leaderboard.warm()
+    
+    # Domain events drive automatic mission progress
+    from domain_events import event_bus
+    from mission_progress import record_mission_progress
+    from badge_engine import record_badge_activity
+    event_bus.subscribe(record_mission_progress)
+    event_bus.subscribe(record_badge_activity)
+    event_bus.start()
+    
+    # Background refresh of nearby match candidates
+    from nearby_candidates import nearby_refresher
+    nearby_refresher.start()
+    
+    # Push notification dispatcher (sends from the outbox)
+    from push import push_dispatcher
+    push_dispatcher.start()
+    
+    # Periodic jobs; every instance keeps its interest index (and in-memory leaderboard) current
+    from scheduler import scheduler
+    from interest_index import run_refresh_job as run_interest_refresh_job
+    scheduler.add_job("refresh_interest_index", run_interest_refresh_job,
+                      interval_seconds=settings.INTEREST_INDEX_REFRESH_SECONDS)
+    if settings.LEADERBOARD_BACKEND == "memory":
+        from leaderboard import run_sync_job as run_leaderboard_sync_job
+        scheduler.add_job("sync_leaderboard", run_leaderboard_sync_job,
+                          interval_seconds=settings.LEADERBOARD_SYNC_SECONDS)
+    
+    # Maintenance jobs
+    if settings.BACKGROUND_JOBS_ENABLED:
+        from message_archive import run_archive_job
+        from hotspot_grid import run_prune_job
+        from daily_missions import run_materializer_job
+        from xp import run_reconcile_job
+        from mission_progress import run_prune_job as run_mission_subject_prune_job
+        from mission_rollups import run_rollup_job
+        from push import run_prune_job as run_push_prune_job
+        from nudges import run_nudge_job
+        from interest_index import run_prune_job as run_interest_prune_job
+        scheduler.add_job("archive_cold_conversations", run_archive_job, daily_at="03:00")
+        scheduler.add_job("prune_hotspot_buckets", run_prune_job, interval_seconds=3600)
+        scheduler.add_job("materialize_daily_missions", run_materializer_job, daily_at="23:30")
+        scheduler.add_job("reconcile_xp", run_reconcile_job, daily_at="04:00")
+        scheduler.add_job("prune_mission_event_subjects", run_mission_subject_prune_job, daily_at="00:30")
+        scheduler.add_job("rollup_missions", run_rollup_job, daily_at="02:30")
+        scheduler.add_job("prune_push_outbox", run_push_prune_job, daily_at="05:00")
+        scheduler.add_job("prune_interest_changes", run_interest_prune_job, daily_at="05:30")
+        scheduler.add_job("send_nudges", run_nudge_job, daily_at="17:00")
+    scheduler.start()
 
 # Shutdown event
 @app.on_event("shutdown")
@@ -238,3 +307,23 @@ async def shutdown_event():
         await manager.disconnect_all()
     except Exception as e:
         logger.error(f"Error during WebSocket cleanup: {e}")
+    
+    # Stop periodic jobs
+    from scheduler import scheduler
+    await scheduler.stop()
+    
+    # Flush any queued chat messages
+    from message_writer import message_writer
+    message_writer.stop()
+    
+    # Deliver queued domain events
+    from domain_events import event_bus
+    event_bus.stop()
+    
+    # Stop nearby candidate workers
+    from nearby_candidates import nearby_refresher
+    nearby_refresher.stop()
+    
+    # Stop sending push notifications (undelivered ones stay in the outbox)
+    from push import push_dispatcher
+    await push_dispatcher.stop()
@@ -0,0 +1,116 @@
+"""
+Archival of cold chat conversations.
+
+Messages of conversations with no activity for MESSAGE_ARCHIVE_AFTER_DAYS are
+moved in batches from the hot `messages` table to `messages_archive`. Chat
+reads go through get_conversation_messages(), which reads both tables, so
+archival is invisible to clients.
+
+Run manually with:
+    python3 message_archive.py [--days 90] [--batch-size 1000]
+"""
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select, union_all
+
+from config import settings
+from database import SessionLocal
+from models import Message, MessageArchive
+
+logger = logging.getLogger(__name__)
+
+ARCHIVED_COLUMNS = ["id", "match_id", "sender_id", "content", "created_at"]
+
+
+def _conversation_select(model, match_id: int):
+    return select(*(getattr(model, c) for c in ARCHIVED_COLUMNS)).where(model.match_id == match_id)
+
+
+def get_conversation_messages(db, match_id: int):
+    """All messages of a match from the hot and archive tables, oldest first"""
+    messages = union_all(
+        _conversation_select(Message, match_id),
+        _conversation_select(MessageArchive, match_id)
+    ).subquery()
+    return db.execute(select(messages).order_by(messages.c.created_at, messages.c.id)).all()
+
+
+def find_cold_conversations(db, cutoff: datetime, limit: int):
+    """Match ids whose newest hot message is older than `cutoff`"""
+    return db.scalars(
+        select(Message.match_id)
+        .group_by(Message.match_id)
+        .having(func.max(Message.created_at) < cutoff)
+        .limit(limit)
+    ).all()
+
+
+def archive_conversation(db, match_id: int, cutoff: datetime, batch_size: int = 1000) -> int:
+    """Move a conversation's messages older than `cutoff` to the archive, one batch per transaction"""
+    moved = 0
+    while True:
+        ids = db.scalars(
+            select(Message.id)
+            .where(Message.match_id == match_id, Message.created_at < cutoff)
+            .order_by(Message.id)
+            .limit(batch_size)
+        ).all()
+        if not ids:
+            break
+
+        db.execute(insert(MessageArchive).from_select(
+            ARCHIVED_COLUMNS,
+            select(*(getattr(Message, c) for c in ARCHIVED_COLUMNS)).where(Message.id.in_(ids))
+        ))
+        db.execute(delete(Message).where(Message.id.in_(ids)))
+        db.commit()
+        moved += len(ids)
+    return moved
+
+
+def archive_cold_conversations(db, cold_after_days: int = 90, batch_size: int = 1000, max_conversations: int = 1000) -> dict:
+    """Compaction job: move up to `max_conversations` cold conversations out of the hot table"""
+    cutoff = datetime.utcnow() - timedelta(days=cold_after_days)
+    match_ids = find_cold_conversations(db, cutoff, max_conversations)
+
+    moved = 0
+    for match_id in match_ids:
+        try:
+            moved += archive_conversation(db, match_id, cutoff, batch_size)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to archive conversation {match_id}: {e}")
+
+    logger.info(f"Archived {moved} messages from {len(match_ids)} cold conversations")
+    return {"conversations": len(match_ids), "messages": moved}
+
+
+def run_archive_job():
+    """Entry point for the scheduler"""
+    db = SessionLocal()
+    try:
+        return archive_cold_conversations(
+            db,
+            cold_after_days=settings.MESSAGE_ARCHIVE_AFTER_DAYS,
+            batch_size=settings.MESSAGE_ARCHIVE_BATCH_SIZE
+        )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Move cold conversations to messages_archive")
+    parser.add_argument("--days", type=int, default=settings.MESSAGE_ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=settings.MESSAGE_ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--max-conversations", type=int, default=1000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = archive_cold_conversations(db, args.days, args.batch_size, args.max_conversations)
+    finally:
+        db.close()
+    print(f"✅ Archived {result['messages']} messages from {result['conversations']} conversations")
@@ -0,0 +1,242 @@
+"""
+Group-commit writer for chat messages.
+
+Concurrent senders hand their message to a single writer thread, which waits a
+few milliseconds for more messages to arrive and then inserts the whole batch
+with one multi-row INSERT ... RETURNING statement. A message's push
+notification, if given, is queued in the outbox in the same transaction, so
+a stored message always gets its push.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert
+
+from config import settings
+from database import SessionLocal
+from models import Message
+from push import enqueue_many
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 5, 10, 25, 50, 100)
+
+_STOP = object()
+
+
+class PendingMessage:
+    """A message waiting to be written, plus the future its sender waits on"""
+
+    __slots__ = ("match_id", "sender_id", "content", "notification", "created_at", "future")
+
+    def __init__(self, match_id: int, sender_id: int, content: str, notification: Optional[dict] = None):
+        self.match_id = match_id
+        self.sender_id = sender_id
+        self.content = content
+        self.notification = notification  # push.enqueue_many() entry
+        # Stamped on submit so created_at follows the same order as the ids
+        self.created_at = datetime.utcnow()
+        self.future: Future = Future()
+
+
+class MessageBatchWriter:
+    def __init__(self, session_factory=SessionLocal, window_ms: int = 5, max_batch_size: int = 100):
+        self.session_factory = session_factory
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.batches_written = 0
+        self.messages_written = 0
+        self.failed_batches = 0
+        self.last_batch_size = 0
+        self.max_batch_size_seen = 0
+        self.total_flush_seconds = 0.0
+        self.histogram: Dict[str, int] = {self._bucket_label(b): 0 for b in BATCH_SIZE_BUCKETS}
+        self.histogram[f">{BATCH_SIZE_BUCKETS[-1]}"] = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the writer thread"""
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name="message-batch-writer", daemon=True)
+        self._thread.start()
+        logger.info(f"Message batch writer started (window={self.window * 1000:.0f}ms, max_batch={self.max_batch_size})")
+
+    def stop(self, timeout: float = 5.0):
+        """Flush whatever is queued and stop the writer thread"""
+        if not self.running:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info("Message batch writer stopped")
+
+    def submit(self, match_id: int, sender_id: int, content: str, notification: Optional[dict] = None) -> Future:
+        """Queue a message (and its push); the future resolves to the stored row as a dict"""
+        if not self.running:
+            raise RuntimeError("Message batch writer is not running")
+        pending = PendingMessage(match_id, sender_id, content, notification)
+        self._queue.put(pending)
+        return pending.future
+
+    def write(self, match_id: int, sender_id: int, content: str, notification: Optional[dict] = None,
+              timeout: float = 5.0) -> dict:
+        """Queue a message and block until its batch has been committed"""
+        return self.submit(match_id, sender_id, content, notification).result(timeout)
+
+    @staticmethod
+    def _notifications(batch: List[PendingMessage]) -> List[dict]:
+        """The batch's pushes, one per user and coalesce key (enqueue_many can't take duplicates)"""
+        merged: Dict[tuple, dict] = {}
+        uncoalesced = []
+        for p in batch:
+            n = p.notification
+            if n is None:
+                continue
+            if not n.get("coalesce_key"):
+                uncoalesced.append(n)
+                continue
+            key = (n["user_id"], n["coalesce_key"])
+            if key in merged:
+                # Latest content wins, as when merging into a pending outbox row
+                n = {**n, "count": merged[key].get("count", 1) + n.get("count", 1)}
+            merged[key] = n
+        return list(merged.values()) + uncoalesced
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            # Collect more messages until the window closes or the batch is full
+            batch: List[PendingMessage] = [item]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._flush(batch)
+
+        # Drain anything submitted while stopping
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftover.append(item)
+        for start in range(0, len(leftover), self.max_batch_size):
+            self._flush(leftover[start:start + self.max_batch_size])
+
+    def _flush(self, batch: List[PendingMessage]):
+        rows = [
+            {
+                "match_id": p.match_id,
+                "sender_id": p.sender_id,
+                "content": p.content,
+                "created_at": p.created_at,
+            }
+            for p in batch
+        ]
+        started = time.perf_counter()
+        db = self.session_factory()
+        try:
+            # Rows come back in submission order, so each waiter gets its own id
+            # and messages within a match keep increasing ids
+            ids = db.scalars(
+                insert(Message).returning(Message.id, sort_by_parameter_order=True),
+                rows
+            ).all()
+            enqueue_many(db, self._notifications(batch))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to write batch of {len(batch)} messages: {e}")
+            with self._stats_lock:
+                self.failed_batches += 1
+            for p in batch:
+                p.future.set_exception(e)
+            return
+        finally:
+            db.close()
+
+        self._record_batch(len(batch), time.perf_counter() - started)
+        for p, message_id in zip(batch, ids):
+            p.future.set_result({
+                "id": message_id,
+                "match_id": p.match_id,
+                "sender_id": p.sender_id,
+                "content": p.content,
+                "created_at": p.created_at,
+            })
+
+    @staticmethod
+    def _bucket_label(upper: int) -> str:
+        index = BATCH_SIZE_BUCKETS.index(upper)
+        lower = BATCH_SIZE_BUCKETS[index - 1] + 1 if index else 1
+        return str(upper) if lower == upper else f"{lower}-{upper}"
+
+    def _record_batch(self, size: int, seconds: float):
+        with self._stats_lock:
+            self.batches_written += 1
+            self.messages_written += size
+            self.last_batch_size = size
+            self.max_batch_size_seen = max(self.max_batch_size_seen, size)
+            self.total_flush_seconds += seconds
+            for upper in BATCH_SIZE_BUCKETS:
+                if size <= upper:
+                    self.histogram[self._bucket_label(upper)] += 1
+                    break
+            else:
+                self.histogram[f">{BATCH_SIZE_BUCKETS[-1]}"] += 1
+
+    def stats(self) -> dict:
+        """Batch-size metrics for monitoring"""
+        with self._stats_lock:
+            batches = self.batches_written
+            return {
+                "running": self.running,
+                "queued": self._queue.qsize(),
+                "batches_written": batches,
+                "messages_written": self.messages_written,
+                "failed_batches": self.failed_batches,
+                "avg_batch_size": round(self.messages_written / batches, 2) if batches else 0,
+                "last_batch_size": self.last_batch_size,
+                "max_batch_size": self.max_batch_size_seen,
+                "avg_flush_ms": round(self.total_flush_seconds / batches * 1000, 2) if batches else 0,
+                "batch_size_histogram": dict(self.histogram),
+            }
+
+
+# Global writer instance (started from main.py when CHAT_BATCH_WRITES_ENABLED is set)
+message_writer = MessageBatchWriter(
+    window_ms=settings.CHAT_BATCH_WINDOW_MS,
+    max_batch_size=settings.CHAT_BATCH_MAX_SIZE
+)
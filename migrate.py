@@ -0,0 +1,52 @@
+"""
+Database migrations.
+
+    python3 migrate.py                  # apply all pending revisions
+    python3 migrate.py upgrade [REV]    # apply pending revisions up to REV
+    python3 migrate.py current          # show the applied revision
+    python3 migrate.py history          # list revisions and whether they're applied
+    python3 migrate.py stamp REV        # mark revisions up to REV as applied without running them
+
+Run this as a deploy step before starting the app; the app refuses to start
+while revisions are pending.
+"""
+from dotenv import load_dotenv
+load_dotenv()
+
+import logging
+import sys
+
+from database import engine
+import migrations
+
+
+def main(argv):
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    command = argv[0] if argv else "upgrade"
+
+    if command == "upgrade":
+        target = argv[1] if len(argv) > 1 else None
+        applied = migrations.upgrade(engine, target)
+        if applied:
+            print(f"✅ Applied {', '.join(applied)}")
+        else:
+            print("✅ Database is up to date")
+    elif command == "current":
+        print(f"Current revision: {migrations.current_revision(engine) or 'none'}")
+        print(f"Head revision:    {migrations.head_revision()}")
+    elif command == "history":
+        applied = migrations.applied_revisions(engine)
+        for module in migrations.load_revisions():
+            mark = "✓" if module.revision in applied else " "
+            print(f"[{mark}] {module.revision}  {module.description}")
+    elif command == "stamp" and len(argv) > 1:
+        stamped = migrations.stamp(engine, argv[1])
+        print(f"✅ Stamped {', '.join(stamped) or 'nothing'}")
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
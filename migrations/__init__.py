@@ -0,0 +1,173 @@
+"""
+Versioned schema migrations.
+
+Every module in migrations/versions/ is one revision and defines:
+
+    revision       unique id, e.g. "0003"
+    down_revision  id of the previous revision (None for the first one)
+    description    one-line summary
+    transactional  False for online operations (concurrent index builds,
+                   batched backfills); defaults to True
+    upgrade(op)    applies the change through a migrations.operations.Operations
+
+Applied revisions are recorded in the schema_migrations table. Run pending
+revisions with `python3 migrate.py upgrade`; the app only verifies the
+revision at startup and never runs DDL itself.
+"""
+import importlib
+import logging
+import pkgutil
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select, text
+
+from migrations.operations import Operations
+
+logger = logging.getLogger(__name__)
+
+# Kept out of Base.metadata so create_all/drop_all never touch it
+migration_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("revision", String(32), primary_key=True),
+    Column("description", String(255)),
+    Column("applied_at", DateTime, default=datetime.utcnow),
+)
+
+# Arbitrary key for pg_advisory_lock so only one process migrates at a time
+MIGRATION_LOCK_KEY = 7_305_221
+
+
+class SchemaOutOfDateError(RuntimeError):
+    pass
+
+
+def load_revisions() -> list:
+    """Revision modules ordered from first to head"""
+    package = importlib.import_module("migrations.versions")
+    modules = [
+        importlib.import_module(f"migrations.versions.{info.name}")
+        for info in pkgutil.iter_modules(package.__path__)
+    ]
+
+    by_down = {}
+    for module in modules:
+        if module.down_revision in by_down:
+            raise RuntimeError(
+                f"Revisions {by_down[module.down_revision].revision} and {module.revision} "
+                f"both follow {module.down_revision}"
+            )
+        by_down[module.down_revision] = module
+
+    ordered = []
+    current = None
+    while current in by_down:
+        module = by_down.pop(current)
+        ordered.append(module)
+        current = module.revision
+    if by_down:
+        orphans = ", ".join(m.revision for m in by_down.values())
+        raise RuntimeError(f"Revisions not connected to the chain: {orphans}")
+    return ordered
+
+
+def head_revision() -> Optional[str]:
+    revisions = load_revisions()
+    return revisions[-1].revision if revisions else None
+
+
+def applied_revisions(bind) -> set:
+    if not inspect(bind).has_table(schema_migrations.name):
+        return set()
+    with bind.connect() as conn:
+        return set(conn.scalars(select(schema_migrations.c.revision)))
+
+
+def current_revision(bind) -> Optional[str]:
+    """Latest revision in the chain that has been applied"""
+    applied = applied_revisions(bind)
+    current = None
+    for module in load_revisions():
+        if module.revision in applied:
+            current = module.revision
+    return current
+
+
+def pending_revisions(bind) -> list:
+    applied = applied_revisions(bind)
+    return [module for module in load_revisions() if module.revision not in applied]
+
+
+def _record(conn, module):
+    conn.execute(schema_migrations.insert().values(
+        revision=module.revision,
+        description=module.description,
+        applied_at=datetime.utcnow()
+    ))
+
+
+def _apply(engine, module):
+    transactional = getattr(module, "transactional", True)
+    logger.info(f"Applying {module.revision}: {module.description}")
+    if transactional:
+        with engine.begin() as conn:
+            module.upgrade(Operations(conn, transactional=True))
+            _record(conn, module)
+    else:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            module.upgrade(Operations(conn, transactional=False))
+        with engine.begin() as conn:
+            _record(conn, module)
+
+
+def upgrade(engine, target: Optional[str] = None) -> List[str]:
+    """Apply pending revisions up to `target` (default: head). Returns the applied ids."""
+    migration_metadata.create_all(bind=engine)
+
+    with engine.connect() as lock_conn:
+        postgres = engine.dialect.name == "postgresql"
+        if postgres:
+            lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        try:
+            already_applied = applied_revisions(engine)
+            applied = []
+            for module in load_revisions():
+                if module.revision not in already_applied:
+                    _apply(engine, module)
+                    applied.append(module.revision)
+                if module.revision == target:
+                    break
+            return applied
+        finally:
+            if postgres:
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+
+def stamp(engine, target: str) -> List[str]:
+    """Mark revisions up to `target` as applied without running them"""
+    migration_metadata.create_all(bind=engine)
+    applied = applied_revisions(engine)
+    stamped = []
+    with engine.begin() as conn:
+        for module in load_revisions():
+            if module.revision not in applied:
+                _record(conn, module)
+                stamped.append(module.revision)
+            if module.revision == target:
+                break
+        else:
+            raise ValueError(f"Unknown revision {target}")
+    return stamped
+
+
+def verify_schema(engine):
+    """Raise SchemaOutOfDateError unless every revision has been applied"""
+    pending = pending_revisions(engine)
+    if pending:
+        raise SchemaOutOfDateError(
+            f"Database schema is at {current_revision(engine) or 'no revision'}, "
+            f"expected {head_revision()}. Pending: {', '.join(m.revision for m in pending)}. "
+            f"Run `python3 migrate.py upgrade`."
+        )
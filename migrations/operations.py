@@ -0,0 +1,118 @@
+"""
+Schema operations available to migration revisions.
+
+Revisions marked `transactional = False` run on an autocommit connection,
+which is what lets PostgreSQL build indexes CONCURRENTLY and lets batched
+backfills commit one batch at a time instead of holding locks on the whole
+table until the end.
+"""
+import logging
+from typing import Iterable, Optional
+
+from sqlalchemy import inspect, text
+
+from database import Base
+
+logger = logging.getLogger(__name__)
+
+
+class Operations:
+    def __init__(self, conn, transactional: bool = True):
+        self.conn = conn
+        self.transactional = transactional
+
+    @property
+    def dialect(self) -> str:
+        return self.conn.dialect.name
+
+    def execute(self, statement, params: Optional[dict] = None):
+        if isinstance(statement, str):
+            statement = text(statement)
+        return self.conn.execute(statement, params or {})
+
+    # Introspection (fresh inspector each time so earlier DDL is visible)
+
+    def has_table(self, table: str) -> bool:
+        return inspect(self.conn).has_table(table)
+
+    def has_column(self, table: str, column: str) -> bool:
+        return column in {c["name"] for c in inspect(self.conn).get_columns(table)}
+
+    def has_index(self, table: str, name: str) -> bool:
+        return name in {ix["name"] for ix in inspect(self.conn).get_indexes(table)}
+
+    # DDL
+
+    def create_tables(self, *models):
+        """Create the tables of the given models (and their indexes) if they don't exist"""
+        Base.metadata.create_all(bind=self.conn, tables=[model.__table__ for model in models])
+
+    def add_column(self, table: str, column: str, type_sql: str):
+        """ALTER TABLE ... ADD COLUMN, skipped if the column exists"""
+        if self.has_column(table, column):
+            return
+        self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {type_sql}")
+        logger.info(f"Added column {table}.{column}")
+
+    def create_index(self, name: str, table: str, columns: Iterable[str], unique: bool = False, where: Optional[str] = None):
+        """
+        CREATE INDEX without blocking writes.
+
+        On PostgreSQL the index is built CONCURRENTLY, so the revision must set
+        `transactional = False`. An INVALID index left by an interrupted build
+        is dropped and rebuilt.
+        """
+        concurrently = self.dialect == "postgresql"
+        if concurrently:
+            if self.transactional:
+                raise RuntimeError(f"Index {name} must be created from a revision with transactional = False")
+            invalid = self.execute(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND NOT i.indisvalid",
+                {"name": name}
+            ).first()
+            if invalid:
+                logger.warning(f"Dropping invalid index {name} left by an interrupted build")
+                self.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+        if self.has_index(table, name):
+            return
+
+        statement = "CREATE {unique}INDEX {mode}IF NOT EXISTS {name} ON {table} ({columns})".format(
+            unique="UNIQUE " if unique else "",
+            mode="CONCURRENTLY " if concurrently else "",
+            name=name,
+            table=table,
+            columns=", ".join(columns),
+        )
+        if where:
+            statement += f" WHERE {where}"
+        self.execute(statement)
+        logger.info(f"Created index {name}")
+
+    # Data
+
+    def run_in_batches(self, table: str, statement: str, batch_size: int = 10000, params: Optional[dict] = None) -> int:
+        """
+        Run `statement` once per id range of `table`. The statement receives
+        :batch_start (inclusive) and :batch_end (exclusive); in a
+        non-transactional revision every batch commits on its own.
+        """
+        bounds = self.execute(f"SELECT MIN(id), MAX(id) FROM {table}").first()
+        if bounds is None or bounds[0] is None:
+            return 0
+
+        low, high = bounds
+        affected = 0
+        for start in range(low, high + 1, batch_size):
+            result = self.execute(statement, {**(params or {}), "batch_start": start, "batch_end": start + batch_size})
+            affected += max(result.rowcount or 0, 0)
+        logger.info(f"Processed {affected} rows of {table} in batches of {batch_size}")
+        return affected
+
+    def backfill(self, table: str, set_sql: str, where: Optional[str] = None, batch_size: int = 10000, params: Optional[dict] = None) -> int:
+        """UPDATE table SET <set_sql> in id-range batches"""
+        statement = f"UPDATE {table} SET {set_sql} WHERE id >= :batch_start AND id < :batch_end"
+        if where:
+            statement += f" AND ({where})"
+        return self.run_in_batches(table, statement, batch_size, params)
@@ -0,0 +1,42 @@
+"""
+Baseline schema: the tables previously created by create_all() in
+entrypoint.sh / migrate_premium.py, plus the users columns that
+migrate_db.py added with ALTER TABLE. Safe to run on an existing database.
+"""
+from models import (
+    User, Match, Message, Mission, Block, Report,
+    Badge, UserProfile, Theme, IcebreakerPrompt, UserIcebreaker,
+    MoodCheckIn, CompatibilityQuiz, UserQuizResult, Nudge, UserNudgeLog,
+    Event, UserEventRegistration, RelationshipTip, GuidedChatSession,
+    EmotionalSafetySetting
+)
+
+revision = "0001"
+down_revision = None
+description = "Baseline schema"
+
+USER_COLUMNS = [
+    ("bio", "TEXT"),
+    ("interests", "TEXT"),
+    ("mood_status", "VARCHAR(100) DEFAULT 'Open to chat'"),
+    ("latitude", "FLOAT"),
+    ("longitude", "FLOAT"),
+    ("last_location_update", "TIMESTAMP"),
+    ("xp", "INTEGER DEFAULT 0"),
+    ("level", "INTEGER DEFAULT 1"),
+    ("profile_photo_url", "VARCHAR(255)"),
+    ("photo_verified", "BOOLEAN DEFAULT FALSE"),
+    ("push_token", "VARCHAR(255)"),
+]
+
+
+def upgrade(op):
+    op.create_tables(
+        User, Match, Message, Mission, Block, Report,
+        Badge, UserProfile, Theme, IcebreakerPrompt, UserIcebreaker,
+        MoodCheckIn, CompatibilityQuiz, UserQuizResult, Nudge, UserNudgeLog,
+        Event, UserEventRegistration, RelationshipTip, GuidedChatSession,
+        EmotionalSafetySetting
+    )
+    for column, type_sql in USER_COLUMNS:
+        op.add_column("users", column, type_sql)
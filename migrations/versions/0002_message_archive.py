@@ -0,0 +1,10 @@
+"""Archive table for messages of cold conversations."""
+from models import MessageArchive
+
+revision = "0002"
+down_revision = "0001"
+description = "Add messages_archive"
+
+
+def upgrade(op):
+    op.create_tables(MessageArchive)
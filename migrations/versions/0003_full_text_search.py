@@ -0,0 +1,19 @@
+"""Full-text indexes for message and report search (GIN on PostgreSQL, FTS5 on SQLite)."""
+from search_index import search_index_ddl
+
+revision = "0003"
+down_revision = "0002"
+description = "Full-text search indexes"
+transactional = False
+
+INDEXED_COLUMNS = [
+    ("messages", "content"),
+    ("messages_archive", "content"),
+    ("reports", "description"),
+]
+
+
+def upgrade(op):
+    for table, column in INDEXED_COLUMNS:
+        for statement in search_index_ddl(op.dialect, table, column):
+            op.execute(statement)
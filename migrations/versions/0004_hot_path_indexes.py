@@ -0,0 +1,22 @@
+"""Indexes for the filters used on every request, built without locking the tables."""
+revision = "0004"
+down_revision = "0003"
+description = "Hot-path foreign key and filter indexes"
+transactional = False
+
+INDEXES = [
+    ("ix_matches_user_a_id_user_b_id", "matches", ["user_a_id", "user_b_id"]),
+    ("ix_matches_user_b_id", "matches", ["user_b_id"]),
+    ("ix_messages_match_id_created_at", "messages", ["match_id", "created_at"]),
+    ("ix_blocks_user_id_blocked_user_id", "blocks", ["user_id", "blocked_user_id"]),
+    ("ix_blocks_blocked_user_id", "blocks", ["blocked_user_id"]),
+    ("ix_missions_user_id_created_at", "missions", ["user_id", "created_at"]),
+    ("ix_mood_checkins_user_id_date", "mood_checkins", ["user_id", "date"]),
+    ("ix_user_event_registrations_user_id_event_id", "user_event_registrations", ["user_id", "event_id"]),
+    ("ix_user_event_registrations_event_id", "user_event_registrations", ["event_id"]),
+]
+
+
+def upgrade(op):
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
@@ -0,0 +1,12 @@
+"""Maintained hotspot grid counters, filled from current user locations."""
+from hotspot_grid import rebuild_grid
+from models import HotspotCellBucket
+
+revision = "0005"
+down_revision = "0004"
+description = "Add hotspot_cell_buckets"
+
+
+def upgrade(op):
+    op.create_tables(HotspotCellBucket)
+    rebuild_grid(op.conn)
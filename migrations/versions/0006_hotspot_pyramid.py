@@ -0,0 +1,18 @@
+"""
+Hotspot tile pyramid: adds a level column to hotspot_cell_buckets.
+
+The table only holds counters derived from users.latitude/longitude, so it is
+recreated and refilled rather than altered in place.
+"""
+from hotspot_grid import rebuild_grid
+from models import HotspotCellBucket
+
+revision = "0006"
+down_revision = "0005"
+description = "Add pyramid levels to hotspot_cell_buckets"
+
+
+def upgrade(op):
+    op.execute("DROP TABLE IF EXISTS hotspot_cell_buckets")
+    op.create_tables(HotspotCellBucket)
+    rebuild_grid(op.conn)
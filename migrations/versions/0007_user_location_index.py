@@ -0,0 +1,9 @@
+"""Location index for radius queries (nearby activity), built without locking users."""
+revision = "0007"
+down_revision = "0006"
+description = "Index users by latitude/longitude"
+transactional = False
+
+
+def upgrade(op):
+    op.create_index("ix_users_latitude_longitude", "users", ["latitude", "longitude"])
@@ -0,0 +1,14 @@
+"""Partial covering index for aggregating recently active users into hotspot cells."""
+revision = "0008"
+down_revision = "0007"
+description = "Partial index on located users by last_location_update"
+transactional = False
+
+
+def upgrade(op):
+    op.create_index(
+        "ix_users_located_last_location_update",
+        "users",
+        ["last_location_update", "latitude", "longitude"],
+        where="latitude IS NOT NULL AND longitude IS NOT NULL"
+    )
@@ -0,0 +1,57 @@
+"""
+Normalized interest tokens, backfilled from users.interests in batches.
+
+The backfill is self-contained (its own copy of the tokenizer, plain SQL) so
+later changes to interest_index can't break upgrading an old database.
+"""
+import re
+
+from sqlalchemy import text
+
+from models import Interest, UserInterest
+
+revision = "0009"
+down_revision = "0008"
+description = "Add interests and user_interests"
+transactional = False
+
+BATCH_SIZE = 1000
+SEPARATORS = re.compile(r"[,;/|\n]+")
+
+
+def tokenize(interests: str) -> list:
+    tokens = []
+    for token in SEPARATORS.split(interests):
+        token = " ".join(token.split()).lower()[:100]
+        if token and token not in tokens:
+            tokens.append(token)
+    return tokens[:30]
+
+
+def upgrade(op):
+    op.create_tables(Interest, UserInterest)
+    ids = {name: interest_id for interest_id, name in op.execute("SELECT id, name FROM interests")}
+    last_id = 0
+    while True:
+        rows = op.execute(
+            "SELECT id, interests FROM users WHERE id > :last_id AND interests IS NOT NULL ORDER BY id LIMIT :limit",
+            {"last_id": last_id, "limit": BATCH_SIZE}
+        ).all()
+        if not rows:
+            break
+        links = []
+        for user_id, interests in rows:
+            for name in tokenize(interests):
+                if name not in ids:
+                    op.execute("INSERT INTO interests (name) VALUES (:name)", {"name": name})
+                    ids[name] = op.execute("SELECT id FROM interests WHERE name = :name", {"name": name}).scalar_one()
+                links.append({"user_id": user_id, "interest_id": ids[name]})
+        if links:
+            op.conn.execute(
+                text(
+                    "INSERT INTO user_interests (user_id, interest_id) SELECT :user_id, :interest_id "
+                    "WHERE NOT EXISTS (SELECT 1 FROM user_interests WHERE user_id = :user_id AND interest_id = :interest_id)"
+                ),
+                links
+            )
+        last_id = rows[-1][0]
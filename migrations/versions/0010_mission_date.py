@@ -0,0 +1,33 @@
+"""
+Daily missions keyed by day: missions.mission_date plus a unique
+(user_id, mission_date, mission_type) index.
+
+Existing rows get mission_date = DATE(created_at) in batches. Duplicates left
+by concurrent lazy creation keep mission_date NULL (NULLs don't collide in a
+unique index), so no history is deleted.
+"""
+revision = "0010"
+down_revision = "0009"
+description = "Add missions.mission_date with a unique daily index"
+transactional = False
+
+
+def upgrade(op):
+    op.add_column("missions", "mission_date", "DATE")
+    op.backfill(
+        "missions",
+        "mission_date = DATE(created_at)",
+        where=(
+            "mission_date IS NULL AND created_at IS NOT NULL AND NOT EXISTS ("
+            "SELECT 1 FROM missions earlier WHERE earlier.user_id = missions.user_id "
+            "AND earlier.mission_type = missions.mission_type "
+            "AND DATE(earlier.created_at) = DATE(missions.created_at) "
+            "AND earlier.id < missions.id)"
+        )
+    )
+    op.create_index(
+        "uq_missions_user_id_mission_date_mission_type",
+        "missions",
+        ["user_id", "mission_date", "mission_type"],
+        unique=True
+    )
@@ -0,0 +1,21 @@
+"""
+Append-only XP ledger. Every user's current xp is recorded as an
+opening_balance entry so the ledger sums to users.xp from the start.
+"""
+from models import XPLedgerEntry
+
+revision = "0011"
+down_revision = "0010"
+description = "Add xp_ledger with opening balances"
+transactional = False
+
+
+def upgrade(op):
+    op.create_tables(XPLedgerEntry)
+    op.run_in_batches(
+        "users",
+        "INSERT INTO xp_ledger (user_id, amount, reason, created_at) "
+        "SELECT id, xp, 'opening_balance', CURRENT_TIMESTAMP FROM users "
+        "WHERE id >= :batch_start AND id < :batch_end AND COALESCE(xp, 0) <> 0 "
+        "AND NOT EXISTS (SELECT 1 FROM xp_ledger WHERE xp_ledger.user_id = users.id)"
+    )
@@ -0,0 +1,29 @@
+"""
+Event-driven mission progress: missions.progress / missions.target and the
+mission_event_subjects table for distinct and per-subject missions.
+
+Existing rows get their type's target; completed ones are shown as full.
+"""
+from daily_missions import MISSION_POOL
+from models import MissionEventSubject
+
+revision = "0012"
+down_revision = "0011"
+description = "Add mission progress tracking"
+transactional = False
+
+
+def upgrade(op):
+    op.add_column("missions", "progress", "INTEGER DEFAULT 0")
+    op.add_column("missions", "target", "INTEGER DEFAULT 1")
+    op.create_tables(MissionEventSubject)
+
+    targets = {
+        mission_def["type"]: mission_def["target"]
+        for missions in MISSION_POOL.values()
+        for mission_def in missions
+        if mission_def.get("target", 1) != 1
+    }
+    whens = " ".join(f"WHEN '{mission_type}' THEN {target}" for mission_type, target in sorted(targets.items()))
+    op.backfill("missions", f"target = CASE mission_type {whens} ELSE 1 END")
+    op.backfill("missions", "progress = target", where="completed")
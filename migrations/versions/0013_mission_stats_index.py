@@ -0,0 +1,9 @@
+"""Covering index for per-user mission stats, built without locking missions."""
+revision = "0013"
+down_revision = "0012"
+description = "Index missions by user_id, completed"
+transactional = False
+
+
+def upgrade(op):
+    op.create_index("ix_missions_user_id_completed", "missions", ["user_id", "completed", "xp_reward"])
@@ -0,0 +1,12 @@
+"""Weekly mission rollups, plus a mission_date index for the retention job."""
+from models import MissionRollup
+
+revision = "0014"
+down_revision = "0013"
+description = "Add mission_rollups"
+transactional = False
+
+
+def upgrade(op):
+    op.create_tables(MissionRollup)
+    op.create_index("ix_missions_mission_date", "missions", ["mission_date"])
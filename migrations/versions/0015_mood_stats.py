@@ -0,0 +1,13 @@
+"""Per-user mood streaks and distributions, built from existing check-ins."""
+from models import MoodStats
+from mood_stats import backfill_mood_stats
+
+revision = "0015"
+down_revision = "0014"
+description = "Add mood_stats"
+transactional = False
+
+
+def upgrade(op):
+    op.create_tables(MoodStats)
+    backfill_mood_stats(op.conn)
@@ -0,0 +1,14 @@
+"""Per-day, per-cell mood counts, rebuilt from the last year of check-ins."""
+from datetime import datetime, timedelta
+
+from models import MoodCellCount
+from mood_analytics import rebuild_mood_counts
+
+revision = "0016"
+down_revision = "0015"
+description = "Add mood_cell_counts"
+
+
+def upgrade(op):
+    op.create_tables(MoodCellCount)
+    rebuild_mood_counts(op.conn, datetime.utcnow().date() - timedelta(days=365))
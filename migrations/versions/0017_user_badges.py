@@ -0,0 +1,15 @@
+"""
+Badge criteria and awards. Existing badges keep awarding on xp_requirement;
+run `make award-badges` afterwards to award badges users already qualify for.
+"""
+from models import UserActivityCount, UserBadge
+
+revision = "0017"
+down_revision = "0016"
+description = "Add badge criteria, user_badges and user_activity_counts"
+
+
+def upgrade(op):
+    op.add_column("badges", "criterion", "VARCHAR(30) DEFAULT 'xp'")
+    op.add_column("badges", "threshold", "INTEGER")
+    op.create_tables(UserBadge, UserActivityCount)
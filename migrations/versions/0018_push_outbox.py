@@ -0,0 +1,12 @@
+"""
+Push notification outbox, drained by the push dispatcher.
+"""
+from models import PushOutbox
+
+revision = "0018"
+down_revision = "0017"
+description = "Add push_outbox"
+
+
+def upgrade(op):
+    op.create_tables(PushOutbox)
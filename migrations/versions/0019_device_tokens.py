@@ -0,0 +1,15 @@
+"""
+Multi-device push tokens. Tokens stored on users.push_token are not copied:
+that column never recorded a platform, so no provider could route them. Apps
+register each device again through /notifications/register-token.
+users.push_token is dead from here on (no longer read or written).
+"""
+from models import DeviceToken
+
+revision = "0019"
+down_revision = "0018"
+description = "Add device_tokens"
+
+
+def upgrade(op):
+    op.create_tables(DeviceToken)
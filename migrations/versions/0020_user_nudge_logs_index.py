@@ -0,0 +1,9 @@
+"""Index for the nudge scheduler's per-user rate limiting."""
+revision = "0020"
+down_revision = "0019"
+description = "Add ix_user_nudge_logs_user_id_sent_at"
+transactional = False
+
+
+def upgrade(op):
+    op.create_index("ix_user_nudge_logs_user_id_sent_at", "user_nudge_logs", ["user_id", "sent_at"])
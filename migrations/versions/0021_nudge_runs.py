@@ -0,0 +1,10 @@
+"""Daily nudge runs, claimed by the one instance that sends them."""
+from models import NudgeRun
+
+revision = "0021"
+down_revision = "0020"
+description = "Add nudge_runs"
+
+
+def upgrade(op):
+    op.create_tables(NudgeRun)
@@ -0,0 +1,9 @@
+"""Interest index version, so every instance can tell when to reload its index (replaced in 0024)."""
+revision = "0022"
+down_revision = "0021"
+description = "Add interest_version"
+
+
+def upgrade(op):
+    op.execute("CREATE TABLE IF NOT EXISTS interest_version (id INTEGER PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0)")
+    op.execute("INSERT INTO interest_version (id, version) SELECT 1, 0 WHERE NOT EXISTS (SELECT 1 FROM interest_version)")
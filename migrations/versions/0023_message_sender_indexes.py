@@ -0,0 +1,10 @@
+"""Sender indexes so per-user message counts read one id range at a time."""
+revision = "0023"
+down_revision = "0022"
+description = "Index messages and messages_archive by sender_id"
+transactional = False
+
+
+def upgrade(op):
+    op.create_index("ix_messages_sender_id", "messages", ["sender_id"])
+    op.create_index("ix_messages_archive_sender_id", "messages_archive", ["sender_id"])
@@ -0,0 +1,14 @@
+"""
+Interest change log: instances apply the users listed here to their index
+instead of reloading it whenever any interest changes. Drops interest_version.
+"""
+from models import InterestChange
+
+revision = "0024"
+down_revision = "0023"
+description = "Replace interest_version with interest_changes"
+
+
+def upgrade(op):
+    op.create_tables(InterestChange)
+    op.execute("DROP TABLE IF EXISTS interest_version")
@@ -0,0 +1,9 @@
+"""Index XP ledger entries by time, for in-memory leaderboards catching up on recent awards."""
+revision = "0025"
+down_revision = "0024"
+description = "Index xp_ledger by created_at"
+transactional = False
+
+
+def upgrade(op):
+    op.create_index("ix_xp_ledger_created_at", "xp_ledger", ["created_at"])
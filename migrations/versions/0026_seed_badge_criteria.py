@@ -0,0 +1,37 @@
+"""
+Give the seeded badges in existing databases the criteria their
+descriptions call for (0017 left every badge on "xp"). Event Goer and Quiz
+Master have nothing the engine can count, so they become "manual" badges
+that only admins award. Awards the xp rule made for the changed badges are
+removed; run `make award-badges` afterwards to re-award the earned ones.
+Badges an admin already moved off "xp" are left alone.
+"""
+revision = "0026"
+down_revision = "0025"
+description = "Set criteria of the seeded badges"
+
+# name -> (criterion, threshold)
+SEEDED_CRITERIA = {
+    "First Match": ("matches", 1),
+    "Conversationalist": ("messages_sent", 50),
+    "Social Butterfly": ("matches", 10),
+    "Heart Revealer": ("reveals", 1),
+    "Event Goer": ("manual", None),
+    "Quiz Master": ("manual", None),
+    "Mood Tracker": ("mood_streak", 30),
+}
+
+
+def upgrade(op):
+    for name, (criterion, threshold) in SEEDED_CRITERIA.items():
+        badge_id = op.execute(
+            "SELECT id FROM badges WHERE name = :name AND (criterion IS NULL OR criterion = 'xp')",
+            {"name": name}
+        ).scalar()
+        if badge_id is None:
+            continue
+        op.execute(
+            "UPDATE badges SET criterion = :criterion, threshold = :threshold WHERE id = :id",
+            {"criterion": criterion, "threshold": threshold, "id": badge_id}
+        )
+        op.execute("DELETE FROM user_badges WHERE badge_id = :id", {"id": badge_id})
@@ -0,0 +1,12 @@
+"""
+Drop device tokens that 0019 used to copy from users.push_token with platform
+"unknown": the dispatcher batches by platform and no provider can route
+them. The devices get a routable row on their next register-token call.
+"""
+revision = "0027"
+down_revision = "0026"
+description = "Drop device tokens with unknown platform"
+
+
+def upgrade(op):
+    op.execute("DELETE FROM device_tokens WHERE platform = 'unknown'")
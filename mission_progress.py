@@ -0,0 +1,163 @@
+"""
+Automatic mission progress, driven by domain events.
+
+Subscribed to the event bus; for each event it looks up the user's mission
+for that day through the unique (user_id, mission_date, mission_type) index
+and bumps its progress counter with one conditional UPDATE, so completing a
+mission never re-counts messages, matches or views. The UPDATE that reaches
+the target also completes the mission, and XP is awarded through the ledger
+(idempotent per mission).
+"""
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, delete, func, select, update
+
+from daily_missions import MISSION_POOL, insert_daily_missions, missions_for
+from database import SessionLocal, insert_for
+from domain_events import DomainEvent
+from leaderboard import PENDING_KEY
+from models import Mission, MissionEventSubject
+from xp import award_xp
+
+logger = logging.getLogger(__name__)
+
+# Event names that can move any mission, to skip the rest cheaply
+TRACKED_EVENTS = frozenset(
+    mission_def["event"] for missions in MISSION_POOL.values() for mission_def in missions if "event" in mission_def
+)
+
+
+def _find_mission(db, user_id: int, mission_type: str, day: date):
+    return db.execute(
+        select(Mission.id, Mission.completed).where(
+            Mission.user_id == user_id,
+            Mission.mission_date == day,
+            Mission.mission_type == mission_type
+        )
+    ).first()
+
+
+def _count_subject(db, mission_id: int, subject_id: int, per_subject: bool) -> Optional[int]:
+    """
+    Record a subject for a mission. Returns the new progress value for
+    per-subject missions, 1 if a distinct subject was new, else None.
+    """
+    insert = insert_for(db)
+    stmt = insert(MissionEventSubject).values(mission_id=mission_id, subject_id=subject_id, count=1)
+    if per_subject:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["mission_id", "subject_id"],
+            set_={"count": MissionEventSubject.count + 1}
+        ).returning(MissionEventSubject.count)
+        return db.execute(stmt).scalar_one()
+    inserted = db.execute(stmt.on_conflict_do_nothing(index_elements=["mission_id", "subject_id"])).rowcount
+    return 1 if inserted else None
+
+
+def apply_event(db, event: DomainEvent, missions_created: Dict[tuple, bool]) -> List[int]:
+    """Advance the user's missions matching `event`. Returns ids of missions completed. Caller commits."""
+    if event.name not in TRACKED_EVENTS:
+        return []
+    day = event.occurred_at.date()
+    completed_ids = []
+    for mission_def in missions_for(day):
+        if mission_def.get("event") != event.name:
+            continue
+        distinct = mission_def.get("distinct", False)
+        per_subject = mission_def.get("per_subject", False)
+        if (distinct or per_subject) and event.subject_id is None:
+            continue
+
+        mission = _find_mission(db, event.user_id, mission_def["type"], day)
+        if mission is None and not missions_created.get((event.user_id, day)):
+            # Not materialized yet (user was inactive): create the day's missions once
+            insert_daily_missions(db, [event.user_id], day)
+            missions_created[(event.user_id, day)] = True
+            mission = _find_mission(db, event.user_id, mission_def["type"], day)
+        if mission is None or mission.completed:
+            continue
+
+        if distinct or per_subject:
+            counted = _count_subject(db, mission.id, event.subject_id, per_subject)
+            if counted is None:
+                continue
+        progress = func.coalesce(Mission.progress, 0)
+        if per_subject:
+            # Progress is the longest count within any one subject
+            new_progress = case((progress > counted, progress), else_=counted)
+        else:
+            new_progress = progress + 1
+
+        reached = new_progress >= Mission.target
+        done = db.execute(
+            update(Mission)
+            .where(Mission.id == mission.id, Mission.completed == False)
+            .values(
+                progress=new_progress,
+                completed=reached,
+                completed_at=case((reached, event.occurred_at), else_=None)
+            )
+            .returning(Mission.completed, Mission.xp_reward)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if done is not None and done.completed:
+            award_xp(db, event.user_id, done.xp_reward, "mission", reference_id=mission.id)
+            completed_ids.append(mission.id)
+    return completed_ids
+
+
+def record_mission_progress(events: List[DomainEvent]):
+    """
+    Event bus subscriber: apply a batch of events in one transaction, each in
+    its own savepoint so an event that fails is logged and skipped without
+    losing the rest of the batch
+    """
+    events = [e for e in events if e.name in TRACKED_EVENTS]
+    if not events:
+        return
+    db = SessionLocal()
+    try:
+        missions_created: Dict[tuple, bool] = {}
+        completed = 0
+        for event in events:
+            # Undone along with the savepoint if the event fails
+            created_before = dict(missions_created)
+            leaderboard_before = dict(db.info.get(PENDING_KEY, {}))
+            try:
+                with db.begin_nested():
+                    completed += len(apply_event(db, event, missions_created))
+            except Exception as e:
+                missions_created = created_before
+                db.info[PENDING_KEY] = leaderboard_before
+                logger.error(f"Skipped {event.name} event for user {event.user_id}: {e}", exc_info=True)
+        db.commit()
+        if completed:
+            logger.info(f"Completed {completed} missions from {len(events)} events")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def prune_event_subjects(db, before: date) -> int:
+    """Delete counted subjects of missions from days before `before`. Caller commits."""
+    result = db.execute(
+        delete(MissionEventSubject).where(
+            MissionEventSubject.mission_id.in_(select(Mission.id).where(Mission.mission_date < before))
+        )
+    )
+    return max(result.rowcount or 0, 0)
+
+
+def run_prune_job():
+    """Entry point for the scheduler: drop subjects of missions before yesterday"""
+    db = SessionLocal()
+    try:
+        pruned = prune_event_subjects(db, datetime.utcnow().date() - timedelta(days=1))
+        db.commit()
+        logger.info(f"Pruned {pruned} mission event subjects")
+    finally:
+        db.close()
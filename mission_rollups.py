@@ -0,0 +1,133 @@
+"""
+Mission history rollups and retention.
+
+Missions older than MISSION_RETENTION_DAYS are folded into weekly per-user
+totals (mission_rollups) and their detail rows are deleted, so the missions
+table only holds recent history. Each batch adds to the rollups and deletes
+the rows it rolled up in one transaction, so a crash part-way never counts a
+mission twice or loses one. Stats read live missions plus rollups.
+"""
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Tuple
+
+from sqlalchemy import delete, func, or_, select
+
+from config import settings
+from database import SessionLocal, insert_for
+from models import Mission, MissionEventSubject, MissionRollup
+
+logger = logging.getLogger(__name__)
+
+
+def week_start(day: date) -> date:
+    """Monday of the week containing `day`"""
+    return day - timedelta(days=day.weekday())
+
+
+def rollup_missions(db, before: date, batch_size: int = 5000) -> dict:
+    """Roll up and delete missions dated before `before`"""
+    old = or_(
+        Mission.mission_date < before,
+        # Legacy rows without a mission_date
+        Mission.mission_date.is_(None) & (Mission.created_at < datetime.combine(before, time.min))
+    )
+    insert = insert_for(db)
+    missions = 0
+    batches = 0
+    while True:
+        rows = db.execute(
+            select(Mission.id, Mission.user_id, Mission.mission_date, Mission.created_at,
+                   Mission.completed, Mission.xp_reward)
+            .where(old)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        totals: Dict[Tuple[int, date], list] = defaultdict(lambda: [0, 0, 0])
+        for _, user_id, mission_date, created_at, completed, xp_reward in rows:
+            day = mission_date or (created_at or datetime.utcnow()).date()
+            total = totals[(user_id, week_start(day))]
+            total[0] += 1
+            if completed:
+                total[1] += 1
+                total[2] += xp_reward or 0
+
+        now = datetime.utcnow()
+        stmt = insert(MissionRollup).values([
+            {
+                "user_id": user_id,
+                "week_start": week,
+                "missions_total": total,
+                "missions_completed": completed,
+                "xp_earned": xp,
+                "updated_at": now,
+            }
+            for (user_id, week), (total, completed, xp) in totals.items()
+        ])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["user_id", "week_start"],
+            set_={
+                "missions_total": MissionRollup.missions_total + stmt.excluded.missions_total,
+                "missions_completed": MissionRollup.missions_completed + stmt.excluded.missions_completed,
+                "xp_earned": MissionRollup.xp_earned + stmt.excluded.xp_earned,
+                "updated_at": stmt.excluded.updated_at,
+            }
+        ))
+
+        ids = [row[0] for row in rows]
+        db.execute(delete(MissionEventSubject).where(MissionEventSubject.mission_id.in_(ids)))
+        db.execute(delete(Mission).where(Mission.id.in_(ids)))
+        db.commit()
+        missions += len(ids)
+        batches += 1
+        logger.info(f"Rolled up {missions} missions so far")
+
+    return {"before": before.isoformat(), "missions": missions, "batches": batches}
+
+
+def rolled_up_totals(db, user_id: int) -> Tuple[int, int, int]:
+    """(missions, completed, xp) from a user's rollups"""
+    return db.execute(
+        select(
+            func.coalesce(func.sum(MissionRollup.missions_total), 0),
+            func.coalesce(func.sum(MissionRollup.missions_completed), 0),
+            func.coalesce(func.sum(MissionRollup.xp_earned), 0)
+        ).where(MissionRollup.user_id == user_id)
+    ).one()
+
+
+def run_rollup_job():
+    """Entry point for the scheduler"""
+    db = SessionLocal()
+    try:
+        result = rollup_missions(
+            db,
+            datetime.utcnow().date() - timedelta(days=settings.MISSION_RETENTION_DAYS),
+            batch_size=settings.MISSION_ROLLUP_BATCH_SIZE
+        )
+        logger.info(f"Mission rollup removed {result['missions']} detail rows")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Roll up missions past the retention window")
+    parser.add_argument("--days", type=int, default=settings.MISSION_RETENTION_DAYS,
+                        help="Keep this many days of mission detail")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = rollup_missions(
+            db,
+            datetime.utcnow().date() - timedelta(days=args.days),
+            batch_size=settings.MISSION_ROLLUP_BATCH_SIZE
+        )
+        print(f"✅ Rolled up {result['missions']} missions from before {result['before']}")
+    finally:
+        db.close()
@@ -1,10 +1,20 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, Float, Date, DateTime, ForeignKey, Text, Index, text
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime, timezone
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_latitude_longitude", "latitude", "longitude"),
+        # Covers the hotspot aggregation (recently active users with a location)
+        Index(
+            "ix_users_located_last_location_update",
+            "last_location_update", "latitude", "longitude",
+            postgresql_where=text("latitude IS NOT NULL AND longitude IS NOT NULL"),
+            sqlite_where=text("latitude IS NOT NULL AND longitude IS NOT NULL")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True)
@@ -31,7 +41,7 @@ class User(Base):
     profile_photo_url = Column(String, nullable=True)
     photo_verified = Column(Boolean, default=False)
     
-    # Push Notifications
+    # Dead: no longer read or written (devices live in device_tokens, see migration 0019)
     push_token = Column(String, nullable=True)
     
     # Admin
@@ -44,10 +54,14 @@ class User(Base):
 
 class Match(Base):
     __tablename__ = "matches"
+    __table_args__ = (
+        # Also serves the (user_a_id, user_b_id) pair lookup in create_match
+        Index("ix_matches_user_a_id_user_b_id", "user_a_id", "user_b_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_a_id = Column(Integer, ForeignKey("users.id"))
-    user_b_id = Column(Integer, ForeignKey("users.id"))
+    user_b_id = Column(Integer, ForeignKey("users.id"), index=True)
     status = Column(String, default="pending")
     
     # Identity reveal tracking
@@ -65,6 +79,11 @@ class Match(Base):
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_match_id_created_at", "match_id", "created_at"),
+        # Per-user message counts (badge backfill)
+        Index("ix_messages_sender_id", "sender_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     match_id = Column(Integer, ForeignKey("matches.id"))
@@ -78,14 +97,91 @@ class Message(Base):
     def __str__(self):
         return f"Message {self.id}"
 
+class MessageArchive(Base):
+    """Messages of cold conversations, moved out of the hot messages table"""
+    __tablename__ = "messages_archive"
+    __table_args__ = (
+        Index("ix_messages_archive_match_id_created_at", "match_id", "created_at"),
+        # Per-user message counts (badge backfill)
+        Index("ix_messages_archive_sender_id", "sender_id"),
+    )
+    
+    # Keeps the original message id
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    match_id = Column(Integer, ForeignKey("matches.id"))
+    sender_id = Column(Integer, ForeignKey("users.id"))
+    content = Column(String)
+    created_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    def __str__(self):
+        return f"Archived message {self.id}"
+
+class HotspotCellBucket(Base):
+    """Active users per hotspot tile, bucketed by the hour of their last location update"""
+    __tablename__ = "hotspot_cell_buckets"
+    __table_args__ = (
+        Index("ix_hotspot_cell_buckets_bucket_start", "bucket_start"),
+    )
+    
+    # Tile pyramid level: 0 is the 0.1° grid, each level up doubles the cell size
+    level = Column(Integer, primary_key=True, default=0)
+    cell_lat = Column(Integer, primary_key=True)  # cell index at this level
+    cell_lon = Column(Integer, primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+
+    def __str__(self):
+        return f"Cell L{self.level} ({self.cell_lat}, {self.cell_lon}) @ {self.bucket_start}: {self.count}"
+
+class Interest(Base):
+    """Normalized interest token (lowercased, trimmed)"""
+    __tablename__ = "interests"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), unique=True, index=True, nullable=False)
+
+    def __str__(self):
+        return self.name
+
+class UserInterest(Base):
+    """User <-> interest link, derived from User.interests"""
+    __tablename__ = "user_interests"
+    __table_args__ = (
+        Index("ix_user_interests_interest_id_user_id", "interest_id", "user_id"),
+    )
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    interest_id = Column(Integer, ForeignKey("interests.id"), primary_key=True)
+
+class InterestChange(Base):
+    """A user whose interests changed; every instance applies recent changes to its in-memory index"""
+    __tablename__ = "interest_changes"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    changed_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
 class Mission(Base):
     __tablename__ = "missions"
+    __table_args__ = (
+        Index("ix_missions_user_id_created_at", "user_id", "created_at"),
+        # One mission of each type per user per day
+        Index("uq_missions_user_id_mission_date_mission_type", "user_id", "mission_date", "mission_type", unique=True),
+        # Covers the completed-mission count and XP sum in /missions/stats
+        Index("ix_missions_user_id_completed", "user_id", "completed", "xp_reward"),
+        # Finds missions past the retention window for the rollup job
+        Index("ix_missions_mission_date", "mission_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     mission_type = Column(String)
+    mission_date = Column(Date, nullable=True)  # UTC day the mission belongs to
     completed = Column(Boolean, default=False)
     xp_reward = Column(Integer, default=10)
+    progress = Column(Integer, default=0)  # events counted so far (event-tracked missions)
+    target = Column(Integer, default=1)
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
 
@@ -94,12 +190,58 @@ class Mission(Base):
     def __str__(self):
         return f"{self.mission_type} ({'Done' if self.completed else 'Pending'})"
 
+class MissionRollup(Base):
+    """Weekly per-user mission totals for missions past the retention window"""
+    __tablename__ = "mission_rollups"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    week_start = Column(Date, primary_key=True)  # Monday (UTC)
+    missions_total = Column(Integer, default=0)
+    missions_completed = Column(Integer, default=0)
+    xp_earned = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    def __str__(self):
+        return f"Week of {self.week_start}: {self.missions_completed}/{self.missions_total}"
+
+class MissionEventSubject(Base):
+    """Subjects (users, matches) already counted toward a distinct or per-subject mission"""
+    __tablename__ = "mission_event_subjects"
+    
+    mission_id = Column(Integer, ForeignKey("missions.id"), primary_key=True)
+    subject_id = Column(Integer, primary_key=True)
+    count = Column(Integer, default=1)
+
+class XPLedgerEntry(Base):
+    """Append-only record of every XP change; users.xp is the running total"""
+    __tablename__ = "xp_ledger"
+    __table_args__ = (
+        Index("ix_xp_ledger_user_id_id", "user_id", "id"),
+        # Recent awards (leaderboard sync)
+        Index("ix_xp_ledger_created_at", "created_at"),
+        # The same source (e.g. a mission) can only award XP once
+        Index("uq_xp_ledger_reason_reference_id", "reason", "reference_id", unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    amount = Column(Integer, nullable=False)
+    reason = Column(String(50), nullable=False)  # mission, opening_balance, ...
+    reference_id = Column(Integer, nullable=True)  # e.g. mission id
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def __str__(self):
+        return f"{self.amount:+d} XP ({self.reason})"
+
 class Block(Base):
     __tablename__ = "blocks"
+    __table_args__ = (
+        Index("ix_blocks_user_id_blocked_user_id", "user_id", "blocked_user_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
-    blocked_user_id = Column(Integer, ForeignKey("users.id"))
+    blocked_user_id = Column(Integer, ForeignKey("users.id"), index=True)
     reason = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
@@ -136,11 +278,33 @@ class Badge(Base):
     description = Column(Text, nullable=True)
     icon_url = Column(String, nullable=True)
     xp_requirement = Column(Integer, default=0)
+    # What the badge is awarded for: "xp" (xp_requirement), an activity
+    # count such as "messages_sent" reaching `threshold` (see badge_engine),
+    # or "manual" (awarded by admins only)
+    criterion = Column(String(30), default="xp")
+    threshold = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     def __str__(self):
         return self.name
 
+class UserBadge(Base):
+    __tablename__ = "user_badges"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    badge_id = Column(Integer, ForeignKey("badges.id"), primary_key=True)
+    awarded_at = Column(DateTime, default=datetime.utcnow)
+
+    badge = relationship("Badge")
+
+class UserActivityCount(Base):
+    """Running per-user activity totals (messages sent, matches, ...) for badge criteria"""
+    __tablename__ = "user_activity_counts"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    metric = Column(String(30), primary_key=True)
+    value = Column(Integer, default=0)
+
 class UserProfile(Base):
     __tablename__ = "user_profiles"
     
@@ -198,6 +362,9 @@ class UserIcebreaker(Base):
 
 class MoodCheckIn(Base):
     __tablename__ = "mood_checkins"
+    __table_args__ = (
+        Index("ix_mood_checkins_user_id_date", "user_id", "date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -210,6 +377,28 @@ class MoodCheckIn(Base):
     def __str__(self):
         return f"{self.mood} on {self.date.strftime('%Y-%m-%d')}"
 
+class MoodCellCount(Base):
+    """Users whose first check-in of a day was `mood`, per day and grid cell"""
+    __tablename__ = "mood_cell_counts"
+    
+    day = Column(Date, primary_key=True)
+    cell_lat = Column(Integer, primary_key=True)  # hotspot grid cell at mood_analytics.CELL_LEVEL
+    cell_lon = Column(Integer, primary_key=True)
+    mood = Column(String(20), primary_key=True)
+    users = Column(Integer, default=0)
+
+class MoodStats(Base):
+    """Per-user mood streaks and recent distribution, updated on every check-in"""
+    __tablename__ = "mood_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    current_streak = Column(Integer, default=0)  # consecutive UTC days ending last_checkin_date
+    longest_streak = Column(Integer, default=0)
+    last_checkin_date = Column(Date, nullable=True)
+    total_checkins = Column(Integer, default=0)
+    recent = Column(Text)  # JSON string: {"YYYY-MM-DD": {mood: count}} for the last 30 days
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
 class CompatibilityQuiz(Base):
     __tablename__ = "compatibility_quizzes"
     
@@ -239,6 +428,55 @@ class UserQuizResult(Base):
     def __str__(self):
         return f"User {self.user_id} - Quiz {self.quiz_id}"
 
+class DeviceToken(Base):
+    """A device registered for push notifications; a user can have several"""
+    __tablename__ = "device_tokens"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    token = Column(String(255), nullable=False, unique=True)
+    platform = Column(String(20), nullable=False)  # ios, android, web (unknown for backfilled tokens)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_seen_at = Column(DateTime, default=datetime.utcnow)
+
+    def __str__(self):
+        return f"{self.platform} device of {self.user_id}"
+
+class PushOutbox(Base):
+    """Push notifications waiting to be sent (see push.py)"""
+    __tablename__ = "push_outbox"
+    __table_args__ = (
+        # Dispatcher: due rows in order
+        Index("ix_push_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+        # At most one pending notification per user and coalesce key; repeats bump `count`
+        Index(
+            "uq_push_outbox_pending_user_id_coalesce_key",
+            "user_id", "coalesce_key",
+            unique=True,
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'")
+        ),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    category = Column(String(30), default="general")  # message, match, reveal, nudge, ...
+    coalesce_key = Column(String(100), nullable=False)
+    title = Column(String(200))
+    body = Column(Text)
+    summary = Column(String(200), nullable=True)  # body when coalesced, e.g. "{count} new messages"
+    data = Column(Text, nullable=True)  # JSON string
+    count = Column(Integer, default=1)
+    status = Column(String(20), default="pending")  # pending, sending, retry, sent, no_device, failed
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    def __str__(self):
+        return f"{self.category} to {self.user_id} ({self.status})"
+
 class Nudge(Base):
     __tablename__ = "nudges"
     
@@ -254,6 +492,10 @@ class Nudge(Base):
 
 class UserNudgeLog(Base):
     __tablename__ = "user_nudge_logs"
+    __table_args__ = (
+        # Nudge rate limiting: a user's recent nudges
+        Index("ix_user_nudge_logs_user_id_sent_at", "user_id", "sent_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -266,6 +508,19 @@ class UserNudgeLog(Base):
     def __str__(self):
         return f"Nudge {self.nudge_id} sent to {self.user_id}"
 
+class NudgeRun(Base):
+    """One row per day the nudge job ran; inserting it claims the run for one instance"""
+    __tablename__ = "nudge_runs"
+    
+    run_date = Column(Date, primary_key=True)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    users = Column(Integer, default=0)
+    sent = Column(Integer, default=0)
+
+    def __str__(self):
+        return f"Nudges {self.run_date}: {self.sent} sent"
+
 class Event(Base):
     __tablename__ = "events"
     
@@ -283,10 +538,13 @@ class Event(Base):
 
 class UserEventRegistration(Base):
     __tablename__ = "user_event_registrations"
+    __table_args__ = (
+        Index("ix_user_event_registrations_user_id_event_id", "user_id", "event_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
-    event_id = Column(Integer, ForeignKey("events.id"))
+    event_id = Column(Integer, ForeignKey("events.id"), index=True)
     registered_at = Column(DateTime, default=datetime.utcnow)
     
     user = relationship("User")
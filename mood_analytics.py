@@ -0,0 +1,157 @@
+"""
+Population mood analytics.
+
+mood_cell_counts holds, per UTC day, hotspot grid cell (CELL_LEVEL, about
+0.8°) and mood, the number of users whose first check-in of that day was
+that mood. A check-in bumps one counter in its own transaction, so trend
+queries read a few thousand pre-aggregated rows per year instead of
+scanning mood_checkins. A cell's day with fewer than
+MOOD_ANALYTICS_MIN_USERS users is dropped (HAVING, in the same query that
+adds up the rest), so one person checking in every day never makes a cell
+visible; only the final per-cell totals reach Python.
+"""
+import logging
+from collections import Counter
+from datetime import date, datetime, time
+from typing import Optional
+
+from sqlalchemy import delete, func, select
+
+from database import SessionLocal, insert_for
+from hotspot_grid import cell_center, cell_for, cell_size
+from models import MoodCellCount, MoodCheckIn, User
+
+logger = logging.getLogger(__name__)
+
+CELL_LEVEL = 3
+
+
+def _upsert_counts(db, counts: Counter, batch_size: int = 1000):
+    """Add {(day, cell_lat, cell_lon, mood): users} to the stored counts"""
+    items = list(counts.items())
+    insert = insert_for(db)
+    for start in range(0, len(items), batch_size):
+        stmt = insert(MoodCellCount).values([
+            {"day": day, "cell_lat": cell_lat, "cell_lon": cell_lon, "mood": mood, "users": users}
+            for (day, cell_lat, cell_lon, mood), users in items[start:start + batch_size]
+        ])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["day", "cell_lat", "cell_lon", "mood"],
+            set_={"users": MoodCellCount.users + stmt.excluded.users}
+        ))
+
+
+def record_mood(db, day: date, latitude: Optional[float], longitude: Optional[float], mood: str):
+    """Count a user's first check-in of the day. Caller commits."""
+    if latitude is None or longitude is None or not mood:
+        return
+    cell_lat, cell_lon = cell_for(latitude, longitude, CELL_LEVEL)
+    _upsert_counts(db, Counter({(day, cell_lat, cell_lon, mood[:20]): 1}))
+
+
+def rebuild_mood_counts(db, since: date) -> int:
+    """
+    Recompute counts from mood_checkins for days from `since`. Check-ins are
+    placed at each user's current location. Returns the number of rows written.
+    Caller commits.
+    """
+    db.execute(delete(MoodCellCount).where(MoodCellCount.day >= since))
+    rows = db.execute(
+        select(MoodCheckIn.user_id, MoodCheckIn.date, MoodCheckIn.mood, User.latitude, User.longitude)
+        .join(User, User.id == MoodCheckIn.user_id)
+        .where(
+            MoodCheckIn.date >= datetime.combine(since, time.min),
+            User.latitude.isnot(None),
+            User.longitude.isnot(None)
+        )
+        .order_by(MoodCheckIn.user_id, MoodCheckIn.date)
+        .execution_options(yield_per=10000)
+    )
+    counts = Counter()
+    seen = set()
+    for user_id, checked_in_at, mood, latitude, longitude in rows:
+        day = checked_in_at.date()
+        if (user_id, day) in seen or not mood:
+            continue
+        seen.add((user_id, day))
+        cell_lat, cell_lon = cell_for(latitude, longitude, CELL_LEVEL)
+        counts[(day, cell_lat, cell_lon, mood[:20])] += 1
+    _upsert_counts(db, counts)
+    logger.info(f"Rebuilt {len(counts)} mood cell counts since {since}")
+    return len(counts)
+
+
+def query_mood_counts(db, start: date, end: date, by_day: bool = False, min_users: int = 10) -> dict:
+    """
+    Mood counts per cell (and day) between start and end inclusive. Each
+    (day, cell) with fewer than `min_users` users is suppressed first; over a
+    range the remaining days are added up as user-days.
+    """
+    cell_day = (MoodCellCount.day, MoodCellCount.cell_lat, MoodCellCount.cell_lon)
+    in_range = MoodCellCount.day.between(start, end)
+    visible = (
+        select(*cell_day).where(in_range).group_by(*cell_day)
+        .having(func.sum(MoodCellCount.users) >= min_users)
+        .subquery()
+    )
+    bucket = (MoodCellCount.day,) if by_day else ()
+    bucket += (MoodCellCount.cell_lat, MoodCellCount.cell_lon)
+    rows = db.execute(
+        select(*bucket, MoodCellCount.mood, func.sum(MoodCellCount.users))
+        .join(visible, (visible.c.day == MoodCellCount.day)
+              & (visible.c.cell_lat == MoodCellCount.cell_lat)
+              & (visible.c.cell_lon == MoodCellCount.cell_lon))
+        .where(in_range)
+        .group_by(*bucket, MoodCellCount.mood)
+    )
+    buckets = {}
+    for *key, mood, users in rows:
+        buckets.setdefault(tuple(key), Counter())[mood] = users
+    suppressed = db.scalar(
+        select(func.count()).select_from(
+            select(*cell_day).where(in_range).group_by(*cell_day)
+            .having(func.sum(MoodCellCount.users) < min_users)
+            .subquery()
+        )
+    )
+
+    cells = []
+    for key, moods in buckets.items():
+        day, cell_lat, cell_lon = key if by_day else (None, *key)
+        cell = {
+            "latitude": cell_center(cell_lat, CELL_LEVEL),
+            "longitude": cell_center(cell_lon, CELL_LEVEL),
+            "moods": dict(moods.most_common()),
+        }
+        if by_day:
+            cell["day"] = day.isoformat()
+            cell["users"] = sum(moods.values())
+        else:
+            cell["user_days"] = sum(moods.values())
+        cells.append(cell)
+    cells.sort(key=lambda c: (c.get("day", ""), -c.get("users", c.get("user_days", 0))))
+
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "cell_size": cell_size(CELL_LEVEL),
+        "min_users": min_users,
+        "cells": cells,
+        "suppressed_cell_days": suppressed,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild mood analytics counts from check-ins")
+    parser.add_argument("--since", type=date.fromisoformat, required=True, help="YYYY-MM-DD")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        written = rebuild_mood_counts(db, args.since)
+        db.commit()
+        print(f"✅ Rebuilt {written} mood cell counts since {args.since}")
+    finally:
+        db.close()
@@ -0,0 +1,171 @@
+"""
+Per-user mood streaks and recent mood distribution.
+
+Every check-in updates the user's mood_stats row in the same transaction:
+current and longest streak of consecutive UTC days with a check-in, and the
+mood counts of each of the last RECENT_DAYS days. /mood/insights reads that
+one row, so streaks and 7/30-day distributions never scan mood_checkins.
+backfill_mood_stats rebuilds every row from existing check-ins.
+"""
+import json
+import logging
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+
+from badge_engine import badge_engine
+from database import SessionLocal, insert_for
+from models import MoodCheckIn, MoodStats
+
+logger = logging.getLogger(__name__)
+
+RECENT_DAYS = 30
+
+
+def _recent(stats: MoodStats) -> dict:
+    return json.loads(stats.recent) if stats.recent else {}
+
+
+def apply_checkin(stats: MoodStats, mood: str, day: date):
+    """Fold one check-in into the stats (check-ins for a day before the last one only count toward totals)"""
+    last = stats.last_checkin_date
+    if last is None or day == last + timedelta(days=1):
+        stats.current_streak = (stats.current_streak or 0) + 1
+    elif day > last:
+        stats.current_streak = 1
+    if last is None or day > last:
+        stats.last_checkin_date = day
+    stats.longest_streak = max(stats.longest_streak or 0, stats.current_streak or 0)
+    stats.total_checkins = (stats.total_checkins or 0) + 1
+
+    recent = _recent(stats)
+    horizon = (stats.last_checkin_date - timedelta(days=RECENT_DAYS - 1)).isoformat()
+    if day.isoformat() >= horizon:
+        counts = recent.setdefault(day.isoformat(), {})
+        counts[mood] = counts.get(mood, 0) + 1
+    stats.recent = json.dumps({d: c for d, c in recent.items() if d >= horizon}, sort_keys=True)
+    stats.updated_at = datetime.utcnow()
+
+
+def record_checkin(db, user_id: int, mood: str, day: date) -> bool:
+    """Update a user's stats for a new check-in. Returns True for the first check-in of `day`. Caller commits."""
+    insert = insert_for(db)
+    db.execute(insert(MoodStats).values(user_id=user_id).on_conflict_do_nothing(index_elements=["user_id"]))
+    # Row lock so concurrent check-ins by the same user apply one after the other
+    stats = db.execute(
+        select(MoodStats).where(MoodStats.user_id == user_id).with_for_update()
+    ).scalar_one()
+    first_of_day = stats.last_checkin_date is None or day > stats.last_checkin_date
+    longest = stats.longest_streak or 0
+    apply_checkin(stats, mood, day)
+    badge_engine.check(db, user_id, "mood_streak", longest, stats.longest_streak)
+    return first_of_day
+
+
+def _distribution(recent: dict, today: date, days: int) -> dict:
+    since = (today - timedelta(days=days - 1)).isoformat()
+    counts = Counter()
+    for day, moods in recent.items():
+        if day >= since:
+            counts.update(moods)
+    total = sum(counts.values())
+    return {
+        "checkins": total,
+        "moods": {
+            mood: {"count": count, "percent": round(count / total * 100, 1)}
+            for mood, count in counts.most_common()
+        },
+    }
+
+
+def insights(stats: Optional[MoodStats], today: Optional[date] = None) -> dict:
+    """Streaks and 7/30-day distributions from a stats row (None = no check-ins yet)"""
+    today = today or datetime.utcnow().date()
+    if stats is None or stats.last_checkin_date is None:
+        return {
+            "current_streak": 0,
+            "longest_streak": 0,
+            "checked_in_today": False,
+            "total_checkins": 0,
+            "last_7_days": _distribution({}, today, 7),
+            "last_30_days": _distribution({}, today, 30),
+        }
+    # A streak survives until the end of the day after its last check-in
+    alive = stats.last_checkin_date >= today - timedelta(days=1)
+    recent = _recent(stats)
+    return {
+        "current_streak": stats.current_streak if alive else 0,
+        "longest_streak": stats.longest_streak,
+        "checked_in_today": stats.last_checkin_date == today,
+        "total_checkins": stats.total_checkins,
+        "last_7_days": _distribution(recent, today, 7),
+        "last_30_days": _distribution(recent, today, 30),
+    }
+
+
+def _rebuild(user_id: int, checkins: Iterable[tuple]) -> MoodStats:
+    stats = MoodStats(user_id=user_id, current_streak=0, longest_streak=0, total_checkins=0)
+    for mood, checked_in_at in checkins:
+        apply_checkin(stats, mood, checked_in_at.date())
+    return stats
+
+
+def backfill_mood_stats(db, batch_size: int = 1000) -> int:
+    """Rebuild mood_stats from mood_checkins, a batch of users at a time. Returns users processed. Caller commits."""
+    users = 0
+    last_id = 0
+    while True:
+        user_ids = db.scalars(
+            select(MoodCheckIn.user_id)
+            .where(MoodCheckIn.user_id > last_id)
+            .group_by(MoodCheckIn.user_id)
+            .order_by(MoodCheckIn.user_id)
+            .limit(batch_size)
+        ).all()
+        if not user_ids:
+            break
+
+        rows = db.execute(
+            select(MoodCheckIn.user_id, MoodCheckIn.mood, MoodCheckIn.date)
+            .where(MoodCheckIn.user_id.in_(user_ids), MoodCheckIn.date.isnot(None))
+            .order_by(MoodCheckIn.user_id, MoodCheckIn.date)
+        ).all()
+        by_user = {}
+        for user_id, mood, checked_in_at in rows:
+            by_user.setdefault(user_id, []).append((mood, checked_in_at))
+
+        values = []
+        for user_id, checkins in by_user.items():
+            stats = _rebuild(user_id, checkins)
+            values.append({
+                "user_id": user_id,
+                "current_streak": stats.current_streak,
+                "longest_streak": stats.longest_streak,
+                "last_checkin_date": stats.last_checkin_date,
+                "total_checkins": stats.total_checkins,
+                "recent": stats.recent,
+                "updated_at": stats.updated_at,
+            })
+        if values:
+            insert = insert_for(db)
+            stmt = insert(MoodStats).values(values)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=["user_id"],
+                set_={column: stmt.excluded[column] for column in values[0] if column != "user_id"}
+            ))
+        users += len(user_ids)
+        last_id = user_ids[-1]
+        logger.info(f"Rebuilt mood stats for {users} users")
+    return users
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        users = backfill_mood_stats(db)
+        db.commit()
+        print(f"✅ Rebuilt mood stats for {users} users")
+    finally:
+        db.close()
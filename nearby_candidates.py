@@ -0,0 +1,209 @@
+"""
+Precomputed nearby-candidate lists.
+
+After a location update a worker pool computes the user's candidate list
+(ids and distances of active users within CANDIDATE_RADIUS_MILES) and keeps
+it in a bounded TTL cache, so /matches/nearby only has to load the cached
+candidates instead of scanning users. A list is recomputed when it expires or
+when the user has moved more than NEARBY_CANDIDATE_MOVE_MILES from where it
+was computed. The endpoint re-checks current distances, so candidates who
+moved away since are dropped.
+
+Blocks and matches are not baked into the lists; the endpoint filters them at
+serve time so a new block takes effect immediately.
+
+Distance is symmetric, so a new list is also merged into the cached lists of
+its nearest MAX_FANOUT candidates. That fan-out runs on the worker pool, never
+in a request, and each merge is a binary-search insert under that list's own
+lock.
+"""
+import bisect
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from cache import TTLCache
+from config import settings
+from database import SessionLocal
+from models import User
+from utils import bounding_box, haversine_distance
+
+logger = logging.getLogger(__name__)
+
+CANDIDATE_RADIUS_MILES = 50
+ACTIVE_WITHIN = timedelta(hours=72)
+MAX_FANOUT = 200  # cached lists a new list is merged into
+
+
+class CandidateList:
+    """Candidates for one user, computed from (latitude, longitude)"""
+
+    __slots__ = ("latitude", "longitude", "radius", "computed_at", "_entries", "_distances", "_lock")
+
+    def __init__(self, latitude: float, longitude: float, radius: float, candidates: List[Tuple[int, float]]):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.radius = radius
+        self.computed_at = datetime.utcnow()
+        self._entries = sorted((distance, user_id) for user_id, distance in candidates)
+        self._distances = {user_id: distance for distance, user_id in self._entries}
+        self._lock = threading.Lock()
+
+    @property
+    def candidates(self) -> List[Tuple[int, float]]:
+        """(user id, distance in miles), nearest first"""
+        with self._lock:
+            return [(user_id, distance) for distance, user_id in self._entries]
+
+    def upsert(self, user_id: int, distance: float):
+        """Add a candidate or move it to its new distance, keeping the list sorted"""
+        with self._lock:
+            old = self._distances.get(user_id)
+            if old is not None:
+                del self._entries[bisect.bisect_left(self._entries, (old, user_id))]
+            bisect.insort(self._entries, (distance, user_id))
+            self._distances[user_id] = distance
+
+
+def compute_candidates(db, user_id: int, latitude: float, longitude: float, radius: float = CANDIDATE_RADIUS_MILES) -> CandidateList:
+    """Active users within `radius` miles of the given point"""
+    min_lat, min_lon, max_lat, max_lon = bounding_box(latitude, longitude, radius)
+    if min_lon <= max_lon:
+        lon_filter = User.longitude.between(min_lon, max_lon)
+    else:
+        lon_filter = (User.longitude >= min_lon) | (User.longitude <= max_lon)
+
+    rows = db.query(User.id, User.latitude, User.longitude).filter(
+        User.id != user_id,
+        User.latitude.between(min_lat, max_lat),
+        lon_filter,
+        User.last_location_update >= datetime.utcnow() - ACTIVE_WITHIN
+    ).all()
+
+    candidates = []
+    for other_id, other_lat, other_lon in rows:
+        distance = haversine_distance(latitude, longitude, other_lat, other_lon)
+        if distance <= radius:
+            candidates.append((other_id, distance))
+    candidates.sort(key=lambda c: c[1])
+    return CandidateList(latitude, longitude, radius, candidates)
+
+
+class NearbyCandidateRefresher:
+    def __init__(self, session_factory=SessionLocal, max_workers: int = 4, maxsize: int = 50000,
+                 ttl_seconds: float = 300, move_threshold_miles: float = 0.5):
+        self.session_factory = session_factory
+        self.max_workers = max_workers
+        self.move_threshold_miles = move_threshold_miles
+        self.cache = TTLCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self.refreshes = 0
+        self.failed_refreshes = 0
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    def start(self):
+        """Start the worker pool"""
+        if self.running:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="nearby-refresh")
+        logger.info(f"Nearby candidate refresher started ({self.max_workers} workers)")
+
+    def stop(self):
+        """Stop the worker pool, dropping refreshes that have not started"""
+        if not self.running:
+            return
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = None
+        logger.info("Nearby candidate refresher stopped")
+
+    def is_fresh(self, entry: Optional[CandidateList], latitude: float, longitude: float) -> bool:
+        """Cached entry still valid for a user now at (latitude, longitude)"""
+        if entry is None:
+            return False
+        moved = haversine_distance(entry.latitude, entry.longitude, latitude, longitude)
+        return moved <= self.move_threshold_miles
+
+    def location_updated(self, user_id: int, latitude: float, longitude: float):
+        """Queue a recompute unless the cached list is still valid for the new location"""
+        if not self.running:
+            return
+        if self.is_fresh(self.cache.get(user_id), latitude, longitude):
+            return
+        with self._lock:
+            if user_id in self._in_flight:
+                return
+            self._in_flight.add(user_id)
+        try:
+            self._executor.submit(self._refresh, user_id, latitude, longitude)
+        except RuntimeError:
+            # Pool shut down between the check and the submit
+            with self._lock:
+                self._in_flight.discard(user_id)
+
+    def get(self, db, user_id: int, latitude: float, longitude: float) -> CandidateList:
+        """Cached candidate list, recomputed in the request only on a miss"""
+        entry = self.cache.get(user_id)
+        if self.is_fresh(entry, latitude, longitude):
+            return entry
+        entry = compute_candidates(db, user_id, latitude, longitude)
+        self.cache.set(user_id, entry)
+        if self.running:
+            try:
+                self._executor.submit(self._fan_out, user_id, entry)
+            except RuntimeError:
+                pass  # Pool shut down; the other lists just miss this user until they expire
+        return entry
+
+    def _fan_out(self, user_id: int, entry: CandidateList):
+        """Add this user to the cached lists of their nearest candidates, so
+        people who arrive later show up before those lists expire"""
+        for other_id, _ in entry.candidates[:MAX_FANOUT]:
+            other = self.cache.get(other_id)
+            if other is None:
+                continue
+            distance = haversine_distance(other.latitude, other.longitude, entry.latitude, entry.longitude)
+            if distance <= other.radius:
+                other.upsert(user_id, distance)
+
+    def _refresh(self, user_id: int, latitude: float, longitude: float):
+        db = self.session_factory()
+        try:
+            entry = compute_candidates(db, user_id, latitude, longitude)
+            self.cache.set(user_id, entry)
+            self._fan_out(user_id, entry)
+            with self._lock:
+                self.refreshes += 1
+        except Exception as e:
+            logger.error(f"Failed to refresh nearby candidates for user {user_id}: {e}")
+            with self._lock:
+                self.failed_refreshes += 1
+        finally:
+            db.close()
+            with self._lock:
+                self._in_flight.discard(user_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": self.running,
+                "workers": self.max_workers,
+                "in_flight": len(self._in_flight),
+                "refreshes": self.refreshes,
+                "failed_refreshes": self.failed_refreshes,
+                "cache": self.cache.stats(),
+            }
+
+
+nearby_refresher = NearbyCandidateRefresher(
+    max_workers=settings.NEARBY_CANDIDATE_WORKERS,
+    maxsize=settings.NEARBY_CANDIDATE_CACHE_SIZE,
+    ttl_seconds=settings.NEARBY_CANDIDATE_TTL_SECONDS,
+    move_threshold_miles=settings.NEARBY_CANDIDATE_MOVE_MILES
+)
@@ -0,0 +1,240 @@
+"""
+Nudge scheduler.
+
+Walks users with a registered device in keyset batches (users.id order,
+NUDGE_BATCH_SIZE at a time, each batch streamed from its cursor), works out
+which nudge types apply to each user and queues one push per user through
+the outbox. Memory stays bounded by the batch size whatever the cohort.
+
+Nudge types:
+    mission_reminder  active users with an unfinished mission today
+    match_alert       active users without any match yet
+    engagement        users not seen for NUDGE_INACTIVE_DAYS
+
+A user was last seen at their last location update, or at sign-up if they
+never shared a location. Users not seen for NUDGE_LOOKBACK_DAYS are left
+alone: they get no nudges of any type.
+
+Every user has a token bucket holding up to NUDGE_BURST nudges and refilling
+at NUDGE_MAX_PER_DAY. Buckets are rebuilt for each batch from that batch's
+recent user_nudge_logs rows, so the cap holds across runs. Every instance
+schedules the job, but a run first claims the day in nudge_runs (insert,
+do nothing on conflict) and only the instance that inserted the row sends.
+Premium nudges are skipped: users have no premium flag yet.
+"""
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import exists, func, insert, select, union, update
+
+from config import settings
+from database import SessionLocal, insert_for
+from models import DeviceToken, Match, Mission, Nudge, NudgeRun, User, UserNudgeLog
+from push import enqueue_many
+
+logger = logging.getLogger(__name__)
+
+# Checked in this order; a user gets at most one nudge per run
+NUDGE_TYPES = ("mission_reminder", "match_alert", "engagement")
+
+NUDGE_TITLES = {
+    "mission_reminder": "Your daily missions are waiting",
+    "match_alert": "New people are nearby",
+    "engagement": "We miss you",
+}
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, tokens: float, updated_at: datetime):
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+
+class NudgeRateLimiter:
+    """Per-user token buckets for one batch of users, seeded from user_nudge_logs"""
+
+    def __init__(self, per_day: float = 1.0, burst: int = 2):
+        self.rate = per_day / 86400  # tokens per second
+        self.capacity = burst
+        self._buckets: Dict[int, TokenBucket] = {}
+
+    @property
+    def window(self) -> timedelta:
+        """Time for an empty bucket to fill up; older nudges no longer matter"""
+        return timedelta(seconds=self.capacity / self.rate)
+
+    def _refill(self, bucket: TokenBucket, at: datetime):
+        elapsed = (at - bucket.updated_at).total_seconds()
+        if elapsed > 0:
+            bucket.tokens = min(self.capacity, bucket.tokens + elapsed * self.rate)
+            bucket.updated_at = at
+
+    def seed(self, db, user_ids: List[int], now: datetime):
+        """Replace the buckets with ones for `user_ids`, replaying their nudges within the window"""
+        since = now - self.window
+        self._buckets = {user_id: TokenBucket(self.capacity, since) for user_id in user_ids}
+        logs = db.execute(
+            select(UserNudgeLog.user_id, UserNudgeLog.sent_at)
+            .where(UserNudgeLog.user_id.in_(user_ids), UserNudgeLog.sent_at >= since)
+            .order_by(UserNudgeLog.user_id, UserNudgeLog.sent_at)
+        )
+        for user_id, sent_at in logs:
+            bucket = self._buckets[user_id]
+            self._refill(bucket, sent_at)
+            bucket.tokens = max(bucket.tokens - 1, 0)
+
+    def allow(self, user_id: int, now: datetime) -> bool:
+        """Take a token for `user_id` if one is available"""
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            return False
+        self._refill(bucket, now)
+        if bucket.tokens < 1:
+            return False
+        bucket.tokens -= 1
+        return True
+
+
+def _eligible(db, users: List[tuple], now: datetime) -> Dict[str, Set[int]]:
+    """Nudge type -> ids of users in the batch it applies to"""
+    inactive_since = now - timedelta(days=settings.NUDGE_INACTIVE_DAYS)
+    active = [user_id for user_id, last_seen in users if last_seen >= inactive_since]
+    eligible = {
+        "engagement": {user_id for user_id, last_seen in users if last_seen < inactive_since},
+        "mission_reminder": set(),
+        "match_alert": set(),
+    }
+    if active:
+        eligible["mission_reminder"] = set(db.scalars(
+            select(Mission.user_id).where(
+                Mission.user_id.in_(active),
+                Mission.mission_date == now.date(),
+                Mission.completed == False
+            ).distinct()
+        ))
+        matched = set(db.scalars(union(
+            select(Match.user_a_id).where(Match.user_a_id.in_(active)),
+            select(Match.user_b_id).where(Match.user_b_id.in_(active))
+        )))
+        eligible["match_alert"] = set(active) - matched
+    return eligible
+
+
+def claim_run(db, now: datetime) -> bool:
+    """Record today's run; False if another instance (or an earlier run) already has it"""
+    insert_run = insert_for(db)
+    claimed = db.execute(
+        insert_run(NudgeRun)
+        .values(run_date=now.date(), started_at=now, users=0, sent=0)
+        .on_conflict_do_nothing(index_elements=["run_date"])
+    ).rowcount != 0
+    db.commit()
+    return claimed
+
+
+def _finish_run(db, now: datetime, result: dict):
+    db.execute(
+        update(NudgeRun)
+        .where(NudgeRun.run_date == now.date())
+        .values(finished_at=datetime.utcnow(), users=result["users"], sent=result["sent"])
+    )
+    db.commit()
+
+
+def send_nudges(db, now: Optional[datetime] = None, batch_size: int = 1000,
+                limiter: Optional[NudgeRateLimiter] = None) -> dict:
+    """Queue nudges for every eligible user, `batch_size` users per transaction. Runs once per UTC day."""
+    now = now or datetime.utcnow()
+    if not claim_run(db, now):
+        logger.info(f"Nudges for {now.date()} already sent, skipping")
+        return {"skipped": True, "users": 0, "sent": 0, "rate_limited": 0}
+    limiter = limiter or NudgeRateLimiter(settings.NUDGE_MAX_PER_DAY, settings.NUDGE_BURST)
+    nudges_by_type: Dict[str, List[Nudge]] = {}
+    for nudge in db.scalars(select(Nudge).where(Nudge.active == True, Nudge.premium == False)):
+        nudges_by_type.setdefault(nudge.type, []).append(nudge)
+    types = [nudge_type for nudge_type in NUDGE_TYPES if nudge_type in nudges_by_type]
+    result = {"users": 0, "sent": 0, "rate_limited": 0, **{nudge_type: 0 for nudge_type in types}}
+    if not types:
+        logger.info("No active nudges to send")
+        _finish_run(db, now, result)
+        return result
+
+    lookback = now - timedelta(days=settings.NUDGE_LOOKBACK_DAYS)
+    last_seen_at = func.coalesce(User.last_location_update, User.created_at)
+    last_id = 0
+    while True:
+        batch = db.execute(
+            select(User.id, last_seen_at)
+            .where(
+                User.id > last_id,
+                last_seen_at >= lookback,
+                exists().where(DeviceToken.user_id == User.id)
+            )
+            .order_by(User.id)
+            .limit(batch_size)
+            .execution_options(yield_per=batch_size)
+        )
+        users = [(user_id, last_seen) for user_id, last_seen in batch]
+        if not users:
+            break
+        last_id = users[-1][0]
+        user_ids = [user_id for user_id, _ in users]
+
+        limiter.seed(db, user_ids, now)
+        eligible = _eligible(db, users, now)
+        notifications = []
+        logs = []
+        for user_id in user_ids:
+            nudge_type = next((t for t in types if user_id in eligible[t]), None)
+            if nudge_type is None:
+                continue
+            if not limiter.allow(user_id, now):
+                result["rate_limited"] += 1
+                continue
+            nudge = random.choice(nudges_by_type[nudge_type])
+            notifications.append({
+                "user_id": user_id,
+                "title": NUDGE_TITLES[nudge_type],
+                "body": nudge.message,
+                "category": "nudge",
+                "coalesce_key": "nudge",
+                "data": {"type": "nudge", "nudge_type": nudge_type, "nudge_id": nudge.id},
+            })
+            logs.append({"user_id": user_id, "nudge_id": nudge.id, "sent_at": now})
+            result[nudge_type] += 1
+
+        enqueue_many(db, notifications)
+        if logs:
+            db.execute(insert(UserNudgeLog), logs)
+        db.commit()
+        result["users"] += len(users)
+        result["sent"] += len(notifications)
+
+    _finish_run(db, now, result)
+    logger.info(f"Queued {result['sent']} nudges for {result['users']} users ({result['rate_limited']} rate limited)")
+    return result
+
+
+def run_nudge_job():
+    """Entry point for the scheduler"""
+    db = SessionLocal()
+    try:
+        send_nudges(db, batch_size=settings.NUDGE_BATCH_SIZE)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        result = send_nudges(db, batch_size=settings.NUDGE_BATCH_SIZE)
+        if result.get("skipped"):
+            print("⚠️  Nudges were already sent today")
+        else:
+            print(f"✅ Queued {result['sent']} nudges for {result['users']} users ({result['rate_limited']} rate limited)")
+    finally:
+        db.close()
@@ -0,0 +1,345 @@
+"""
+Push notifications through a durable outbox.
+
+enqueue() writes a push_outbox row in the caller's transaction, so a
+notification is sent only if the action that caused it commits. Rows for
+the same user and coalesce key that are still pending are merged: `count`
+goes up and the notification is sent once, with its summary ("3 new
+messages"). A pending row waits PUSH_COALESCE_SECONDS before it is due,
+which is the coalescing window.
+
+PushDispatcher is an asyncio task that claims due rows in batches (FOR
+UPDATE SKIP LOCKED on PostgreSQL, so several instances can dispatch),
+looks up every device of every claimed user in one query, sends one batch
+per platform and records the outcome. A notification counts as sent when
+any device got it. Tokens the provider reports as invalid are deleted.
+Failed sends are retried with exponential backoff; a claimed row whose
+instance died is picked up again once its lease expires.
+"""
+import asyncio
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import delete, select, update
+
+from config import settings
+from database import SessionLocal, insert_for
+from models import DeviceToken, PushOutbox
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = 60  # a claimed row is retried if not recorded by then
+RETRY_BASE_SECONDS = 30
+DONE_STATUSES = ("sent", "no_device", "failed")
+
+
+class PushMessage(NamedTuple):
+    outbox_id: int
+    token: str
+    platform: str
+    title: str
+    body: str
+    data: dict
+
+
+class PushResult(NamedTuple):
+    message: PushMessage
+    ok: bool
+    error: Optional[str] = None
+    invalid_token: bool = False  # provider says the token is no longer valid
+
+
+class LogPushProvider:
+    """Writes notifications to the log (no real push service configured)"""
+
+    name = "log"
+    max_batch_size = 500
+
+    async def send_batch(self, platform: str, messages: List[PushMessage]) -> List[PushResult]:
+        for message in messages:
+            logger.info(f"📱 PUSH ({platform}) to {message.token[:12]}…: {message.title} - {message.body}")
+        return [PushResult(message, True) for message in messages]
+
+
+class MockPushProvider:
+    """In-memory provider for tests and local development"""
+
+    name = "mock"
+    max_batch_size = 500
+
+    def __init__(self):
+        self.sent: List[PushMessage] = []
+        self.batches: List[tuple] = []  # (platform, size) of every batch received
+        self.invalid_tokens = set()  # tokens to report as invalid
+        self.fail_next = 0  # number of upcoming sends to fail
+
+    async def send_batch(self, platform: str, messages: List[PushMessage]) -> List[PushResult]:
+        self.batches.append((platform, len(messages)))
+        results = []
+        for message in messages:
+            if message.token in self.invalid_tokens:
+                results.append(PushResult(message, False, "Unregistered token", invalid_token=True))
+            elif self.fail_next > 0:
+                self.fail_next -= 1
+                results.append(PushResult(message, False, "Simulated provider error"))
+            else:
+                self.sent.append(message)
+                results.append(PushResult(message, True))
+        return results
+
+    def reset(self):
+        self.sent.clear()
+        self.batches.clear()
+        self.invalid_tokens.clear()
+        self.fail_next = 0
+
+
+PROVIDERS = {
+    "log": LogPushProvider,
+    "mock": MockPushProvider,
+}
+
+
+def enqueue(db, user_id: int, title: str, body: str, category: str = "general",
+            data: Optional[dict] = None, coalesce_key: Optional[str] = None, summary: Optional[str] = None):
+    """
+    Queue a push notification in the caller's transaction (caller commits).
+    Notifications with the same user and coalesce_key that are still pending
+    are sent once; `summary` (formatted with {count}) replaces the body then.
+    """
+    enqueue_many(db, [{
+        "user_id": user_id, "title": title, "body": body, "category": category,
+        "data": data, "coalesce_key": coalesce_key, "summary": summary,
+    }])
+
+
+def enqueue_many(db, notifications: List[dict]):
+    """
+    enqueue() for many notifications in one statement. At most one per user
+    and coalesce key; a notification standing for several sets "count".
+    """
+    if not notifications:
+        return
+    now = datetime.utcnow()
+    due = now + timedelta(seconds=settings.PUSH_COALESCE_SECONDS)
+    insert = insert_for(db)
+    stmt = insert(PushOutbox).values([
+        {
+            "user_id": n["user_id"],
+            "category": n.get("category", "general"),
+            "coalesce_key": n.get("coalesce_key") or f"{n.get('category', 'general')}:{uuid.uuid4().hex}",
+            "title": n["title"],
+            "body": n["body"],
+            "summary": n.get("summary"),
+            "data": json.dumps(n["data"]) if n.get("data") else None,
+            "count": n.get("count", 1),
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": due,
+            "created_at": now,
+        }
+        for n in notifications
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["user_id", "coalesce_key"],
+        index_where=PushOutbox.status == "pending",
+        set_={
+            "count": PushOutbox.count + stmt.excluded.count,
+            "title": stmt.excluded.title,
+            "body": stmt.excluded.body,
+            "data": stmt.excluded.data,
+        }
+    ))
+
+
+def render(title: str, body: str, summary: Optional[str], count: int) -> tuple:
+    """(title, body) to send for a possibly coalesced notification"""
+    if count > 1 and summary:
+        return title, summary.format(count=count)
+    return title, body
+
+
+def prune_outbox(db, before: datetime) -> int:
+    """Delete finished notifications last touched before `before`. Caller commits."""
+    result = db.execute(
+        delete(PushOutbox).where(PushOutbox.status.in_(DONE_STATUSES), PushOutbox.next_attempt_at < before)
+    )
+    return max(result.rowcount or 0, 0)
+
+
+class PushDispatcher:
+    def __init__(self, session_factory=SessionLocal, provider_name: str = "log", batch_size: int = 500,
+                 interval_seconds: float = 1.0, max_attempts: int = 5):
+        self.session_factory = session_factory
+        self.provider = PROVIDERS[provider_name]()
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self.max_attempts = max_attempts
+        self._task: Optional[asyncio.Task] = None
+        self.stats_counts = {
+            "claimed": 0, "sent": 0, "no_device": 0, "retried": 0, "failed": 0, "batches": 0, "tokens_pruned": 0
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start dispatching on the running event loop"""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run(), name="push-dispatcher")
+        logger.info(f"Push dispatcher started (provider={self.provider.name}, batch={self.batch_size})")
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        logger.info("Push dispatcher stopped")
+
+    async def _run(self):
+        while True:
+            try:
+                claimed = await self.dispatch_once()
+            except Exception as e:
+                logger.error(f"Push dispatch failed: {e}", exc_info=True)
+                claimed = 0
+            if claimed < self.batch_size:
+                await asyncio.sleep(self.interval_seconds)
+
+    async def dispatch_once(self) -> int:
+        """Claim, send and record one batch. Returns the number of notifications claimed."""
+        rows, devices = await asyncio.to_thread(self._claim)
+        if not rows:
+            return 0
+
+        by_platform: Dict[str, List[PushMessage]] = defaultdict(list)
+        for row in rows:
+            title, body = render(row.title, row.body, row.summary, row.count)
+            data = json.loads(row.data) if row.data else {}
+            for token, platform in devices.get(row.user_id, ()):
+                by_platform[platform].append(PushMessage(row.id, token, platform, title, body, data))
+
+        size = self.provider.max_batch_size
+        batches = [
+            self.provider.send_batch(platform, messages[start:start + size])
+            for platform, messages in by_platform.items()
+            for start in range(0, len(messages), size)
+        ]
+        results: List[PushResult] = [result for batch in await asyncio.gather(*batches) for result in batch]
+        self.stats_counts["batches"] += len(batches)
+
+        await asyncio.to_thread(self._record, rows, results)
+        return len(rows)
+
+    def _claim(self):
+        """Lease a batch of due rows and look up their users' devices"""
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            rows = db.execute(
+                select(PushOutbox.id, PushOutbox.user_id, PushOutbox.title, PushOutbox.body,
+                       PushOutbox.summary, PushOutbox.data, PushOutbox.count, PushOutbox.attempts)
+                .where(
+                    PushOutbox.status.in_(("pending", "retry", "sending")),
+                    PushOutbox.next_attempt_at <= now
+                )
+                .order_by(PushOutbox.next_attempt_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if not rows:
+                return [], {}
+            db.execute(
+                update(PushOutbox)
+                .where(PushOutbox.id.in_([row.id for row in rows]))
+                .values(
+                    status="sending",
+                    attempts=PushOutbox.attempts + 1,
+                    next_attempt_at=now + timedelta(seconds=LEASE_SECONDS)
+                )
+                .execution_options(synchronize_session=False)
+            )
+            devices = defaultdict(list)
+            for user_id, token, platform in db.execute(
+                select(DeviceToken.user_id, DeviceToken.token, DeviceToken.platform)
+                .where(DeviceToken.user_id.in_({row.user_id for row in rows}))
+            ):
+                devices[user_id].append((token, platform))
+            db.commit()
+            self.stats_counts["claimed"] += len(rows)
+            return rows, devices
+        finally:
+            db.close()
+
+    def _record(self, rows, results: List[PushResult]):
+        now = datetime.utcnow()
+        outcome: Dict[int, List[PushResult]] = defaultdict(list)
+        for result in results:
+            outcome[result.message.outbox_id].append(result)
+        invalid_tokens = sorted({result.message.token for result in results if result.invalid_token})
+
+        sent, no_device, retry, failed = [], [], [], []
+        for row in rows:
+            row_results = outcome.get(row.id, [])
+            errors = [result for result in row_results if not result.ok and not result.invalid_token]
+            if any(result.ok for result in row_results):
+                sent.append({"id": row.id, "status": "sent", "sent_at": now, "next_attempt_at": now})
+            elif not errors:
+                # No devices, or only devices whose tokens were just pruned
+                no_device.append({"id": row.id, "status": "no_device", "next_attempt_at": now})
+            elif row.attempts + 1 >= self.max_attempts:
+                failed.append({"id": row.id, "status": "failed", "last_error": errors[0].error, "next_attempt_at": now})
+            else:
+                delay = RETRY_BASE_SECONDS * 2 ** row.attempts
+                retry.append({
+                    "id": row.id, "status": "retry", "last_error": errors[0].error,
+                    "next_attempt_at": now + timedelta(seconds=delay)
+                })
+
+        db = self.session_factory()
+        try:
+            for batch in (sent, no_device, retry, failed):
+                if batch:
+                    db.execute(update(PushOutbox).execution_options(synchronize_session=False), batch)
+            if invalid_tokens:
+                db.execute(delete(DeviceToken).where(DeviceToken.token.in_(invalid_tokens)))
+            db.commit()
+        finally:
+            db.close()
+        if invalid_tokens:
+            logger.info(f"Pruned {len(invalid_tokens)} invalid push tokens")
+        self.stats_counts["tokens_pruned"] += len(invalid_tokens)
+        self.stats_counts["sent"] += len(sent)
+        self.stats_counts["no_device"] += len(no_device)
+        self.stats_counts["retried"] += len(retry)
+        self.stats_counts["failed"] += len(failed)
+
+    def stats(self) -> dict:
+        return {"running": self.running, "provider": self.provider.name, **self.stats_counts}
+
+
+def run_prune_job():
+    """Entry point for the scheduler: drop finished notifications after a week"""
+    db = SessionLocal()
+    try:
+        pruned = prune_outbox(db, datetime.utcnow() - timedelta(days=7))
+        db.commit()
+        logger.info(f"Pruned {pruned} finished push notifications")
+    finally:
+        db.close()
+
+
+# Global dispatcher (started from main.py)
+push_dispatcher = PushDispatcher(
+    provider_name=settings.PUSH_PROVIDER,
+    batch_size=settings.PUSH_BATCH_SIZE,
+    interval_seconds=settings.PUSH_DISPATCH_INTERVAL_SECONDS,
+    max_attempts=settings.PUSH_MAX_ATTEMPTS
+)
@@ -1,20 +1,16 @@
 # recreate_db.py
 
 from database import Base, engine
-from models import (
-    User, Match, Message, Mission, Block, Report,
-    Badge, UserProfile, Theme, IcebreakerPrompt, UserIcebreaker,
-    MoodCheckIn, CompatibilityQuiz, UserQuizResult,
-    Nudge, UserNudgeLog, Event, UserEventRegistration,
-    RelationshipTip, GuidedChatSession, EmotionalSafetySetting
-)
+import models  # noqa: F401 - registers all tables on Base.metadata
+import migrations
 
 def recreate():
     print("⚠️  Dropping ALL tables...")
     Base.metadata.drop_all(bind=engine)
+    migrations.migration_metadata.drop_all(bind=engine)
 
     print("📦 Recreating tables...")
-    Base.metadata.create_all(bind=engine)
+    migrations.upgrade(engine)
 
     print("✅ Done! Database schema is fresh and clean.")
 
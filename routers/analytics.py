@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from database import get_db
+from models import User
+from auth import get_current_superuser
+from config import settings
+from mood_analytics import query_mood_counts
+from datetime import date
+
+router = APIRouter(prefix="/admin/analytics", tags=["admin"])
+
+MAX_RANGE_DAYS = 366
+
+@router.get("/mood")
+def get_mood_trends(
+    start: date,
+    end: date,
+    by_day: bool = False,
+    admin: User = Depends(get_current_superuser),
+    db: Session = Depends(get_db)
+):
+    """Mood counts per region (and day) for a date range. Admin only."""
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range is limited to {MAX_RANGE_DAYS} days")
+    
+    return query_mood_counts(db, start, end, by_day=by_day, min_users=settings.MOOD_ANALYTICS_MIN_USERS)
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import exists
 from sqlalchemy.orm import Session
 from database import get_db
-from models import User, Match, Message
+from models import User, Match, Message, MessageArchive
 from routers.users import get_current_user
+from message_writer import message_writer
+from message_archive import get_conversation_messages
+from search_index import search_union
+from domain_events import event_bus
+from push import enqueue
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/chat", tags=["chat"])
@@ -25,16 +31,40 @@ def get_messages(
     if match.user_a_id != current_user.id and match.user_b_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    messages = db.query(Message).filter(Message.match_id == match_id).order_by(Message.timestamp).all()
+    # Reads both hot and archived messages
+    messages = get_conversation_messages(db, match_id)
     
     return [{
         "id": msg.id,
         "sender_id": msg.sender_id,
         "content": msg.content,
-        "timestamp": msg.timestamp,
+        "timestamp": msg.created_at,
         "is_mine": msg.sender_id == current_user.id
     } for msg in messages]
 
+def _publish_message_sent(db: Session, sender_id: int, match_id: int, message_id: int):
+    """Mission events for a stored message; the first message in a match starts a conversation"""
+    event_bus.publish("message_sent", sender_id, match_id)
+    # Archived conversations count too (their messages left the messages table)
+    earlier = db.query(
+        exists().where(Message.match_id == match_id, Message.id < message_id)
+        | exists().where(MessageArchive.match_id == match_id)
+    ).scalar()
+    if not earlier:
+        event_bus.publish("conversation_started", sender_id, match_id)
+
+def _recipient_notification(match: Match, sender_id: int) -> dict:
+    """Push to the other user; messages in a match within the coalescing window become one notification"""
+    return {
+        "user_id": match.user_b_id if match.user_a_id == sender_id else match.user_a_id,
+        "title": "New message",
+        "body": "You have a new message",
+        "category": "message",
+        "data": {"type": "message", "match_id": match.id},
+        "coalesce_key": f"message:{match.id}",
+        "summary": "{count} new messages",
+    }
+
 @router.post("/match/{match_id}/send")
 def send_message(
     match_id: int,
@@ -51,17 +81,73 @@ def send_message(
     if match.user_a_id != current_user.id and match.user_b_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
+    notification = _recipient_notification(match, current_user.id)
+    
+    # Group-commit path: the writer thread batches inserts (and their pushes) from concurrent senders
+    if message_writer.running:
+        stored = message_writer.write(match_id, current_user.id, message.content, notification)
+        _publish_message_sent(db, current_user.id, match_id, stored["id"])
+        return {
+            "id": stored["id"],
+            "content": stored["content"],
+            "timestamp": stored["created_at"]
+        }
+    
     new_message = Message(
         match_id=match_id,
         sender_id=current_user.id,
         content=message.content
     )
     db.add(new_message)
+    enqueue(db, **notification)
     db.commit()
     db.refresh(new_message)
+    _publish_message_sent(db, current_user.id, match_id, new_message.id)
     
     return {
         "id": new_message.id,
         "content": new_message.content,
-        "timestamp": new_message.timestamp
+        "timestamp": new_message.created_at
+    }
+
+@router.get("/match/{match_id}/search")
+def search_messages(
+    match_id: int,
+    q: str = Query(..., min_length=1, max_length=200),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Search messages in a match, best matches first."""
+    match = db.query(Match).filter(Match.id == match_id).first()
+    if not match:
+        raise HTTPException(status_code=404, detail="Match not found")
+    
+    if match.user_a_id != current_user.id and match.user_b_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    results, total = search_union(
+        db,
+        [
+            (Message, [Message.match_id == match_id]),
+            (MessageArchive, [MessageArchive.match_id == match_id]),
+        ],
+        q,
+        limit=page_size,
+        offset=(page - 1) * page_size
+    )
+    
+    return {
+        "results": [{
+            "id": msg.id,
+            "sender_id": msg.sender_id,
+            "content": msg.content,
+            "timestamp": msg.created_at,
+            "is_mine": msg.sender_id == current_user.id,
+            "rank": rank
+        } for msg, rank in results],
+        "total": total,
+        "page": page,
+        "page_size": page_size
     }
@@ -4,6 +4,14 @@ Health check and monitoring endpoints.
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from database import SessionLocal
+from message_writer import message_writer
+from scheduler import scheduler
+from nearby_candidates import nearby_refresher
+from interest_index import interest_index
+from leaderboard import leaderboard
+from domain_events import event_bus
+from badge_engine import badge_engine
+from push import push_dispatcher
 from datetime import datetime
 import psutil
 import sys
@@ -58,7 +66,15 @@ async def detailed_health_check(db: Session = Depends(get_db)):
                 "memory_available_mb": memory.available / 1048576,
                 "disk_percent": disk.percent,
                 "disk_free_gb": disk.free / 1073741824
-            }
+            },
+            "chat_writer": message_writer.stats(),
+            "jobs": scheduler.status(),
+            "nearby_candidates": nearby_refresher.stats(),
+            "interest_index": interest_index.stats(),
+            "leaderboard": leaderboard.stats(),
+            "domain_events": event_bus.stats(),
+            "badges": badge_engine.stats(),
+            "push": push_dispatcher.stats()
         },
         "version": {
             "python": sys.version,
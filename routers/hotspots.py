@@ -1,14 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from database import get_db
 from models import User
 from auth import get_current_user
+from hotspot_grid import (
+    GRID_SIZE, aggregate_hotspot_cells, cell_center, cell_for, cell_size, get_hotspot_cells, level_for_viewport
+)
+from cache import TTLCache
+from config import settings
+from domain_events import event_bus
+from utils import bounding_box, haversine_distance
 from datetime import datetime, timedelta
+from typing import Optional
 import math
 
 router = APIRouter(prefix="/hotspots", tags=["hotspots"])
 
+# (grid cell, radius) -> active users that can be within radius of that cell
+nearby_activity_cache = TTLCache(
+    maxsize=settings.NEARBY_ACTIVITY_CACHE_SIZE,
+    ttl_seconds=settings.NEARBY_ACTIVITY_CACHE_TTL_SECONDS
+)
+
 def round_to_grid(latitude: float, longitude: float, grid_size: float = 0.1):
     """Round coordinates to a grid for privacy"""
     return (
@@ -18,63 +32,90 @@ def round_to_grid(latitude: float, longitude: float, grid_size: float = 0.1):
 
 @router.get("/areas")
 def get_hotspot_areas(
+    min_lat: Optional[float] = Query(None, ge=-90, le=90),
+    min_lon: Optional[float] = Query(None, ge=-180, le=180),
+    max_lat: Optional[float] = Query(None, ge=-90, le=90),
+    max_lon: Optional[float] = Query(None, ge=-180, le=180),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get aggregated activity areas (privacy-safe hotspots)"""
-    # Get users active in last 24 hours
-    active_since = datetime.utcnow() - timedelta(hours=24)
+    """
+    Get aggregated activity areas (privacy-safe hotspots).
     
-    active_users = db.query(User).filter(
-        User.latitude.isnot(None),
-        User.longitude.isnot(None),
-        User.last_location_update >= active_since
-    ).all()
+    With a viewport (min_lat, min_lon, max_lat, max_lon) only cells inside it
+    are returned, at a resolution that fits the viewport. min_lon > max_lon
+    means the viewport crosses the antimeridian.
+    """
+    bounds = (min_lat, min_lon, max_lat, max_lon)
+    if any(v is not None for v in bounds) and any(v is None for v in bounds):
+        raise HTTPException(status_code=400, detail="Viewport needs min_lat, min_lon, max_lat and max_lon")
+    
+    viewport = bounds if min_lat is not None else None
+    if viewport and min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="min_lat must not be greater than max_lat")
     
-    # Aggregate into grid cells
-    hotspots = {}
-    for user in active_users:
-        grid_lat, grid_lon = round_to_grid(user.latitude, user.longitude)
-        key = (grid_lat, grid_lon)
-        
-        if key not in hotspots:
-            hotspots[key] = {
-                "latitude": grid_lat,
-                "longitude": grid_lon,
-                "count": 0
-            }
-        hotspots[key]["count"] += 1
+    level = level_for_viewport(*viewport) if viewport else 0
     
-    # Filter out areas with fewer than 3 users (privacy)
-    filtered_hotspots = [
-        spot for spot in hotspots.values()
-        if spot["count"] >= 3
-    ]
+    # Cells with fewer than 3 users are never returned, at any level (privacy)
+    source = aggregate_hotspot_cells if settings.HOTSPOT_SOURCE == "sql" else get_hotspot_cells
+    filtered_hotspots = source(db, level=level, viewport=viewport, min_users=3)
+    event_bus.publish("hotspots_viewed", current_user.id)
     
     return {
         "hotspots": filtered_hotspots,
+        "level": level,
+        "cell_size": cell_size(level),
         "updated_at": datetime.utcnow()
     }
 
+def _active_points_near_cell(db: Session, cell: tuple, radius: float) -> list:
+    """(user id, latitude, longitude) of active users that can be within `radius` of any point in the cell"""
+    center_lat = cell_center(cell[0], 0)
+    center_lon = cell_center(cell[1], 0)
+    half = GRID_SIZE / 2
+    # Pad the radius by the distance from the cell center to its farthest corner
+    pad = max(
+        haversine_distance(center_lat, center_lon, center_lat + dlat, center_lon + dlon)
+        for dlat in (-half, half) for dlon in (-half, half)
+    )
+    min_lat, min_lon, max_lat, max_lon = bounding_box(center_lat, center_lon, radius + pad)
+    
+    if min_lon <= max_lon:
+        lon_filter = User.longitude.between(min_lon, max_lon)
+    else:
+        lon_filter = (User.longitude >= min_lon) | (User.longitude <= max_lon)
+    
+    rows = db.query(User.id, User.latitude, User.longitude).filter(
+        User.latitude.between(min_lat, max_lat),
+        lon_filter,
+        User.last_location_update >= datetime.utcnow() - timedelta(hours=24)
+    ).all()
+    return [tuple(row) for row in rows]
+
 @router.get("/nearby-activity")
 def get_nearby_activity(
-    radius: float = 10.0,  # miles
+    radius: float = Query(10.0, gt=0, le=100),  # miles
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get activity count within radius"""
-    if not current_user.latitude or not current_user.longitude:
+    if current_user.latitude is None or current_user.longitude is None:
         raise HTTPException(status_code=400, detail="User location not set")
     
-    active_since = datetime.utcnow() - timedelta(hours=24)
+    # Everyone in the same grid cell shares one bounding-box query; the exact
+    # distance check against the caller's own location is done per request
+    cell = cell_for(current_user.latitude, current_user.longitude)
+    points = nearby_activity_cache.get_or_compute(
+        (cell, radius),
+        lambda: _active_points_near_cell(db, cell, radius)
+    )
     
-    # Simple count (in production, use spatial query)
-    nearby_count = db.query(User).filter(
-        User.id != current_user.id,
-        User.latitude.isnot(None),
-        User.longitude.isnot(None),
-        User.last_location_update >= active_since
-    ).count()
+    nearby_count = sum(
+        1 for user_id, latitude, longitude in points
+        if user_id != current_user.id
+        and haversine_distance(current_user.latitude, current_user.longitude, latitude, longitude) <= radius
+    )
+    event_bus.publish("nearby_activity_viewed", current_user.id)
     
     return {
         "active_users_nearby": nearby_count,
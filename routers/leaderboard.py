@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from models import User
+from auth import get_current_user
+from leaderboard import GLOBAL_BOARD, leaderboard
+
+router = APIRouter(prefix="/leaderboard", tags=["leaderboard"])
+
+@router.get("")
+def get_global_leaderboard(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user)
+):
+    """Top users by XP across the whole app."""
+    return {
+        "entries": leaderboard.page(GLOBAL_BOARD, offset, limit),
+        "total": leaderboard.backend.size(GLOBAL_BOARD)
+    }
+
+@router.get("/region")
+def get_region_leaderboard(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user)
+):
+    """Top users by XP in the current user's region."""
+    region = leaderboard.region_of(current_user.id)
+    if region is None:
+        raise HTTPException(status_code=400, detail="Location not set")
+    return {
+        "entries": leaderboard.page(region, offset, limit),
+        "total": leaderboard.backend.size(region)
+    }
+
+@router.get("/me")
+def get_my_standing(current_user: User = Depends(get_current_user)):
+    """Current user's global and regional rank."""
+    region = leaderboard.region_of(current_user.id)
+    return {
+        "global": leaderboard.standing(GLOBAL_BOARD, current_user.id),
+        "region": leaderboard.standing(region, current_user.id) if region else None
+    }
@@ -1,9 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from database import get_db
 from models import User, Match, Block
 from routers.users import get_current_user
 from utils import haversine_distance
+from hotspot_grid import record_move
+from nearby_candidates import CANDIDATE_RADIUS_MILES, compute_candidates, nearby_refresher
+from discovery import rank_candidates
+from interest_index import interest_index
+from leaderboard import leaderboard
+from domain_events import event_bus
+from routers.notifications import send_push_notification
 from datetime import datetime, timedelta
 
 router = APIRouter(prefix="/matches", tags=["matches"])
@@ -16,22 +23,27 @@ def update_location(
     db: Session = Depends(get_db)
 ):
     """Update user's current location."""
+    now = datetime.utcnow()
+    # Move the user between hotspot grid cells in the same transaction
+    record_move(
+        db,
+        current_user.latitude, current_user.longitude, current_user.last_location_update,
+        latitude, longitude, now
+    )
     current_user.latitude = latitude
     current_user.longitude = longitude
-    current_user.last_location_update = datetime.utcnow()
+    current_user.last_location_update = now
     db.commit()
+    
+    # Recompute nearby candidates in the background if the user moved enough
+    nearby_refresher.location_updated(current_user.id, latitude, longitude)
+    # Move the user to their new regional leaderboard
+    leaderboard.record_location(current_user.id, current_user.xp or 0, current_user.anonymous_handle, latitude, longitude)
+    event_bus.publish("location_updated", current_user.id)
     return {"message": "Location updated"}
 
-@router.get("/nearby")
-def get_nearby_users(
-    radius: int = 50,  # Default radius in miles
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Find users within the specified radius, excluding blocked users."""
-    if not current_user.latitude or not current_user.longitude:
-        raise HTTPException(status_code=400, detail="User location not set")
-    
+def _excluded_user_ids(db: Session, current_user: User):
+    """(blocked user ids, already matched user ids) to leave out of nearby results"""
     # Get blocked user IDs (users I blocked + users who blocked me)
     my_blocks = db.query(Block.blocked_user_id).filter(Block.user_id == current_user.id).all()
     blocked_me = db.query(Block.user_id).filter(Block.blocked_user_id == current_user.id).all()
@@ -46,10 +58,26 @@ def get_nearby_users(
         other_user_id = match.user_b_id if match.user_a_id == current_user.id else match.user_a_id
         matched_user_ids.add(other_user_id)
     
-    # Get active users (active within last 72 hours)
+    return blocked_ids, matched_user_ids
+
+def _candidate_ids(db: Session, current_user: User, radius: float):
+    """Ids from the precomputed candidate list; only requests beyond its radius are computed on the spot"""
+    if radius <= CANDIDATE_RADIUS_MILES:
+        candidate_list = nearby_refresher.get(db, current_user.id, current_user.latitude, current_user.longitude)
+    else:
+        candidate_list = compute_candidates(db, current_user.id, current_user.latitude, current_user.longitude, radius)
+    # Allow for candidates who moved closer since the list was built
+    slack = nearby_refresher.move_threshold_miles
+    return [user_id for user_id, distance in candidate_list.candidates if distance <= radius + slack]
+
+def _nearby_users(db: Session, current_user: User, radius: float, candidate_ids: list):
+    """Profiles of the candidates still within radius, minus blocked and matched users"""
+    blocked_ids, matched_user_ids = _excluded_user_ids(db, current_user)
+    
+    # Load the candidates that are still active (within last 72 hours)
     cutoff_time = datetime.utcnow() - timedelta(hours=72)
     active_users = db.query(User).filter(
-        User.id != current_user.id,
+        User.id.in_(candidate_ids),
         User.last_location_update >= cutoff_time,
         User.latitude.isnot(None),
         User.longitude.isnot(None),
@@ -57,7 +85,7 @@ def get_nearby_users(
         ~User.id.in_(matched_user_ids)  # Exclude already matched users
     ).all()
     
-    # Filter by distance
+    # Filter by current distance (candidates may have moved since the list was built)
     nearby_users = []
     for user in active_users:
         distance = haversine_distance(
@@ -79,6 +107,68 @@ def get_nearby_users(
     
     return nearby_users
 
+def _publish_nearby_viewed(current_user: User, nearby_users: list, limit: int = 10):
+    """Mission events for the first users shown in a nearby list"""
+    for user in nearby_users[:limit]:
+        event_bus.publish("nearby_user_viewed", current_user.id, user["id"])
+
+@router.get("/nearby")
+def get_nearby_users(
+    radius: int = 50,  # Default radius in miles
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Find users within the specified radius, excluding blocked users."""
+    if current_user.latitude is None or current_user.longitude is None:
+        raise HTTPException(status_code=400, detail="User location not set")
+    
+    candidate_ids = _candidate_ids(db, current_user, radius)
+    if not candidate_ids:
+        return []
+    
+    nearby_users = _nearby_users(db, current_user, radius, candidate_ids)
+    _publish_nearby_viewed(current_user, nearby_users)
+    return nearby_users
+
+@router.get("/nearby/likes/{interest}")
+def get_nearby_users_by_interest(
+    interest: str,
+    radius: int = Query(50, gt=0, le=500),  # miles
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """People near you who list the given interest."""
+    if current_user.latitude is None or current_user.longitude is None:
+        raise HTTPException(status_code=400, detail="User location not set")
+    
+    candidate_ids = interest_index.users_with(interest, _candidate_ids(db, current_user, radius))
+    if not candidate_ids:
+        return []
+    
+    nearby_users = _nearby_users(db, current_user, radius, candidate_ids)
+    _publish_nearby_viewed(current_user, nearby_users)
+    return nearby_users
+
+@router.get("/discover")
+def discover(
+    radius: int = Query(50, gt=0, le=500),  # miles
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Nearby users ranked by distance, activity and compatibility (best first)."""
+    if current_user.latitude is None or current_user.longitude is None:
+        raise HTTPException(status_code=400, detail="User location not set")
+    
+    candidate_ids = _candidate_ids(db, current_user, radius)
+    
+    blocked_ids, matched_user_ids = _excluded_user_ids(db, current_user)
+    return rank_candidates(
+        db, current_user, candidate_ids, radius,
+        limit=limit,
+        exclude_ids=blocked_ids | matched_user_ids
+    )
+
 @router.post("/create")
 def create_match(
     user_b_id: int,
@@ -111,9 +201,18 @@ def create_match(
         status="matched"
     )
     db.add(new_match)
+    db.flush()
+    send_push_notification(
+        user_b_id, "New match", "You have a new match!",
+        # No match_id: new-match pushes are merged, so the app opens the match list
+        {"type": "match"}, db,
+        category="match", coalesce_key="match", summary="You have {count} new matches!"
+    )
     db.commit()
     db.refresh(new_match)
     
+    event_bus.publish("match_created", current_user.id, user_b_id)
+    event_bus.publish("match_received", user_b_id, current_user.id)
     return {"message": "Match created", "match_id": new_match.id}
 
 @router.get("/my-matches")
@@ -144,4 +243,5 @@ def get_my_matches(
                 "created_at": match.created_at
             })
     
+    event_bus.publish("matches_viewed", current_user.id)
     return result
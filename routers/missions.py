@@ -1,96 +1,43 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy import case, func, update
 from database import get_db
 from models import User, Mission
 from auth import get_current_user
 from datetime import datetime
+from xp import award_xp, xp_to_next_level
+from mission_rollups import rolled_up_totals
+from badge_engine import badge_engine
+from daily_missions import (
+    EVENT_TRACKED_TYPES, MISSION_POOL, ensure_daily_missions, get_day_of_week, missions_for
+)
 
 router = APIRouter(prefix="/missions", tags=["missions"])
 
-# Expanded mission pool with weekly rotation
-MISSION_POOL = {
-    "monday": [
-        {"type": "start_conversation", "description": "Start 2 conversations", "xp": 15},
-        {"type": "add_match", "description": "Add a new match", "xp": 15},
-        {"type": "send_messages", "description": "Send 5 messages", "xp": 10},
-    ],
-    "tuesday": [
-        {"type": "check_hotspots", "description": "Check the hotspot map", "xp": 10},
-        {"type": "update_location", "description": "Update your location", "xp": 10},
-        {"type": "visit_nearby", "description": "View 3 nearby users", "xp": 15},
-    ],
-    "wednesday": [
-        {"type": "update_profile", "description": "Update your bio or interests", "xp": 15},
-        {"type": "upload_photo", "description": "Upload or update profile photo", "xp": 20},
-        {"type": "set_mood", "description": "Set your mood status", "xp": 10},
-    ],
-    "thursday": [
-        {"type": "reveal_identity", "description": "Reveal your identity to someone", "xp": 25},
-        {"type": "accept_match", "description": "Accept a match request", "xp": 15},
-        {"type": "long_conversation", "description": "Have a 10+ message conversation", "xp": 20},
-    ],
-    "friday": [
-        {"type": "weekend_prep", "description": "Update profile for weekend", "xp": 15},
-        {"type": "browse_profiles", "description": "View 5 user profiles", "xp": 10},
-        {"type": "active_chat", "description": "Chat with 3 different matches", "xp": 20},
-    ],
-    "saturday": [
-        {"type": "weekend_warrior", "description": "Send 10 messages today", "xp": 20},
-        {"type": "new_connections", "description": "Add 2 new matches", "xp": 25},
-        {"type": "explore_hotspots", "description": "Check hotspots in your area", "xp": 15},
-    ],
-    "sunday": [
-        {"type": "weekly_review", "description": "Review your matches", "xp": 10},
-        {"type": "complete_profile", "description": "Ensure profile is 100% complete", "xp": 20},
-        {"type": "plan_week", "description": "Set mood for the week ahead", "xp": 15},
-    ],
-}
-
-# Special event missions (can be added to any day)
-SPECIAL_MISSIONS = [
-    {"type": "first_reveal", "description": "Make your first identity reveal", "xp": 50, "one_time": True},
-    {"type": "verified_user", "description": "Verify your photo", "xp": 30, "one_time": True},
-    {"type": "social_butterfly", "description": "Have 5 active matches", "xp": 40, "milestone": True},
-]
-
-def get_day_of_week():
-    """Get current day of week in lowercase"""
-    return datetime.utcnow().strftime("%A").lower()
-
 @router.get("/daily")
 def get_daily_missions(
     current_user = Depends(get_current_user),
     db = Depends(get_db)
 ):
     """Get today's missions based on day of week."""
-    # Get user's missions for today
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    today = datetime.utcnow().date()
     
+    # Normally created ahead of time by the materializer job
     user_missions = db.query(Mission).filter(
         Mission.user_id == current_user.id,
-        Mission.created_at >= today_start
+        Mission.mission_date == today
     ).all()
     
     # Get missions for current day
-    day_of_week = get_day_of_week()
-    daily_missions = MISSION_POOL.get(day_of_week, MISSION_POOL["monday"])
+    day_of_week = get_day_of_week(today)
+    daily_missions = missions_for(today)
     
-    # If no missions exist for today, create them
+    # Fallback for users the materializer did not cover
     if not user_missions:
-        for mission_def in daily_missions:
-            new_mission = Mission(
-                user_id=current_user.id,
-                mission_type=mission_def["type"],
-                xp_reward=mission_def["xp"],
-                completed=False
-            )
-            db.add(new_mission)
-        db.commit()
-        
-        # Refresh query
+        ensure_daily_missions(db, current_user.id, today)
         user_missions = db.query(Mission).filter(
             Mission.user_id == current_user.id,
-            Mission.created_at >= today_start
+            Mission.mission_date == today
         ).all()
     
     # Format response
@@ -104,6 +51,9 @@ def get_daily_missions(
                 "description": mission_def["description"],
                 "xp_reward": mission.xp_reward,
                 "completed": mission.completed,
+                "progress": mission.progress or 0,
+                "target": mission.target or 1,
+                "automatic": mission.mission_type in EVENT_TRACKED_TYPES,
                 "day": day_of_week.capitalize()
             })
     
@@ -140,40 +90,49 @@ def complete_mission(
     db = Depends(get_db)
 ):
     """Mark a mission as completed and award XP."""
-    mission = db.query(Mission).filter(
-        Mission.id == mission_id,
-        Mission.user_id == current_user.id
+    # Flip completed in one conditional UPDATE so concurrent requests can't
+    # both complete (and reward) the same mission. Event-tracked missions
+    # complete themselves (see mission_progress).
+    completed = db.execute(
+        update(Mission)
+        .where(
+            Mission.id == mission_id,
+            Mission.user_id == current_user.id,
+            Mission.completed == False,
+            Mission.mission_type.notin_(EVENT_TRACKED_TYPES)
+        )
+        .values(completed=True, completed_at=datetime.utcnow())
+        .returning(Mission.xp_reward)
+        .execution_options(synchronize_session=False)
     ).first()
     
-    if not mission:
-        raise HTTPException(status_code=404, detail="Mission not found")
-    
-    if mission.completed:
+    if completed is None:
+        mission = db.query(Mission.completed, Mission.progress, Mission.target).filter(
+            Mission.id == mission_id,
+            Mission.user_id == current_user.id
+        ).first()
+        if not mission:
+            raise HTTPException(status_code=404, detail="Mission not found")
+        if not mission.completed:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Mission completes automatically ({mission.progress or 0}/{mission.target or 1})"
+            )
         return {"message": "Mission already completed", "already_completed": True}
     
-    # Mark as completed
-    mission.completed = True
-    mission.completed_at = datetime.utcnow()
-    
-    # Award XP
-    current_user.xp += mission.xp_reward
-    
-    # Level up logic (every 100 XP = 1 level)
-    new_level = (current_user.xp // 100) + 1
-    leveled_up = False
-    if new_level > current_user.level:
-        current_user.level = new_level
-        leveled_up = True
-    
+    # Award XP (ledger entry + atomic total/level update)
+    xp_reward = completed.xp_reward
+    award = award_xp(db, current_user.id, xp_reward, "mission", reference_id=mission_id)
     db.commit()
     
     return {
         "message": "Mission completed! 🎉",
-        "xp_earned": mission.xp_reward,
-        "total_xp": current_user.xp,
-        "level": current_user.level,
-        "leveled_up": leveled_up,
-        "xp_to_next_level": (new_level * 100) - current_user.xp
+        "xp_earned": xp_reward,
+        "total_xp": award.xp,
+        "level": award.level,
+        "leveled_up": award.leveled_up,
+        "xp_to_next_level": xp_to_next_level(award.xp),
+        "badges_earned": [badge_engine.name(badge_id) for badge_id in award.badge_ids]
     }
 
 @router.get("/stats")
@@ -182,27 +141,35 @@ def get_mission_stats(
     db = Depends(get_db)
 ):
     """Get user's mission completion statistics"""
-    # Get all completed missions
-    completed_missions = db.query(Mission).filter(
+    # All-time totals (index-only on ix_missions_user_id_completed)
+    total_completed, total_xp = db.query(
+        func.count(),
+        func.coalesce(func.sum(Mission.xp_reward), 0)
+    ).filter(
         Mission.user_id == current_user.id,
         Mission.completed == True
-    ).all()
-    
-    # Get today's missions
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_missions = db.query(Mission).filter(
+    ).one()
+    
+    # Plus history past the retention window, kept as weekly rollups
+    _, rolled_up_completed, rolled_up_xp = rolled_up_totals(db, current_user.id)
+    total_completed += rolled_up_completed
+    total_xp += rolled_up_xp
+    
+    # Today's missions (unique daily index)
+    today_total, today_completed = db.query(
+        func.count(),
+        func.coalesce(func.sum(case((Mission.completed == True, 1), else_=0)), 0)
+    ).filter(
         Mission.user_id == current_user.id,
-        Mission.created_at >= today_start
-    ).all()
-    
-    today_completed = sum(1 for m in today_missions if m.completed)
+        Mission.mission_date == datetime.utcnow().date()
+    ).one()
     
     return {
-        "total_missions_completed": len(completed_missions),
-        "total_xp_earned": sum(m.xp_reward for m in completed_missions),
+        "total_missions_completed": total_completed,
+        "total_xp_earned": total_xp,
         "current_level": current_user.level,
         "current_xp": current_user.xp,
         "today_completed": today_completed,
-        "today_total": len(today_missions),
-        "completion_rate": f"{(today_completed / len(today_missions) * 100):.0f}%" if today_missions else "0%"
+        "today_total": today_total,
+        "completion_rate": f"{(today_completed / today_total * 100):.0f}%" if today_total else "0%"
     }
@@ -2,8 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from database import SessionLocal
 from database import get_db
-from models import MoodCheckIn, User
+from models import MoodCheckIn, MoodStats, User
 from auth import get_current_user
+from domain_events import event_bus
+from mood_stats import insights, record_checkin
+from mood_analytics import record_mood
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 
@@ -27,8 +30,14 @@ async def create_mood_checkin(
         notes=mood_data.notes
     )
     db.add(checkin)
+    db.flush()
+    # Streaks, distributions and population counts are kept up to date in the same transaction
+    day = checkin.date.date()
+    if record_checkin(db, current_user.id, checkin.mood, day):
+        record_mood(db, day, current_user.latitude, current_user.longitude, checkin.mood)
     db.commit()
     db.refresh(checkin)
+    event_bus.publish("mood_set", current_user.id)
     
     return {"id": checkin.id, "mood": checkin.mood, "date": checkin.date.isoformat(), "message": "Mood check-in recorded"}
 
@@ -52,6 +61,15 @@ async def get_mood_history(
         ]
     }
 
+@router.get("/insights")
+async def get_mood_insights(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Current and longest streak plus 7/30-day mood distributions"""
+    stats = db.query(MoodStats).filter(MoodStats.user_id == current_user.id).first()
+    return insights(stats)
+
 @router.get("/today")
 async def get_today_mood(
     db: Session = Depends(get_db),
@@ -1,11 +1,17 @@
+from datetime import datetime
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import delete
 from sqlalchemy.orm import Session
-from database import get_db
-from models import User
+from database import get_db, insert_for
+from models import DeviceToken, User
 from auth import get_current_user
+from push import enqueue
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
+PLATFORMS = ("ios", "android", "web")
+
 @router.post("/register-token")
 def register_push_token(
     token: str,
@@ -13,8 +19,21 @@ def register_push_token(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Register device push notification token"""
-    current_user.push_token = token
+    """Register a device for push notifications (a token moves to whoever registers it last)"""
+    if platform not in PLATFORMS:
+        raise HTTPException(status_code=400, detail=f"Platform must be one of: {', '.join(PLATFORMS)}")
+    if not token or len(token) > 255:
+        raise HTTPException(status_code=400, detail="Invalid push token")
+    
+    now = datetime.utcnow()
+    insert = insert_for(db)
+    stmt = insert(DeviceToken).values(
+        user_id=current_user.id, token=token, platform=platform, created_at=now, last_seen_at=now
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["token"],
+        set_={"user_id": stmt.excluded.user_id, "platform": stmt.excluded.platform, "last_seen_at": now}
+    ))
     db.commit()
     
     return {
@@ -24,33 +43,38 @@ def register_push_token(
 
 @router.delete("/unregister-token")
 def unregister_push_token(
+    token: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Unregister push notification token"""
-    current_user.push_token = None
+    """Unregister one device's push token, or every device when no token is given"""
+    query = delete(DeviceToken).where(DeviceToken.user_id == current_user.id)
+    if token:
+        query = query.where(DeviceToken.token == token)
+    removed = db.execute(query).rowcount
     db.commit()
     
-    return {"message": "Push token unregistered"}
+    return {"message": "Push token unregistered", "devices_removed": removed}
+
+@router.get("/devices")
+def list_devices(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Devices registered for push notifications"""
+    devices = db.query(DeviceToken).filter(DeviceToken.user_id == current_user.id).order_by(DeviceToken.created_at).all()
+    return [{
+        "platform": device.platform,
+        "token": device.token,
+        "registered_at": device.created_at,
+        "last_seen_at": device.last_seen_at
+    } for device in devices]
 
 # Notification helper (to be used by other endpoints)
-async def send_push_notification(user_id: int, title: str, body: str, data: dict, db: Session):
+def send_push_notification(user_id: int, title: str, body: str, data: dict, db: Session,
+                           category: str = "general", coalesce_key: str = None, summary: str = None):
     """
-    Send push notification to a user
-    In production, integrate with:
-    - Firebase Cloud Messaging (FCM) for iOS/Android
-    - Web Push for web browsers
+    Queue a push notification for a user in the caller's transaction (caller
+    commits). The push dispatcher sends it to every registered device; see push.py.
     """
-    user = db.query(User).filter(User.id == user_id).first()
-    
-    if not user or not user.push_token:
-        return False
-    
-    # TODO: Integrate with actual push service
-    # For MVP, this is a placeholder
-    print(f"📱 PUSH NOTIFICATION to User {user_id}:")
-    print(f"   Title: {title}")
-    print(f"   Body: {body}")
-    print(f"   Data: {data}")
-    
-    return True
+    enqueue(db, user_id, title, body, category=category, data=data, coalesce_key=coalesce_key, summary=summary)
@@ -3,13 +3,13 @@ from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from database import get_db
 from models import User
-from auth import get_current_user
+from routers.users import get_current_user
 import os
 import shutil
 from pathlib import Path
 import uuid
-import hashlib
-from file_security import validate_magic_bytes
+from file_security import stream_upload
+from domain_events import event_bus
 
 router = APIRouter(prefix="/photos", tags=["photos"])
 
@@ -23,10 +23,6 @@ MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 def is_allowed_file(filename: str) -> bool:
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def validate_image_content(file_content: bytes) -> bool:
-    """Validate file is actually an image using magic bytes"""
-    return validate_magic_bytes(file_content)
-
 def sanitize_filename(filename: str) -> str:
     """Remove potentially dangerous characters from filename"""
     # Remove path separators and other dangerous chars
@@ -52,46 +48,28 @@ async def upload_profile_photo(
             detail=f"Invalid file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
         )
     
-    # Read file
-    contents = await file.read()
-    
-    # Validate file size
-    if len(contents) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail="File too large. Max size is 5MB")
-    
-    # Validate actual file content (magic bytes)
-    if not validate_image_content(contents):
-        raise HTTPException(
-            status_code=400,
-            detail="Invalid image file. File content does not match image format"
-        )
+    # Stream to disk, checking content (magic bytes) and size as it arrives;
+    # the secure unique filename uses the content hash
+    file_extension = filename.rsplit(".", 1)[1].lower()
+    file_path = await stream_upload(
+        file, UPLOAD_DIR,
+        lambda digest: f"{current_user.id}_{digest[:16]}.{file_extension}",
+        MAX_FILE_SIZE
+    )
     
-    # Delete old photo if exists
+    # Delete old photo if exists (and isn't the same file re-uploaded)
     if current_user.profile_photo_url:
         old_photo_path = Path(current_user.profile_photo_url)
-        if old_photo_path.exists():
+        if old_photo_path.exists() and old_photo_path.resolve() != file_path.resolve():
             try:
                 old_photo_path.unlink()
             except:
                 pass  # Ignore if deletion fails
     
-    # Generate secure unique filename using hash
-    file_hash = hashlib.sha256(contents).hexdigest()[:16]
-    file_extension = filename.rsplit(".", 1)[1].lower()
-    unique_filename = f"{current_user.id}_{file_hash}.{file_extension}"
-    file_path = UPLOAD_DIR / unique_filename
-    
-    # Ensure file_path is within UPLOAD_DIR (prevent path traversal)
-    if not file_path.resolve().is_relative_to(UPLOAD_DIR.resolve()):
-        raise HTTPException(status_code=400, detail="Invalid file path")
-    
-    # Save file
-    with open(file_path, "wb") as f:
-        f.write(contents)
-    
     # Update user profile
     current_user.profile_photo_url = str(file_path)
     db.commit()
+    event_bus.publish("photo_uploaded", current_user.id)
     
     return {
         "message": "Photo uploaded successfully",
@@ -122,6 +100,8 @@ async def get_profile_photo(
     if not photo_path.exists():
         raise HTTPException(status_code=404, detail="Photo file not found")
     
+    if user_id != current_user.id:
+        event_bus.publish("profile_viewed", current_user.id, user_id)
     return FileResponse(photo_path)
 
 @router.delete("/delete")
@@ -166,27 +146,13 @@ async def upload_verification_photo(
     VERIFICATION_DIR = Path("uploads/verification_photos")
     VERIFICATION_DIR.mkdir(parents=True, exist_ok=True)
     
-    # Read and validate size
-    contents = await file.read()
-    if len(contents) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail="File too large. Max size is 5MB")
-    
-    # Validate content
-    if not validate_image_content(contents):
-        raise HTTPException(status_code=400, detail="Invalid image file")
-    
-    # Save verification photo
-    file_hash = hashlib.sha256(contents).hexdigest()[:16]
+    # Save verification photo, validating size and content while streaming
     file_extension = filename.rsplit(".", 1)[1].lower()
-    unique_filename = f"verify_{current_user.id}_{file_hash}.{file_extension}"
-    file_path = VERIFICATION_DIR / unique_filename
-    
-    # Path validation
-    if not file_path.resolve().is_relative_to(VERIFICATION_DIR.resolve()):
-        raise HTTPException(status_code=400, detail="Invalid file path")
-    
-    with open(file_path, "wb") as f:
-        f.write(contents)
+    await stream_upload(
+        file, VERIFICATION_DIR,
+        lambda digest: f"verify_{current_user.id}_{digest[:16]}.{file_extension}",
+        MAX_FILE_SIZE
+    )
     
     # Mark as pending verification (admin would review this)
     # For MVP, we'll auto-verify
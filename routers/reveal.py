@@ -3,6 +3,8 @@ from sqlalchemy.orm import Session
 from database import get_db
 from models import User, Match
 from routers.users import get_current_user
+from domain_events import event_bus
+from routers.notifications import send_push_notification
 
 router = APIRouter(prefix="/reveal", tags=["reveal"])
 
@@ -32,10 +34,13 @@ def reveal_identity(
             return {"message": "Already revealed"}
         match.is_revealed_b = True
     
+    other_user_id = match.user_b_id if match.user_a_id == current_user.id else match.user_a_id
+    send_push_notification(
+        other_user_id, "Identity revealed", "Someone revealed their identity to you!",
+        {"type": "reveal", "match_id": match_id}, db, category="reveal"
+    )
     db.commit()
-    
-    # Push notification can be implemented with services like Firebase Cloud Messaging
-    # Example: send_push_notification(other_user_id, "Someone revealed their identity!")
+    event_bus.publish("identity_revealed", current_user.id, match_id)
     
     return {
         "message": "Identity revealed",
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from database import get_db
-from models import User
+from models import Badge, User, UserBadge
 from schemas import User as UserSchema
 from auth import oauth2_scheme, decode_access_token
+from interest_index import interest_index, sync_user_interests
+from domain_events import event_bus
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -22,9 +24,27 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
 def get_my_profile(current_user: User = Depends(get_current_user)):
     return current_user
 
+@router.get("/me/badges")
+def get_my_badges(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Badges the current user has earned, newest first."""
+    rows = db.query(Badge, UserBadge.awarded_at).join(UserBadge, UserBadge.badge_id == Badge.id).filter(
+        UserBadge.user_id == current_user.id
+    ).order_by(UserBadge.awarded_at.desc()).all()
+    return [
+        {
+            "id": badge.id,
+            "name": badge.name,
+            "description": badge.description,
+            "icon_url": badge.icon_url,
+            "awarded_at": awarded_at
+        }
+        for badge, awarded_at in rows
+    ]
+
 @router.put("/me")
 def update_my_profile(
     real_name: str = None,
+    interests: str = None,
     preferences: dict = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -34,6 +54,14 @@ def update_my_profile(
     if preferences:
         current_user.preferences = preferences
     
+    interest_ids = None
+    if interests is not None:
+        current_user.interests = interests
+        interest_ids = sync_user_interests(db, current_user.id, interests)
+    
     db.commit()
+    if interest_ids is not None:
+        interest_index.update_user(current_user.id, interest_ids)
+    event_bus.publish("profile_updated", current_user.id)
     db.refresh(current_user)
     return current_user
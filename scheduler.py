@@ -0,0 +1,83 @@
+"""
+Lightweight in-process scheduler for periodic maintenance jobs.
+
+Jobs are plain synchronous functions (they open their own database session);
+each run happens in a worker thread so the event loop is never blocked.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob:
+    def __init__(self, name: str, func: Callable, interval_seconds: Optional[float] = None, daily_at: Optional[str] = None):
+        if (interval_seconds is None) == (daily_at is None):
+            raise ValueError("Give exactly one of interval_seconds or daily_at")
+        self.name = name
+        self.func = func
+        self.interval_seconds = interval_seconds
+        self.daily_at = daily_at  # "HH:MM" UTC
+        self.last_run: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+    def seconds_until_next_run(self, now: datetime) -> float:
+        if self.interval_seconds is not None:
+            return self.interval_seconds
+        hour, minute = (int(part) for part in self.daily_at.split(":"))
+        next_run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        return (next_run - now).total_seconds()
+
+
+class Scheduler:
+    def __init__(self):
+        self.jobs: List[PeriodicJob] = []
+        self._tasks: List[asyncio.Task] = []
+
+    def add_job(self, name: str, func: Callable, interval_seconds: Optional[float] = None, daily_at: Optional[str] = None):
+        """Register a job to run every `interval_seconds`, or daily at `daily_at` ("HH:MM" UTC)"""
+        job = PeriodicJob(name, func, interval_seconds=interval_seconds, daily_at=daily_at)
+        self.jobs.append(job)
+        return job
+
+    async def _run_forever(self, job: PeriodicJob):
+        while True:
+            await asyncio.sleep(job.seconds_until_next_run(datetime.utcnow()))
+            try:
+                await asyncio.to_thread(job.func)
+                job.last_error = None
+            except Exception as e:
+                job.last_error = str(e)
+                logger.error(f"Scheduled job {job.name} failed: {e}", exc_info=True)
+            job.last_run = datetime.utcnow()
+
+    def start(self):
+        """Start all registered jobs on the running event loop"""
+        for job in self.jobs:
+            self._tasks.append(asyncio.create_task(self._run_forever(job), name=f"job:{job.name}"))
+        logger.info(f"Scheduler started with {len(self.jobs)} jobs: {', '.join(j.name for j in self.jobs)}")
+
+    async def stop(self):
+        """Cancel all running jobs"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def status(self) -> list:
+        return [
+            {
+                "name": job.name,
+                "last_run": job.last_run.isoformat() if job.last_run else None,
+                "last_error": job.last_error,
+            }
+            for job in self.jobs
+        ]
+
+
+# Global scheduler instance (jobs are registered and started in main.py)
+scheduler = Scheduler()
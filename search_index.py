@@ -0,0 +1,134 @@
+"""
+Full-text search over chat messages and report descriptions.
+
+PostgreSQL uses GIN indexes on to_tsvector() expressions; SQLite (local
+development and tests) falls back to FTS5 external-content tables that are
+kept in sync by triggers.
+"""
+import logging
+from typing import List, Tuple
+
+from sqlalchemy import func, literal_column, select, text
+
+from models import Message, MessageArchive, Report
+
+logger = logging.getLogger(__name__)
+
+# Text search configuration used both in the index and in queries
+SEARCH_CONFIG = "english"
+
+# Indexed model -> text column
+SEARCH_COLUMNS = {
+    Message: Message.content,
+    MessageArchive: MessageArchive.content,
+    Report: Report.description,
+}
+
+
+def _ts_config():
+    # Must match the index expression exactly for PostgreSQL to use the GIN index
+    return literal_column(f"'{SEARCH_CONFIG}'::regconfig")
+
+
+def _tsvector(column):
+    return func.to_tsvector(_ts_config(), func.coalesce(column, literal_column("''")))
+
+
+def _fts_table(model) -> str:
+    return f"{model.__tablename__}_fts"
+
+
+def _fts5_query(term: str) -> str:
+    """Quote every word so user input can't inject FTS5 query syntax"""
+    words = [w.replace('"', '""') for w in term.split()]
+    return " ".join(f'"{w}"' for w in words if w)
+
+
+def search_index_ddl(dialect: str, table: str, column: str) -> List[str]:
+    """
+    Statements that build the full-text index for `table`.`column`.
+    Applied by the migrations; the PostgreSQL index is built CONCURRENTLY.
+    """
+    if dialect == "postgresql":
+        return [
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_{column}_fts "
+            f"ON {table} USING GIN (to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce({column}, '')))"
+        ]
+
+    if dialect == "sqlite":
+        fts = f"{table}_fts"
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({column}, content='{table}', content_rowid='id')",
+            f"""CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column});
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column});
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column});
+                INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column});
+            END""",
+            # Index rows that existed before the triggers
+            f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+        ]
+
+    logger.warning(f"Full-text search is not supported on {dialect}; search will return no results")
+    return []
+
+
+def ranked_search_subquery(model, term: str, dialect: str):
+    """
+    Subquery of (id, rank) for rows of `model` matching `term`.
+    Higher rank means a better match.
+    """
+    if dialect == "postgresql":
+        vector = _tsvector(SEARCH_COLUMNS[model])
+        query = func.websearch_to_tsquery(_ts_config(), term)
+        return select(
+            model.id.label("id"),
+            func.ts_rank(vector, query).label("rank")
+        ).where(vector.op("@@")(query)).subquery()
+
+    fts = _fts_table(model)
+    return select(
+        literal_column("rowid").label("id"),
+        (-func.bm25(literal_column(fts))).label("rank")
+    ).select_from(text(fts)).where(
+        literal_column(fts).op("MATCH")(_fts5_query(term))
+    ).subquery()
+
+
+def search(db, model, term: str, filters=(), limit: int = 20, offset: int = 0) -> Tuple[list, int]:
+    """
+    Ranked, paginated full-text search.
+
+    Returns:
+        Tuple of ([(row, rank), ...], total_matches)
+    """
+    term = (term or "").strip()
+    if not term or not _fts5_query(term):
+        return [], 0
+
+    ranked = ranked_search_subquery(model, term, db.get_bind().dialect.name)
+    stmt = select(model, ranked.c.rank).join(ranked, ranked.c.id == model.id).where(*filters)
+
+    total = db.scalar(select(func.count()).select_from(stmt.subquery()))
+    rows = db.execute(
+        stmt.order_by(ranked.c.rank.desc(), model.id.desc()).limit(limit).offset(offset)
+    ).all()
+    return [(row[0], row[1]) for row in rows], total
+
+
+def search_union(db, targets, term: str, limit: int = 20, offset: int = 0) -> Tuple[list, int]:
+    """
+    Like search(), across several (model, filters) targets merged by rank.
+    Used to search hot and archived messages as one conversation.
+    """
+    results, total = [], 0
+    for model, filters in targets:
+        rows, count = search(db, model, term, filters, limit=offset + limit, offset=0)
+        results.extend(rows)
+        total += count
+    results.sort(key=lambda row: (row[1], row[0].id), reverse=True)
+    return results[offset:offset + limit], total
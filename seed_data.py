@@ -16,13 +16,13 @@ def seed_badges():
     db = SessionLocal()
     
     badges = [
-        {"name": "First Match", "description": "Made your first match", "xp_requirement": 0, "icon_url": "🎯"},
-        {"name": "Conversationalist", "description": "Sent 50 messages", "xp_requirement": 100, "icon_url": "💬"},
-        {"name": "Social Butterfly", "description": "Matched with 10 people", "xp_requirement": 200, "icon_url": "🦋"},
-        {"name": "Heart Revealer", "description": "Revealed your identity", "xp_requirement": 150, "icon_url": "💝"},
-        {"name": "Event Goer", "description": "Attended 5 events", "xp_requirement": 250, "icon_url": "🎉"},
-        {"name": "Quiz Master", "description": "Completed all quizzes", "xp_requirement": 300, "icon_url": "🧠"},
-        {"name": "Mood Tracker", "description": "30-day mood streak", "xp_requirement": 500, "icon_url": "😊"},
+        {"name": "First Match", "description": "Made your first match", "xp_requirement": 0, "icon_url": "🎯", "criterion": "matches", "threshold": 1},
+        {"name": "Conversationalist", "description": "Sent 50 messages", "xp_requirement": 100, "icon_url": "💬", "criterion": "messages_sent", "threshold": 50},
+        {"name": "Social Butterfly", "description": "Matched with 10 people", "xp_requirement": 200, "icon_url": "🦋", "criterion": "matches", "threshold": 10},
+        {"name": "Heart Revealer", "description": "Revealed your identity", "xp_requirement": 150, "icon_url": "💝", "criterion": "reveals", "threshold": 1},
+        {"name": "Event Goer", "description": "Attended 5 events", "xp_requirement": 250, "icon_url": "🎉", "criterion": "manual"},
+        {"name": "Quiz Master", "description": "Completed all quizzes", "xp_requirement": 300, "icon_url": "🧠", "criterion": "manual"},
+        {"name": "Mood Tracker", "description": "30-day mood streak", "xp_requirement": 500, "icon_url": "😊", "criterion": "mood_streak", "threshold": 30},
     ]
     
     for badge_data in badges:
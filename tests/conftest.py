@@ -0,0 +1,38 @@
+"""
+Test setup: a throwaway SQLite database, migrated to head once per run.
+Settings are read at import time, so the environment is set before any app
+module is imported.
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_db_dir = tempfile.mkdtemp(prefix="odoyewu-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.setdefault("SECRET_KEY", "test-only-secret-key-not-for-production-use")
+
+import pytest
+from sqlalchemy import delete
+
+import migrations
+from database import SessionLocal, engine
+from models import DeviceToken, PushOutbox, User
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    migrations.upgrade(engine)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.rollback()
+    for model in (PushOutbox, DeviceToken, User):
+        session.execute(delete(model))
+    session.commit()
+    session.close()
@@ -0,0 +1,121 @@
+"""PushDispatcher driven end to end against MockPushProvider."""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from database import SessionLocal
+from models import DeviceToken, PushOutbox, User
+from push import RETRY_BASE_SECONDS, PushDispatcher, enqueue
+
+
+def make_user(db, handle: str, *devices) -> int:
+    """A user with (token, platform) devices"""
+    user = User(email=f"{handle}@example.com", anonymous_handle=handle, hashed_password="x")
+    db.add(user)
+    db.flush()
+    now = datetime.utcnow()
+    for token, platform in devices:
+        db.add(DeviceToken(user_id=user.id, token=token, platform=platform, created_at=now, last_seen_at=now))
+    db.commit()
+    return user.id
+
+
+def make_due(db):
+    """Skip the coalescing window / backoff of every unfinished notification"""
+    db.execute(
+        update(PushOutbox)
+        .where(PushOutbox.status.in_(("pending", "retry")))
+        .values(next_attempt_at=datetime.utcnow() - timedelta(seconds=1))
+    )
+    db.commit()
+
+
+def outbox(db, user_id: int) -> PushOutbox:
+    db.expire_all()
+    return db.scalars(select(PushOutbox).where(PushOutbox.user_id == user_id)).one()
+
+
+@pytest.fixture
+def dispatcher():
+    return PushDispatcher(session_factory=SessionLocal, provider_name="mock", batch_size=100, max_attempts=3)
+
+
+def dispatch(dispatcher) -> int:
+    return asyncio.run(dispatcher.dispatch_once())
+
+
+def test_coalesced_notifications_are_sent_once_with_summary(db, dispatcher):
+    user_id = make_user(db, "alice", ("tok-a", "ios"))
+    for i in range(3):
+        enqueue(db, user_id, "New message", f"Message {i}", category="message",
+                coalesce_key="message:1", summary="{count} new messages")
+        db.commit()
+
+    assert dispatch(dispatcher) == 0  # still inside the coalescing window
+    make_due(db)
+    assert dispatch(dispatcher) == 1
+
+    [sent] = dispatcher.provider.sent
+    assert (sent.token, sent.title, sent.body) == ("tok-a", "New message", "3 new messages")
+    row = outbox(db, user_id)
+    assert (row.count, row.status) == (3, "sent")
+
+
+def test_one_batch_per_platform(db, dispatcher):
+    users = [
+        make_user(db, "ios1", ("tok-ios-1", "ios")),
+        make_user(db, "ios2", ("tok-ios-2", "ios")),
+        make_user(db, "android", ("tok-android", "android")),
+        make_user(db, "both", ("tok-ios-3", "ios"), ("tok-web", "web")),
+    ]
+    for user_id in users:
+        enqueue(db, user_id, "Hello", "Hi")
+    db.commit()
+    make_due(db)
+
+    assert dispatch(dispatcher) == 4
+    assert sorted(dispatcher.provider.batches) == [("android", 1), ("ios", 3), ("web", 1)]
+    assert {outbox(db, user_id).status for user_id in users} == {"sent"}
+
+
+def test_invalid_tokens_are_pruned(db, dispatcher):
+    mixed = make_user(db, "mixed", ("tok-stale", "ios"), ("tok-good", "android"))
+    stale_only = make_user(db, "stale", ("tok-gone", "ios"))
+    dispatcher.provider.invalid_tokens.update({"tok-stale", "tok-gone"})
+    enqueue(db, mixed, "Hello", "Hi")
+    enqueue(db, stale_only, "Hello", "Hi")
+    db.commit()
+    make_due(db)
+
+    dispatch(dispatcher)
+
+    assert outbox(db, mixed).status == "sent"
+    assert outbox(db, stale_only).status == "no_device"
+    assert set(db.scalars(select(DeviceToken.token))) == {"tok-good"}
+    assert dispatcher.stats()["tokens_pruned"] == 2
+
+
+def test_failed_sends_back_off_then_fail_after_max_attempts(db, dispatcher):
+    user_id = make_user(db, "flaky", ("tok-flaky", "ios"))
+    enqueue(db, user_id, "Hello", "Hi")
+    db.commit()
+    dispatcher.provider.fail_next = 10
+
+    for attempt in range(1, dispatcher.max_attempts):
+        make_due(db)
+        before = datetime.utcnow()
+        dispatch(dispatcher)
+        row = outbox(db, user_id)
+        assert (row.status, row.attempts) == ("retry", attempt)
+        assert row.last_error == "Simulated provider error"
+        # Exponential backoff: 30s, 60s, ...
+        delay = (row.next_attempt_at - before).total_seconds()
+        assert RETRY_BASE_SECONDS * 2 ** (attempt - 1) <= delay < RETRY_BASE_SECONDS * 2 ** (attempt - 1) + 5
+
+    make_due(db)
+    dispatch(dispatcher)
+    row = outbox(db, user_id)
+    assert (row.status, row.attempts) == ("failed", dispatcher.max_attempts)
+    assert dispatcher.provider.sent == []
@@ -24,3 +24,31 @@ def is_within_radius(lat1, lon1, lat2, lon2, radius_miles):
     """Check if two locations are within a specified radius."""
     distance = haversine_distance(lat1, lon1, lat2, lon2)
     return distance <= radius_miles
+
+def bounding_box(latitude, longitude, radius_miles):
+    """
+    Smallest lat/lon box containing every point within radius_miles.
+    Returns (min_lat, min_lon, max_lat, max_lon); min_lon > max_lon means the
+    box crosses the antimeridian.
+    """
+    R = 3959  # Earth's radius in miles
+    
+    delta_lat = math.degrees(radius_miles / R)
+    min_lat = latitude - delta_lat
+    max_lat = latitude + delta_lat
+    
+    # Near a pole the circle covers every longitude
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90), -180.0, min(max_lat, 90), 180.0
+    
+    delta_lon = math.degrees(math.asin(min(1.0, math.sin(radius_miles / R) / math.cos(math.radians(latitude)))))
+    if delta_lon >= 180:
+        return min_lat, -180.0, max_lat, 180.0
+    
+    min_lon = longitude - delta_lon
+    max_lon = longitude + delta_lon
+    if min_lon < -180:
+        min_lon += 360
+    if max_lon > 180:
+        max_lon -= 360
+    return min_lat, min_lon, max_lat, max_lon
@@ -0,0 +1,133 @@
+"""
+XP awards.
+
+Every award appends a row to xp_ledger and bumps users.xp with a single
+UPDATE ... SET xp = xp + :n, level = ... RETURNING xp, level, so concurrent
+awards never overwrite each other and the user row is only locked for that
+one statement. The ledger is the source of truth; reconcile_xp rebuilds
+users.xp and users.level from it.
+"""
+import logging
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy import case, func, select, update
+
+from database import SessionLocal, insert_for
+from badge_engine import badge_engine
+from leaderboard import queue_xp_update
+from models import User, XPLedgerEntry
+
+logger = logging.getLogger(__name__)
+
+XP_PER_LEVEL = 100
+
+
+class XPAward(NamedTuple):
+    xp: int
+    level: int
+    leveled_up: bool
+    awarded: bool  # False if this reason/reference was already awarded
+    badge_ids: tuple = ()  # badges earned by this award
+
+
+def level_for(xp: int) -> int:
+    """Every 100 XP = 1 level"""
+    return max(xp, 0) // XP_PER_LEVEL + 1
+
+
+def xp_to_next_level(xp: int) -> int:
+    return level_for(xp) * XP_PER_LEVEL - xp
+
+
+def award_xp(db, user_id: int, amount: int, reason: str, reference_id: Optional[int] = None) -> XPAward:
+    """
+    Record `amount` XP for a user and update their total and level atomically.
+    Runs in the caller's transaction; awarding the same (reason, reference_id)
+    twice is a no-op.
+    """
+    insert = insert_for(db)
+    stmt = insert(XPLedgerEntry).values(
+        user_id=user_id,
+        amount=amount,
+        reason=reason,
+        reference_id=reference_id,
+        created_at=datetime.utcnow()
+    )
+    if reference_id is not None:
+        stmt = stmt.on_conflict_do_nothing(index_elements=["reason", "reference_id"])
+    recorded = db.execute(stmt).rowcount != 0
+
+    if not recorded:
+        xp, level = db.execute(select(User.xp, User.level).where(User.id == user_id)).one()
+        return XPAward(xp or 0, level or 1, False, False)
+
+    # Level never goes down, matching the previous behaviour
+    new_xp = func.coalesce(User.xp, 0) + amount
+    current_level = func.coalesce(User.level, 1)
+    derived_level = new_xp // XP_PER_LEVEL + 1
+    xp, level = db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(
+            xp=new_xp,
+            level=case((derived_level > current_level, derived_level), else_=current_level)
+        )
+        .returning(User.xp, User.level)
+        .execution_options(synchronize_session=False)
+    ).one()
+
+    # Applied to the leaderboard once the caller commits
+    queue_xp_update(db, user_id, xp)
+    badge_ids = badge_engine.check(db, user_id, "xp", xp - amount, xp)
+
+    previous_level = level_for(xp - amount)
+    return XPAward(xp, level, level > previous_level, True, tuple(badge_ids))
+
+
+def reconcile_xp(db, batch_size: int = 1000) -> int:
+    """
+    Rebuild users.xp and users.level from the ledger for every user whose
+    total has drifted. Returns the number of users corrected.
+    """
+    ledger_total = (
+        select(func.coalesce(func.sum(XPLedgerEntry.amount), 0))
+        .where(XPLedgerEntry.user_id == User.id)
+        .scalar_subquery()
+    )
+    corrected = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(User.id, User.xp, User.level, ledger_total)
+            .where(User.id > last_id)
+            .order_by(User.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        fixes = [
+            {"id": user_id, "xp": total, "level": level_for(total)}
+            for user_id, xp, level, total in rows
+            if (xp or 0) != total or (level or 1) != level_for(total)
+        ]
+        for fix in fixes:
+            logger.warning(f"Reconciled XP for user {fix['id']}: now {fix['xp']} XP, level {fix['level']}")
+            queue_xp_update(db, fix["id"], fix["xp"])
+        if fixes:
+            db.execute(update(User).execution_options(synchronize_session=False), fixes)
+        db.commit()
+        corrected += len(fixes)
+    return corrected
+
+
+def run_reconcile_job():
+    """Entry point for the scheduler"""
+    db = SessionLocal()
+    try:
+        corrected = reconcile_xp(db)
+        logger.info(f"XP reconciliation corrected {corrected} users")
+    finally:
+        db.close()